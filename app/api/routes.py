@@ -0,0 +1,178 @@
+import time
+from datetime import date
+from typing import Any, Iterable, Optional, Tuple
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from sqlalchemy import and_, or_
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.db.session import get_async_session, get_session
+from app.db.versioning import data_version
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.transaction import Transaction
+from app.services.dashboard import DashboardService
+from app.services.earnings import EarningsService
+from app.services.history import PERIODOS
+from app.services.portfolio import CalculationService
+from app.services.positions import PositionStateService
+from app.services.quotes import get_quote_cache
+
+# As versões das tabelas vêm do banco e valem para todos os processos; a das
+# cotações é um contador do cache em memória, então ETags que a usam levam este marcador
+_PROCESSO = format(time.time_ns(), 'x')
+
+TABELAS_POSICOES = ('transacoes', 'posicoes')
+TABELAS_PROVENTOS = ('proventos', 'proventos_mensais')
+LIMITE_PAGINA = 500
+
+class FastJSONResponse(Response):
+    """JSON serializado com orjson (datas e arrays NumPy nativos, sem passar pelo encoder do FastAPI)."""
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+router = APIRouter(prefix='/api', tags=['api'], default_response_class=FastJSONResponse)
+
+def make_etag(versao: Iterable, cotacoes: bool = False) -> str:
+    partes = '.'.join(str(v) for v in versao)
+    return 'W/"%s-%s"' % (_PROCESSO, partes) if cotacoes else 'W/"%s"' % partes
+
+def _etag_confere(request: Request, etag: str) -> bool:
+    cabecalho = request.headers.get('if-none-match')
+    if not cabecalho:
+        return False
+    return cabecalho.strip() == '*' or etag in (tag.strip() for tag in cabecalho.split(','))
+
+def _resposta(etag: str, conteudo: Any) -> FastJSONResponse:
+    # no-cache: o cliente sempre revalida, mas recebe 304 enquanto a versão não mudar
+    return FastJSONResponse(conteudo, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+def _nao_modificado(request: Request, etag: str) -> Optional[Response]:
+    if _etag_confere(request, etag):
+        return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+    return None
+
+def encode_cursor(data: date, id: int) -> str:
+    return f'{data.isoformat()}_{id}'
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        dia, id = cursor.split('_', 1)
+        return date.fromisoformat(dia), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Cursor inválido')
+
+async def _etag_posicoes(session: AsyncSession, quotes) -> str:
+    # A janela de TTL entra na versão para que cotações expiradas sejam buscadas de novo
+    janela = int(time.monotonic() // settings.QUOTES_TTL_SECONDS)
+    versoes = await data_version.key_async(session, TABELAS_POSICOES)
+    return make_etag((*versoes, quotes.version, janela), cotacoes=True)
+
+@router.get('/positions')
+async def list_positions(
+    request: Request,
+    portfolio_id: int = CARTEIRA_PADRAO,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Posições abertas da carteira enriquecidas com as cotações em cache."""
+    quotes = get_quote_cache()
+    etag = await _etag_posicoes(session, quotes)
+    if (resposta := _nao_modificado(request, etag)) is not None:
+        return resposta
+
+    posicoes = await PositionStateService.current_positions_async(session, portfolio_id)
+    await CalculationService.enrich_positions_async(posicoes, quotes)
+    # A cotação buscada agora pode ter mudado a versão
+    etag = await _etag_posicoes(session, quotes)
+    return _resposta(etag, [p.model_dump() for p in posicoes])
+
+@router.get('/transactions')
+def list_transactions(
+    request: Request,
+    portfolio_id: int = CARTEIRA_PADRAO,
+    ticker: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=LIMITE_PAGINA),
+    cursor: Optional[str] = None,
+    desc: bool = False,
+    session: Session = Depends(get_session),
+):
+    """
+    Transações paginadas por keyset em (data, id).
+
+    `cursor` é o `next_cursor` da página anterior: a consulta continua do
+    último par visto em vez de usar OFFSET, então o custo por página não
+    cresce com a profundidade.
+    """
+    etag = make_etag(data_version.key(session, ('transacoes',)))
+    if (resposta := _nao_modificado(request, etag)) is not None:
+        return resposta
+
+    statement = select(Transaction).where(Transaction.portfolio_id == portfolio_id)
+    if ticker:
+        statement = statement.where(Transaction.ticker == ticker.upper())
+    if cursor:
+        dia, id = decode_cursor(cursor)
+        if desc:
+            statement = statement.where(or_(Transaction.data < dia, and_(Transaction.data == dia, Transaction.id < id)))
+        else:
+            statement = statement.where(or_(Transaction.data > dia, and_(Transaction.data == dia, Transaction.id > id)))
+    if desc:
+        statement = statement.order_by(Transaction.data.desc(), Transaction.id.desc())
+    else:
+        statement = statement.order_by(Transaction.data, Transaction.id)
+
+    # Uma linha a mais indica se existe próxima página
+    linhas = session.exec(statement.limit(limit + 1)).all()
+    pagina = linhas[:limit]
+    proximo = encode_cursor(pagina[-1].data, pagina[-1].id) if len(linhas) > limit else None
+
+    return _resposta(etag, {
+        'items': [t.model_dump() for t in pagina],
+        'next_cursor': proximo,
+    })
+
+@router.get('/earnings')
+def list_earnings(
+    request: Request,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    portfolio_id: int = CARTEIRA_PADRAO,
+    session: Session = Depends(get_session),
+):
+    """Proventos agregados por mês e por ticker, lidos da tabela mensal."""
+    etag = make_etag(data_version.key(session, TABELAS_PROVENTOS))
+    if (resposta := _nao_modificado(request, etag)) is not None:
+        return resposta
+
+    return _resposta(etag, {
+        'total': EarningsService.total(session, inicio, fim, portfolio_id),
+        'por_tipo': EarningsService.split_by_type(session, inicio, fim, portfolio_id),
+        'por_ticker': EarningsService.income_by_ticker(session, inicio, fim, portfolio_id),
+        'por_mes': EarningsService.income_by_month(session, inicio, fim, portfolio_id),
+    })
+
+@router.get('/history')
+async def portfolio_history(
+    request: Request,
+    periodo: str = 'Tempo máximo',
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Série diária de valor da carteira (e benchmarks) do view model compartilhado."""
+    if periodo not in PERIODOS:
+        raise HTTPException(status_code=400, detail=f'Período inválido. Opções: {", ".join(PERIODOS)}')
+
+    etag = make_etag(await DashboardService.current_version(session), cotacoes=True)
+    if (resposta := _nao_modificado(request, etag)) is not None:
+        return resposta
+
+    vm = await DashboardService.get_view_model()
+    carteira = vm.period_history(periodo)
+    _, series = vm.chart_series(periodo)
+    return _resposta(make_etag(vm.versao, cotacoes=True), {
+        'periodo': periodo,
+        'datas': carteira.index.strftime('%Y-%m-%d').tolist(),
+        **series,
+    })
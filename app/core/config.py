@@ -1,8 +1,47 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Gestor de Investimentos"
     DATABASE_URL: str
+    # Se omitida, é derivada de DATABASE_URL trocando o driver (asyncpg/aiosqlite)
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Pool de conexões (ignorado no SQLite)
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Cache de SQL compilado do SQLAlchemy e de prepared statements do asyncpg
+    DB_STATEMENT_CACHE_SIZE: int = 500
+
+    # Cotações
+    QUOTES_FILE: Optional[str] = None  # .json ou .csv com ticker,preco
+    QUOTES_TTL_SECONDS: float = 60.0
+    QUOTES_CACHE_SIZE: int = 2048
+
+    # Cadastro de ativos (CSV ticker,nome,classe): nomes para a busca do header e
+    # classe (ACAO/FII) para a apuração de IR
+    ASSETS_FILE: Optional[str] = None
+
+    # Histórico de preços diário (CSV longo: data,ticker,preco) com fechamentos brutos;
+    # os eventos societários ajustam os preços na leitura
+    PRICE_HISTORY_FILE: Optional[str] = None
+
+    # Benchmarks (CSV data,taxa em %): CDI diário e IPCA mensal
+    CDI_FILE: Optional[str] = None
+    IPCA_FILE: Optional[str] = None
+
+    # Intervalo (s) com que cada cliente do dashboard verifica se há dados novos
+    DASHBOARD_REFRESH_SECONDS: float = 5.0
+
+    # Instrumentação (/metrics). A taxa de amostragem vale para as medições de
+    # latência; os contadores de chamadas são sempre atualizados.
+    METRICS_ENABLED: bool = True
+    METRICS_SAMPLE_RATE: float = 1.0
+    SLOW_QUERY_MS: float = 500.0
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -10,4 +49,4 @@ class Settings(BaseSettings):
         extra="ignore"  # Ignora variáveis do Docker (User, Pass)
     )
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
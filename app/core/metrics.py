@@ -0,0 +1,166 @@
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos baldes dos histogramas de latência
+BUCKETS_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    def __init__(self, nome: str, descricao: str):
+        self.nome = nome
+        self.descricao = descricao
+        self._valores: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1.0, **labels):
+        chave = tuple(sorted(labels.items()))
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def render(self):
+        yield f"# HELP {self.nome} {self.descricao}"
+        yield f"# TYPE {self.nome} counter"
+        # Cópia sob o lock: inc() roda em threads (to_thread/run_sync) durante a renderização
+        with self._lock:
+            itens = sorted(self._valores.items())
+        for chave, valor in itens:
+            yield f"{self.nome}{_labels(chave)} {valor:g}"
+
+class Histogram:
+    def __init__(self, nome: str, descricao: str, buckets: Sequence[float] = BUCKETS_PADRAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}  # labels -> [contagens por balde..., soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, valor: float, **labels):
+        chave = tuple(sorted(labels.items()))
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.nome} {self.descricao}"
+        yield f"# TYPE {self.nome} histogram"
+        # Cópia de cada série sob o lock: baldes, soma e total da mesma observação
+        with self._lock:
+            itens = sorted((chave, list(serie)) for chave, serie in self._series.items())
+        for chave, serie in itens:
+            acumulado = 0
+            for limite, contagem in zip((*self.buckets, float('inf')), serie):
+                acumulado += contagem
+                le = '+Inf' if limite == float('inf') else f"{limite:g}"
+                yield f"{self.nome}_bucket{_labels(chave + (('le', le),))} {acumulado}"
+            yield f"{self.nome}_sum{_labels(chave)} {serie[-2]:.6f}"
+            yield f"{self.nome}_count{_labels(chave)} {serie[-1]}"
+
+def _labels(chave: Tuple) -> str:
+    if not chave:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in chave) + '}'
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metricas: Dict[str, object] = {}
+
+    def counter(self, nome: str, descricao: str) -> Counter:
+        return self._metricas.setdefault(nome, Counter(nome, descricao))
+
+    def histogram(self, nome: str, descricao: str, buckets: Sequence[float] = BUCKETS_PADRAO) -> Histogram:
+        return self._metricas.setdefault(nome, Histogram(nome, descricao, buckets))
+
+    def render(self) -> str:
+        """Formato texto de exposição do Prometheus."""
+        linhas = []
+        for metrica in self._metricas.values():
+            linhas.extend(metrica.render())
+        return '\n'.join(linhas) + '\n'
+
+metrics = MetricsRegistry()
+
+span_seconds = metrics.histogram('app_span_seconds', 'Duração de operações instrumentadas (amostrada).')
+span_total = metrics.counter('app_span_total', 'Execuções de operações instrumentadas.')
+sql_seconds = metrics.histogram('db_query_seconds', 'Latência das consultas SQL (amostrada).')
+sql_rows = metrics.counter('db_query_rows_total', 'Linhas afetadas/retornadas informadas pelo driver.')
+sql_total = metrics.counter('db_query_total', 'Consultas SQL executadas.')
+
+def _amostrar() -> bool:
+    taxa = settings.METRICS_SAMPLE_RATE
+    return settings.METRICS_ENABLED and (taxa >= 1.0 or random.random() < taxa)
+
+@contextmanager
+def span(nome: str):
+    """Mede um trecho de código e registra no histograma `app_span_seconds`."""
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    span_total.inc(span=nome)
+    if not _amostrar():
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        span_seconds.observe(time.perf_counter() - inicio, span=nome)
+
+def timed(nome: Optional[str] = None):
+    """Decorator de span para funções síncronas e assíncronas."""
+    def decorar(funcao):
+        rotulo = nome or f"{funcao.__module__}.{funcao.__qualname__}"
+
+        if inspect.iscoroutinefunction(funcao):
+            @functools.wraps(funcao)
+            async def envolvida_async(*args, **kwargs):
+                with span(rotulo):
+                    return await funcao(*args, **kwargs)
+            return envolvida_async
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            with span(rotulo):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorar
+
+# Instrumentação do SQLAlchemy
+# Vale para todos os engines (inclusive o sync_engine por trás do async_engine)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._inicio_metricas = time.perf_counter() if _amostrar() else None
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    if not settings.METRICS_ENABLED:
+        return
+    operacao = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OUTRO'
+    sql_total.inc(operacao=operacao)
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        sql_rows.inc(cursor.rowcount, operacao=operacao)
+
+    inicio = getattr(context, '_inicio_metricas', None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    sql_seconds.observe(duracao, operacao=operacao)
+    if duracao * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning("Consulta lenta (%.1f ms): %s", duracao * 1000, statement[:500])
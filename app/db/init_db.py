@@ -2,9 +2,21 @@ from sqlmodel import SQLModel
 from app.db.session import engine
 
 from app.models.transaction import Transaction
-from app.models.earnings import Earnings
+from app.models.earnings import Earnings, EarningsMonthly
+from app.models.position import Position, PositionHistory
+from app.models.portfolio import RecomputeCheckpoint
+from app.models.snapshot import PortfolioSnapshot, SnapshotPending
+from app.models.corporate_action import CorporateAction
+from app.models.data_version import TableVersion
 
 def init_db():
+    # Importado aqui: o serviço depende dos modelos registrados acima
+    from app.services.schema_upgrade import SchemaUpgradeService
+
+    # create_all não altera tabelas existentes: bancos antigos passam pelo upgrade_db.py
+    if SchemaUpgradeService.plan(engine):
+        raise RuntimeError("Banco criado por uma versão anterior do esquema: rode `python upgrade_db.py`")
+
     print("Criando tabelas no banco de dados...")
 
     SQLModel.metadata.create_all(engine)
@@ -1,11 +1,69 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
+from app.core import metrics  # noqa: F401  (registra a instrumentação das consultas)
+from app.db import versioning  # noqa: F401  (registra os eventos de versão de dados)
+
+# Drivers usados por cada engine (o .env pode trazer qualquer um dos dois)
+SYNC_DRIVERS = {'postgresql': 'postgresql+psycopg2', 'sqlite': 'sqlite'}
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+def _with_driver(url: str, drivers: dict):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    url = url.set(drivername=drivers.get(backend, url.drivername))
+    # asyncpg recebe a query como argumentos de connect(): aceita `ssl`, não `sslmode` (e vice-versa no psycopg2)
+    if url.drivername == 'postgresql+asyncpg' and 'sslmode' in url.query:
+        url = url.difference_update_query(['sslmode']).update_query_dict({'ssl': url.query['sslmode']})
+    elif url.drivername == 'postgresql+psycopg2' and 'ssl' in url.query:
+        url = url.difference_update_query(['ssl']).update_query_dict({'sslmode': url.query['ssl']})
+    return url
+
+def _engine_options(url) -> dict:
+    """Parâmetros de pool/cache vindos do Settings."""
+    options = {
+        'echo': settings.DB_ECHO,
+        'query_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    # SQLite usa pools próprios e não aceita dimensionamento
+    if url.get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    return options
 
 # Cria a conexão
-# echo=True faz o log mostrar o SQL real no terminal
-engine = create_engine(settings.DATABASE_URL, echo=True)
+# DB_ECHO=True faz o log mostrar o SQL real no terminal (só para depuração;
+# latência e volume das consultas ficam em /metrics)
+sync_url = _with_driver(settings.DATABASE_URL, SYNC_DRIVERS)
+engine = create_engine(sync_url, **_engine_options(sync_url))
+
+# Engine assíncrono para uso dentro do event loop do NiceGUI/FastAPI
+async_url = _with_driver(settings.ASYNC_DATABASE_URL or settings.DATABASE_URL, ASYNC_DRIVERS)
+if async_url.drivername == 'postgresql+asyncpg':
+    async_url = async_url.update_query_dict(
+        {'prepared_statement_cache_size': str(settings.DB_STATEMENT_CACHE_SIZE)}
+    )
+async_engine = create_async_engine(async_url, **_engine_options(async_url))
+
+async_session_factory = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
 def get_session():
     """Dependência para injetar a sessão do banco nas rotas/funções."""
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_session():
+    """Versão assíncrona de get_session, sem bloquear o event loop."""
+    async with async_session_factory() as session:
+        yield session
@@ -0,0 +1,96 @@
+from typing import Iterable, Set, Tuple
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.data_version import TableVersion
+
+_VERSOES = TableVersion.__table__
+_UPSERT = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+class DataVersion:
+    """
+    Versões por tabela guardadas no banco (`versoes_dados`), incrementadas na
+    mesma transação que altera a tabela.
+
+    Servem de chave de cache para dados derivados (view model do dashboard,
+    ETags da API, etc.): se a versão não mudou, o resultado antigo vale. Como
+    moram no banco, commits de outros processos (import_csv.py, recompute.py,
+    outro worker do servidor) também invalidam os caches deste.
+    """
+
+    def bump(self, conexao, *tabelas: str):
+        """Incrementa as versões dentro da transação corrente de `conexao` (Connection ou Session)."""
+        tabelas = sorted(set(tabelas))
+        if not tabelas:
+            return
+        linhas = [{'tabela': t, 'versao': 1} for t in tabelas]
+        upsert = _UPSERT.get(conexao.get_bind().dialect.name if isinstance(conexao, Session) else conexao.dialect.name)
+        if upsert is not None:
+            stmt = upsert(_VERSOES).values(linhas)
+            conexao.execute(stmt.on_conflict_do_update(
+                index_elements=[_VERSOES.c.tabela], set_={'versao': _VERSOES.c.versao + 1},
+            ))
+            return
+        conexao.execute(update(_VERSOES).where(_VERSOES.c.tabela.in_(tabelas)).values(versao=_VERSOES.c.versao + 1))
+        existentes = set(conexao.execute(select(_VERSOES.c.tabela).where(_VERSOES.c.tabela.in_(tabelas))).scalars())
+        faltando = [linha for linha in linhas if linha['tabela'] not in existentes]
+        if faltando:
+            conexao.execute(_VERSOES.insert(), faltando)
+
+    @staticmethod
+    def _consulta(tabelas: Tuple[str, ...]):
+        return select(_VERSOES.c.tabela, _VERSOES.c.versao).where(_VERSOES.c.tabela.in_(tabelas))
+
+    def key(self, conexao, tabelas: Iterable[str]) -> Tuple[int, ...]:
+        """Versões de `tabelas`, na ordem pedida (0 para tabela nunca alterada)."""
+        tabelas = tuple(tabelas)
+        versoes = dict(conexao.execute(self._consulta(tabelas)).all())
+        return tuple(versoes.get(t, 0) for t in tabelas)
+
+    async def key_async(self, session: AsyncSession, tabelas: Iterable[str]) -> Tuple[int, ...]:
+        tabelas = tuple(tabelas)
+        versoes = dict((await session.execute(self._consulta(tabelas))).all())
+        return tuple(versoes.get(t, 0) for t in tabelas)
+
+    def get(self, conexao, tabela: str) -> int:
+        return self.key(conexao, (tabela,))[0]
+
+data_version = DataVersion()
+
+_CHAVE = 'tabelas_alteradas'
+
+def _registrar(session: Session, tabelas: Iterable[str]):
+    session.info.setdefault(_CHAVE, set()).update(t for t in tabelas if t != _VERSOES.name)
+
+def pending_tables(session: Session) -> Set[str]:
+    """Tabelas alteradas pela transação corrente da sessão (ainda sem commit)."""
+    return session.info.get(_CHAVE, set())
+
+@event.listens_for(Session, 'after_flush')
+def _coletar_objetos(session, flush_context):
+    _registrar(session, {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, '__table__')
+    })
+
+@event.listens_for(Session, 'do_orm_execute')
+def _coletar_statements(orm_execute_state):
+    # INSERT/UPDATE/DELETE em massa não passam pelo flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabela = getattr(orm_execute_state.statement, 'table', None)
+        if tabela is not None:
+            _registrar(orm_execute_state.session, [tabela.name])
+
+@event.listens_for(Session, 'before_commit')
+def _publicar(session):
+    # O flush do commit ainda não aconteceu: feito aqui, as tabelas dele também entram
+    session.flush()
+    tabelas = session.info.pop(_CHAVE, ())
+    if tabelas:
+        data_version.bump(session.connection(), *tabelas)
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar(session):
+    session.info.pop(_CHAVE, None)
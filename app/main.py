@@ -1,11 +1,36 @@
-from nicegui import ui
+from fastapi.responses import PlainTextResponse
+from nicegui import app, ui
+from app.api.routes import router as api_router
 from app.ui.pages.dashboard import dashboard_page
+from app.ui.pages.projection import projection_page
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.search import TickerSearchService
+from app.services.snapshots import SnapshotService
 
 # Rota Principal
 @ui.page('/')
-def index():
-    dashboard_page()
+async def index():
+    await dashboard_page()
+
+# Projeção de Monte Carlo da carteira
+@ui.page('/projecao')
+async def projecao():
+    await projection_page()
+
+# Métricas (formato Prometheus) servidas pelo mesmo servidor do NiceGUI
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+def metrics_endpoint():
+    return metrics.render()
+
+# Índice da busca de tickers montado antes do primeiro acesso
+app.on_startup(TickerSearchService.refresh_async)
+
+# Snapshots do histórico estendidos até o dia corrente e compactados (na subida e a cada virada de dia)
+app.on_startup(SnapshotService.run_daily_async)
+
+# API REST (JSON) no mesmo servidor, documentada em /docs
+app.include_router(api_router)
 
 # Inicialização
 # native=False garante que rode no navegador. 
@@ -14,5 +39,6 @@ ui.run(
     dark=True,
     language='pt-BR',
     favicon='📊',
-    port=8080
+    port=8080,
+    fastapi_docs=True
 )
\ No newline at end of file
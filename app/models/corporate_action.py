@@ -0,0 +1,19 @@
+from datetime import date
+from typing import Optional
+from sqlmodel import Field, SQLModel, Index
+
+# Tipos de evento: todos multiplicam a quantidade por `fator` e dividem o preço por ele
+DESDOBRAMENTO = 'D'  # Split: 1 ação vira `fator` ações (fator > 1)
+GRUPAMENTO = 'G'     # Inplit: fator < 1 (ex.: 10 para 1 = 0.1)
+BONIFICACAO = 'B'    # Bonificação em ações: 10% = fator 1.1
+
+class CorporateAction(SQLModel, table=True):
+    """Evento societário que altera a quantidade de ações de um ticker em todas as carteiras."""
+    __tablename__ = "eventos_societarios"
+    __table_args__ = (Index("ix_eventos_societarios_ticker_data", "ticker", "data"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    ticker: str
+    data: date  # Data "ex": negociações a partir dela já estão na nova base
+    tipo: str   # DESDOBRAMENTO, GRUPAMENTO ou BONIFICACAO
+    fator: float
@@ -0,0 +1,8 @@
+from sqlmodel import Field, SQLModel
+
+class TableVersion(SQLModel, table=True):
+    """Versão de uma tabela, incrementada na mesma transação que a altera (ver app.db.versioning)."""
+    __tablename__ = "versoes_dados"
+
+    tabela: str = Field(primary_key=True)
+    versao: int = 0
@@ -1,12 +1,31 @@
 from datetime import date
 from typing import Optional
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, SQLModel, Index
+from app.models.portfolio import CARTEIRA_PADRAO, portfolio_field
 
 class Earnings(SQLModel, table=True):
     __tablename__ = "proventos"
+    __table_args__ = (
+        Index("ix_proventos_carteira_ticker_data", "portfolio_id", "ticker", "data"),
+        Index("ux_proventos_carteira_chave", "portfolio_id", "chave_importacao", unique=True),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
+    portfolio_id: int = portfolio_field()
     ticker: str = Field(index=True)
-    data: date
+    data: date = Field(index=True)
     valor_total: float
-    tipo: str  # "DIV" ou "JCP"
\ No newline at end of file
+    tipo: str  # "DIV" ou "JCP"
+    chave_importacao: Optional[str] = None  # Só em linhas importadas de extrato (ver ImportService)
+
+class EarningsMonthly(SQLModel, table=True):
+    """Agregado mensal de proventos por carteira, ticker e tipo (mantido junto com `proventos`)."""
+    __tablename__ = "proventos_mensais"
+    __table_args__ = (Index("ix_proventos_mensais_carteira_mes", "portfolio_id", "mes"),)
+
+    portfolio_id: int = Field(default=CARTEIRA_PADRAO, primary_key=True)
+    ticker: str = Field(primary_key=True)
+    mes: date = Field(primary_key=True)  # Primeiro dia do mês
+    tipo: str = Field(primary_key=True)
+    valor_total: float = 0.0
+    eventos: int = 0
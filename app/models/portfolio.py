@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import text
+from sqlmodel import Field, SQLModel
+
+# Instalações de uma conta só usam sempre esta carteira
+CARTEIRA_PADRAO = 1
+
+def portfolio_field():
+    """Coluna `portfolio_id` comum às tabelas por carteira (com default também no banco, para INSERTs em massa)."""
+    return Field(
+        default=CARTEIRA_PADRAO,
+        index=True,
+        sa_column_kwargs={'server_default': text(str(CARTEIRA_PADRAO))},
+    )
+
+class RecomputeCheckpoint(SQLModel, table=True):
+    """Carteiras já concluídas por uma execução do recálculo em lote (ponto de retomada)."""
+    __tablename__ = "recalculo_checkpoint"
+
+    job: str = Field(primary_key=True)
+    portfolio_id: int = Field(primary_key=True)
+    concluido_em: datetime
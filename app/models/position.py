@@ -0,0 +1,27 @@
+from datetime import date
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from app.models.portfolio import CARTEIRA_PADRAO
+
+class Position(SQLModel, table=True):
+    """Estado atual (materializado) da posição de cada ticker, por carteira."""
+    __tablename__ = "posicoes"
+
+    portfolio_id: int = Field(default=CARTEIRA_PADRAO, primary_key=True)
+    ticker: str = Field(primary_key=True)
+    quantidade: float = 0  # Na base atual de ações: pode ficar fracionária após bonificação/grupamento
+    preco_medio: float = 0.0
+    total_investido: float = 0.0
+    ultima_transacao_id: Optional[int] = None
+    ultima_data: Optional[date] = None
+
+class PositionHistory(SQLModel, table=True):
+    """Estado da posição ao fim de cada dia com movimentação (ponto de retomada do replay)."""
+    __tablename__ = "posicoes_historico"
+
+    portfolio_id: int = Field(default=CARTEIRA_PADRAO, primary_key=True)
+    ticker: str = Field(primary_key=True)
+    data: date = Field(primary_key=True)
+    quantidade: float = 0
+    preco_medio: float = 0.0
+    total_investido: float = 0.0
@@ -0,0 +1,30 @@
+from datetime import date
+from sqlmodel import Field, SQLModel
+from app.models.portfolio import CARTEIRA_PADRAO
+
+class PortfolioSnapshot(SQLModel, table=True):
+    """
+    Fotografia da carteira ao fim de um dia, semana ou mês.
+
+    Linhas semanais/mensais são rollups das diárias: valor e custo do último
+    dia do período e a soma dos proventos recebidos nele. `data` é o último
+    dia coberto pela linha.
+    """
+    __tablename__ = "snapshots_carteira"
+
+    portfolio_id: int = Field(default=CARTEIRA_PADRAO, primary_key=True)
+    granularidade: str = Field(primary_key=True)  # "D", "S" ou "M"
+    data: date = Field(primary_key=True)
+    valor: float = 0.0
+    custo: float = 0.0
+    proventos: float = 0.0
+
+class SnapshotPending(SQLModel, table=True):
+    """
+    Carteiras cujos snapshots ficaram para trás de uma transação ou provento
+    gravado pelo caminho incremental. `desde` é o dia mais antigo afetado.
+    """
+    __tablename__ = "snapshots_pendentes"
+
+    portfolio_id: int = Field(primary_key=True)
+    desde: date
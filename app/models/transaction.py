@@ -1,13 +1,21 @@
 from datetime import date
 from typing import Optional
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, SQLModel, Index
+from app.models.portfolio import portfolio_field
 
 class Transaction(SQLModel, table=True):
     __tablename__ = "transacoes" 
+    __table_args__ = (
+        Index("ix_transacoes_carteira_ticker_data", "portfolio_id", "ticker", "data"),
+        Index("ix_transacoes_carteira_data_id", "portfolio_id", "data", "id"),  # Paginação keyset da API
+        Index("ux_transacoes_carteira_chave", "portfolio_id", "chave_importacao", unique=True),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
+    portfolio_id: int = portfolio_field()
     ticker: str = Field(index=True) 
     data: date
     quantidade: int
     preco: float
-    tipo: str  # "C" ou "V"
\ No newline at end of file
+    tipo: str  # "C" ou "V"
+    chave_importacao: Optional[str] = None  # Só em linhas importadas de extrato (ver ImportService)
\ No newline at end of file
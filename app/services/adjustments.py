@@ -0,0 +1,168 @@
+import math
+import weakref
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, Numeric, cast, func, select
+from sqlmodel import Session
+from app.db.versioning import data_version, pending_tables
+from app.models.corporate_action import CorporateAction
+
+TABELA_EVENTOS = CorporateAction.__tablename__
+CASAS_QUANTIDADE = 6  # Quantidades ajustadas são arredondadas aqui (absorve o erro do float em 1.1, 0.1...)
+
+# Fatores carregados por engine, válidos enquanto a versão de `eventos_societarios` não mudar
+_cache: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+
+def whole_shares(quantidade: float) -> int:
+    """Ações inteiras de uma quantidade ajustada (frações de bonificação/grupamento vão a leilão)."""
+    return int(math.floor(quantidade + 10 ** -CASAS_QUANTIDADE))
+
+def round_quantity_sql(expressao):
+    """
+    Arredonda uma quantidade no SQL em CASAS_QUANTIDADE.
+
+    O Postgres só tem round(numeric, integer): a expressão em ponto flutuante
+    passa por NUMERIC e volta para FLOAT.
+    """
+    return cast(func.round(cast(expressao, Numeric), CASAS_QUANTIDADE), Float)
+
+@lru_cache(maxsize=None)
+def _linha_ajustada(campos: tuple):
+    # Mesmos campos (e acesso por atributo/posição) da linha original do cursor
+    return namedtuple('LinhaAjustada', campos)
+
+class AdjustmentFactors:
+    """
+    Fatores de ajuste acumulados por ticker, para desdobramentos, grupamentos e bonificações.
+
+    Para cada ticker com eventos guarda as datas "ex" em ordem e, para cada
+    posição, o produto dos fatores daquele evento em diante. O fator de uma
+    negociação é o produto dos eventos posteriores a ela, achado por busca
+    binária; levá-la para a base atual é quantidade × fator e preço ÷ fator.
+    As transações gravadas nunca são reescritas.
+    """
+
+    def __init__(self, eventos: Iterable[Tuple[str, date, float]] = ()):
+        por_ticker: Dict[str, list] = {}
+        for ticker, data, fator in sorted(eventos, key=lambda e: (e[0], e[1])):
+            por_ticker.setdefault(ticker, []).append((data, fator))
+
+        self._tabelas: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for ticker, lista in por_ticker.items():
+            datas = np.array([d for d, _ in lista], dtype='datetime64[D]')
+            fatores = np.array([f for _, f in lista], dtype=np.float64)
+            # O 1.0 final é o fator de quem negociou depois do último evento
+            acumulado = np.r_[np.cumprod(fatores[::-1])[::-1], 1.0]
+            self._tabelas[ticker] = (datas, acumulado)
+        self._indice = pd.Index(list(self._tabelas))
+
+    def __bool__(self) -> bool:
+        return bool(self._tabelas)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._tabelas
+
+    @classmethod
+    def load(cls, session: Session) -> 'AdjustmentFactors':
+        """
+        Lê os eventos e monta os fatores, reaproveitando os do último commit.
+
+        O cache é chaveado pela versão de `eventos_societarios` no banco, que
+        também muda com eventos gravados por outros processos (corporate_action.py).
+        A versão só muda no commit, então uma sessão com eventos ainda não
+        commitados sempre lê do banco.
+        """
+        bind = session.get_bind()
+        engine = getattr(bind, 'engine', bind)
+        versao = data_version.get(session, TABELA_EVENTOS)
+        usar_cache = TABELA_EVENTOS not in pending_tables(session)
+        if usar_cache:
+            em_cache = _cache.get(engine)
+            if em_cache is not None and em_cache[0] == versao:
+                return em_cache[1]
+
+        e = CorporateAction.__table__.c
+        fatores = cls(session.execute(select(e.ticker, e.data, e.fator)).all())
+        if usar_cache:
+            _cache[engine] = (versao, fatores)
+        return fatores
+
+    def factor(self, ticker: str, data: date) -> float:
+        """Fator de uma única negociação (1.0 se não houve evento depois dela)."""
+        tabela = self._tabelas.get(ticker)
+        if tabela is None:
+            return 1.0
+        datas, acumulado = tabela
+        return float(acumulado[np.searchsorted(datas, np.datetime64(data, 'D'), side='right')])
+
+    def factors(self, tickers: Sequence[str], datas: Sequence) -> np.ndarray:
+        """Fatores de arrays paralelos de tickers e datas, com uma busca binária por ticker afetado."""
+        fatores = np.ones(len(tickers))
+        if not self._tabelas or len(tickers) == 0:
+            return fatores
+
+        codigos = self._indice.get_indexer(np.asarray(tickers, dtype=object))
+        presentes = np.unique(codigos[codigos >= 0])
+        if len(presentes) == 0:
+            return fatores
+
+        datas = np.asarray(datas).astype('datetime64[D]')
+        for codigo in presentes:
+            eventos, acumulado = self._tabelas[self._indice[codigo]]
+            mascara = codigos == codigo
+            fatores[mascara] = acumulado[np.searchsorted(eventos, datas[mascara], side='right')]
+        return fatores
+
+    def adjust_prices(self, precos: pd.DataFrame) -> pd.DataFrame:
+        """
+        Leva uma matriz datas × tickers de fechamentos brutos para a base atual
+        (preço da data ÷ fator dos eventos posteriores a ela; cópia).
+        """
+        afetados = [ticker for ticker in precos.columns if ticker in self._tabelas]
+        if not afetados:
+            return precos
+        datas = precos.index.to_numpy().astype('datetime64[D]')
+        ajustado = precos.copy()
+        for ticker in afetados:
+            eventos, acumulado = self._tabelas[ticker]
+            fatores = acumulado[np.searchsorted(eventos, datas, side='right')]
+            ajustado[ticker] = precos[ticker].to_numpy(dtype=np.float64) / fatores
+        return ajustado
+
+    @staticmethod
+    def scale_quantities(quantidades: np.ndarray, fatores: np.ndarray) -> np.ndarray:
+        return np.round(np.asarray(quantidades, dtype=np.float64) * fatores, CASAS_QUANTIDADE)
+
+    def adjust_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Leva um frame no formato COLUNAS_TRANSACAO para a base atual (cópia; o original fica intacto)."""
+        if not self._tabelas or frame.empty:
+            return frame
+        fatores = self.factors(frame['ticker'].to_numpy(), frame['data'].to_numpy())
+        if (fatores == 1.0).all():
+            return frame
+        return frame.assign(
+            quantidade=self.scale_quantities(frame['quantidade'].to_numpy(), fatores),
+            preco=frame['preco'].to_numpy(dtype=np.float64) / fatores,
+        )
+
+    def adjust_rows(self, linhas: Sequence) -> Iterator:
+        """
+        Ajusta um lote de linhas do cursor (com `ticker`, `data`, `quantidade` e
+        `preco`); as que não têm evento posterior passam sem cópia.
+        """
+        if not self._tabelas or not linhas:
+            yield from linhas
+            return
+        fatores = self.factors([l.ticker for l in linhas], [l.data for l in linhas])
+        for linha, fator in zip(linhas, fatores):
+            if fator == 1.0:
+                yield linha
+            else:
+                campos = linha._asdict()
+                campos['quantidade'] = round(linha.quantidade * fator, CASAS_QUANTIDADE)
+                campos['preco'] = linha.preco / fator
+                yield _linha_ajustada(tuple(campos))(**campos)
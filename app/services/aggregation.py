@@ -0,0 +1,268 @@
+from datetime import date
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import pandas as pd
+from sqlalchemy import Float, and_, case, cast, func, select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.metrics import timed
+from app.models.corporate_action import CorporateAction
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.transaction import Transaction
+from app.schemas.portfolio import PositionSummary
+from app.services.adjustments import AdjustmentFactors, round_quantity_sql, whole_shares
+from app.services.portfolio import CalculationService, COLUNAS_TRANSACAO
+
+# Abaixo disso exp() vira zero em double precision (e o Postgres acusa underflow)
+_LIMITE_EXP = -700.0
+
+class AggregationService:
+    """
+    Caminhos de leitura que evitam materializar `transacoes` inteira como objetos ORM.
+
+    Todos entregam as transações na base atual de ações (ajustadas pelos
+    eventos societários posteriores a cada uma).
+    """
+
+    @staticmethod
+    def positions_query(portfolio_id: int = CARTEIRA_PADRAO):
+        """
+        Monta a consulta que calcula as posições da carteira dentro do banco com window functions.
+
+        Usa a mesma formulação do motor colunar: quantidade acumulada com piso em
+        zero (soma - min(0, mínimo acumulado)), apenas o segmento após a última
+        zeragem, e custo = soma das compras escaladas pelo produto das vendas
+        seguintes (via exp(soma de ln)).
+        """
+        bruta = Transaction.__table__.c
+        e = CorporateAction.__table__.c
+
+        # Fator acumulado dos eventos posteriores à negociação (produto via exp(soma de ln))
+        fator = func.coalesce(
+            select(func.exp(func.sum(func.ln(e.fator))))
+            .where(e.ticker == bruta.ticker, e.data > bruta.data)
+            .scalar_subquery(),
+            1.0,
+        )
+        t = select(
+            bruta.ticker, bruta.data, bruta.id, bruta.tipo,
+            round_quantity_sql(bruta.quantidade * fator).label('quantidade'),
+            (bruta.preco / fator).label('preco'),
+        ).where(bruta.portfolio_id == portfolio_id).subquery('ajustadas').c
+
+        janela = {'partition_by': t.ticker, 'order_by': (t.data, t.id)}
+        delta = case((t.tipo == 'C', t.quantidade), (t.tipo == 'V', -t.quantidade), else_=0)
+
+        passo1 = select(
+            t.ticker, t.data, t.id, t.tipo, t.quantidade, t.preco,
+            func.sum(delta).over(**janela).label('soma'),
+            func.row_number().over(**janela).label('rn'),
+            func.count().over(partition_by=t.ticker).label('n'),
+        ).subquery('passo1')
+
+        piso = func.min(passo1.c.soma).over(
+            partition_by=passo1.c.ticker,
+            order_by=(passo1.c.data, passo1.c.id),
+            rows=(None, 0),
+        )
+        passo2 = select(
+            passo1,
+            (passo1.c.soma - case((piso < 0, piso), else_=0)).label('qtde'),
+        ).subquery('passo2')
+
+        janela2 = {'partition_by': passo2.c.ticker, 'order_by': (passo2.c.data, passo2.c.id)}
+        passo3 = select(
+            passo2,
+            func.lag(passo2.c.qtde, 1, 0).over(**janela2).label('qtde_anterior'),
+            func.coalesce(
+                func.max(case((passo2.c.qtde <= 0, passo2.c.rn))).over(partition_by=passo2.c.ticker), 0
+            ).label('ultimo_zero'),
+        ).subquery('passo3')
+
+        ativo = passo3.c.rn > passo3.c.ultimo_zero
+        passo4 = select(
+            passo3,
+            case(
+                (and_(ativo, passo3.c.tipo == 'V', passo3.c.qtde_anterior > 0),
+                 func.ln(cast(passo3.c.qtde, Float) / cast(passo3.c.qtde_anterior, Float))),
+                else_=0.0,
+            ).label('ln_fator'),
+            case(
+                (and_(ativo, passo3.c.tipo == 'C'), passo3.c.quantidade * passo3.c.preco),
+                else_=0.0,
+            ).label('aporte'),
+        ).subquery('passo4')
+
+        sufixo = func.coalesce(func.sum(passo4.c.ln_fator).over(
+            partition_by=passo4.c.ticker,
+            order_by=(passo4.c.data, passo4.c.id),
+            rows=(1, None),
+        ), 0.0)
+        passo5 = select(
+            passo4.c.ticker, passo4.c.data, passo4.c.id, passo4.c.rn, passo4.c.n,
+            passo4.c.qtde, passo4.c.aporte, sufixo.label('sufixo'),
+        ).subquery('passo5')
+
+        escala = case((passo5.c.sufixo < _LIMITE_EXP, 0.0), else_=func.exp(passo5.c.sufixo))
+        quantidade = func.sum(case((passo5.c.rn == passo5.c.n, passo5.c.qtde), else_=0))
+        total = func.sum(passo5.c.aporte * escala)
+
+        return (
+            select(
+                passo5.c.ticker,
+                quantidade.label('quantidade'),
+                total.label('total_investido'),
+            )
+            .group_by(passo5.c.ticker)
+            .having(quantidade > 0)
+            # Mesma ordem do laço Python: primeira aparição cronológica do ticker
+            .order_by(func.min(passo5.c.data), func.min(case((passo5.c.rn == 1, passo5.c.id))))
+        )
+
+    @staticmethod
+    @timed('aggregation.calculate_positions_sql')
+    def calculate_positions_sql(session: Session, portfolio_id: int = CARTEIRA_PADRAO) -> List[PositionSummary]:
+        """
+        Calcula as posições no banco e traz apenas uma linha final por ticker.
+        """
+        linhas = session.execute(AggregationService.positions_query(portfolio_id)).all()
+        return AggregationService._to_summaries(linhas)
+
+    @staticmethod
+    @timed('aggregation.calculate_positions_sql_async')
+    async def calculate_positions_sql_async(session: AsyncSession, portfolio_id: int = CARTEIRA_PADRAO) -> List[PositionSummary]:
+        linhas = (await session.execute(AggregationService.positions_query(portfolio_id))).all()
+        return AggregationService._to_summaries(linhas)
+
+    @staticmethod
+    def _to_summaries(linhas) -> List[PositionSummary]:
+        return [
+            PositionSummary(
+                ticker=linha.ticker,
+                quantidade=whole_shares(linha.quantidade),
+                preco_medio=float(linha.total_investido) / float(linha.quantidade),
+                total_investido=float(linha.total_investido)
+            )
+            for linha in linhas
+        ]
+
+    @staticmethod
+    def _stream_statement(
+        batch_size: int,
+        desde: Optional[date] = None,
+        ate: Optional[date] = None,
+        portfolio_id: Optional[int] = CARTEIRA_PADRAO,
+    ):
+        t = Transaction.__table__.c
+        statement = select(t.id, t.ticker, t.data, t.quantidade, t.preco, t.tipo)
+        if portfolio_id is not None:
+            statement = statement.where(t.portfolio_id == portfolio_id)
+        if desde is not None:
+            statement = statement.where(t.data >= desde)
+        if ate is not None:
+            statement = statement.where(t.data < ate)
+        return (
+            statement
+            .order_by(t.data, t.id)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+
+    @staticmethod
+    def stream_transactions(
+        session: Session,
+        batch_size: int = 10_000,
+        desde: Optional[date] = None,
+        ate: Optional[date] = None,
+        portfolio_id: Optional[int] = CARTEIRA_PADRAO,
+        ajustar: bool = True,
+    ) -> Iterator:
+        """
+        Itera sobre as transações em ordem cronológica com cursor do lado do servidor.
+
+        As linhas chegam em lotes de `batch_size` como tuplas leves (sem hidratar
+        SQLModel), então a memória fica constante independente do tamanho da tabela.
+        `desde` (inclusive) e `ate` (exclusive) limitam o intervalo de datas;
+        `portfolio_id=None` percorre todas as carteiras. Com `ajustar=False` as
+        linhas saem como gravadas, sem os eventos societários.
+        """
+        fatores = AdjustmentFactors.load(session) if ajustar else AdjustmentFactors()
+        statement = AggregationService._stream_statement(batch_size, desde, ate, portfolio_id)
+        for lote in session.execute(statement).partitions():
+            yield from fatores.adjust_rows(lote)
+
+    @staticmethod
+    def transactions_frame(
+        session: Session,
+        batch_size: int = 10_000,
+        portfolio_id: int = CARTEIRA_PADRAO,
+        desde: Optional[date] = None,
+    ) -> pd.DataFrame:
+        """
+        Carrega as transações da carteira direto no formato colunar, sem objetos ORM.
+        """
+        linhas = AggregationService.stream_transactions(session, batch_size, desde, portfolio_id=portfolio_id)
+        frame = pd.DataFrame.from_records(
+            (tuple(linha)[1:] for linha in linhas), columns=COLUNAS_TRANSACAO
+        )
+        frame['data'] = pd.to_datetime(frame['data'])
+        return frame
+
+    @staticmethod
+    async def stream_transactions_async(
+        session: AsyncSession,
+        batch_size: int = 10_000,
+        portfolio_id: Optional[int] = CARTEIRA_PADRAO,
+    ) -> AsyncIterator:
+        fatores = await session.run_sync(AdjustmentFactors.load)
+        resultado = await session.stream(
+            AggregationService._stream_statement(batch_size, portfolio_id=portfolio_id)
+        )
+        async for lote in resultado.partitions():
+            for linha in fatores.adjust_rows(lote):
+                yield linha
+
+    @staticmethod
+    def _accumulate(carteira: Dict[str, dict], t):
+        posicao = carteira.get(t.ticker)
+        if posicao is None:
+            posicao = carteira[t.ticker] = {'qtde': 0, 'total_investido': 0.0, 'pm': 0.0}
+        CalculationService.aplicar_transacao(posicao, t)
+
+    @staticmethod
+    def _carteira_to_summaries(carteira: Dict[str, dict]) -> List[PositionSummary]:
+        return [
+            PositionSummary(
+                ticker=ticker,
+                quantidade=whole_shares(dados['qtde']),
+                preco_medio=dados['pm'],
+                total_investido=dados['total_investido']
+            )
+            for ticker, dados in carteira.items()
+            if dados['qtde'] > 0
+        ]
+
+    @staticmethod
+    @timed('aggregation.calculate_positions_streaming')
+    def calculate_positions_streaming(
+        session: Session,
+        batch_size: int = 10_000,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> List[PositionSummary]:
+        """
+        Mesmo resultado de calculate_positions, consumindo a tabela em streaming.
+        """
+        carteira: Dict[str, dict] = {}
+        for t in AggregationService.stream_transactions(session, batch_size, portfolio_id=portfolio_id):
+            AggregationService._accumulate(carteira, t)
+        return AggregationService._carteira_to_summaries(carteira)
+
+    @staticmethod
+    @timed('aggregation.calculate_positions_streaming_async')
+    async def calculate_positions_streaming_async(
+        session: AsyncSession,
+        batch_size: int = 10_000,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> List[PositionSummary]:
+        carteira: Dict[str, dict] = {}
+        async for t in AggregationService.stream_transactions_async(session, batch_size, portfolio_id):
+            AggregationService._accumulate(carteira, t)
+        return AggregationService._carteira_to_summaries(carteira)
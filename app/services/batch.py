@@ -0,0 +1,153 @@
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence
+from sqlalchemy import create_engine, delete, insert, select, union
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.metrics import timed
+from app.models.earnings import Earnings
+from app.models.portfolio import RecomputeCheckpoint
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.services.adjustments import AdjustmentFactors
+from app.services.earnings import EarningsService
+from app.services.history import HistoryService
+from app.services.positions import PositionStateService
+from app.services.snapshots import SnapshotService
+
+# Tabelas derivadas reescritas pelo recálculo
+TABELAS_DERIVADAS = ('posicoes', 'posicoes_historico', 'proventos_mensais', 'snapshots_carteira')
+LOTES_POR_WORKER = 4  # Lotes menores que a fatia de cada worker equilibram carteiras grandes e pequenas
+LIMITE_LOTE = 500
+
+@dataclass
+class BatchReport:
+    """Resumo de um lote de carteiras recalculado."""
+    lote: int
+    carteiras: int
+    transacoes: int
+    segundos: float
+
+# Engine próprio de cada processo do pool (conexões não atravessam processos)
+_engine_worker: Optional[Engine] = None
+
+def _init_worker(url: str):
+    global _engine_worker
+    _engine_worker = create_engine(url, connect_args={'timeout': 60} if url.startswith('sqlite') else {})
+
+class BatchRecomputeService:
+    """
+    Recalcula posições, histórico, agregados de proventos e snapshots de todas as carteiras.
+
+    As carteiras pendentes são divididas em lotes distribuídos num pool de
+    processos; cada lote é gravado em massa e marcado no checkpoint na mesma
+    transação. Se a execução cair, a próxima com o mesmo `job` pula o que já
+    foi concluído. O checkpoint é limpo quando todas as carteiras terminam.
+    """
+
+    @staticmethod
+    def portfolio_ids(session: Session) -> List[int]:
+        """Todas as carteiras com dados de origem ou estado derivado."""
+        consulta = union(
+            select(Transaction.portfolio_id),
+            select(Earnings.portfolio_id),
+            select(Position.portfolio_id),
+        )
+        return sorted(session.execute(consulta).scalars())
+
+    @staticmethod
+    def pending(session: Session, job: str) -> List[int]:
+        concluidas = set(session.execute(
+            select(RecomputeCheckpoint.portfolio_id).where(RecomputeCheckpoint.job == job)
+        ).scalars())
+        return [p for p in BatchRecomputeService.portfolio_ids(session) if p not in concluidas]
+
+    @staticmethod
+    def chunk(ids: Sequence[int], workers: int, chunk_size: Optional[int] = None) -> List[List[int]]:
+        """Fatia as carteiras em lotes; sem `chunk_size`, ~LOTES_POR_WORKER lotes por core."""
+        if chunk_size is None:
+            chunk_size = min(LIMITE_LOTE, max(1, math.ceil(len(ids) / (workers * LOTES_POR_WORKER))))
+        return [list(ids[i:i + chunk_size]) for i in range(0, len(ids), chunk_size)]
+
+    @staticmethod
+    @timed('batch.recompute_chunk')
+    def recompute_chunk(session: Session, ids: Sequence[int], job: str) -> int:
+        """Refaz o estado derivado das carteiras e registra o checkpoint (sem commit)."""
+        transacoes = PositionStateService.rebuild(session, portfolio_ids=ids)
+        EarningsService.rebuild_monthly(session, portfolio_ids=ids)
+        # Eventos e histórico de mercado são os mesmos para todas as carteiras: lidos uma vez por lote
+        fatores = AdjustmentFactors.load(session)
+        precos = HistoryService.load_price_history(fatores=fatores) if settings.PRICE_HISTORY_FILE else None
+        for portfolio_id in ids:
+            SnapshotService.refresh(session, portfolio_id, precos=precos, fatores=fatores)
+        agora = datetime.now(timezone.utc)
+        session.execute(
+            insert(RecomputeCheckpoint),
+            [{'job': job, 'portfolio_id': p, 'concluido_em': agora} for p in ids],
+        )
+        return transacoes
+
+    @staticmethod
+    def _executar_lote(ids: List[int], job: str) -> tuple:
+        """Ponto de entrada nos processos do pool: um lote por transação."""
+        inicio = time.perf_counter()
+        with Session(_engine_worker) as session:
+            transacoes = BatchRecomputeService.recompute_chunk(session, ids, job)
+            session.commit()
+        return len(ids), transacoes, time.perf_counter() - inicio
+
+    @staticmethod
+    def recompute_all(
+        engine: Engine,
+        job: str = 'recalculo',
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        restart: bool = False,
+    ) -> Iterator[BatchReport]:
+        """
+        Recalcula todas as carteiras pendentes do `job`, produzindo um BatchReport por lote.
+
+        `workers` usa todos os cores por padrão; com 1 (ou menos) os lotes rodam
+        no próprio processo. `restart=True` descarta o checkpoint anterior.
+        """
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+
+        with Session(engine) as session:
+            if restart:
+                session.execute(delete(RecomputeCheckpoint).where(RecomputeCheckpoint.job == job))
+                session.commit()
+            pendentes = BatchRecomputeService.pending(session, job)
+
+        lotes = BatchRecomputeService.chunk(pendentes, max(workers, 1), chunk_size)
+
+        if workers <= 1:
+            for numero, ids in enumerate(lotes, start=1):
+                inicio = time.perf_counter()
+                with Session(engine) as session:
+                    transacoes = BatchRecomputeService.recompute_chunk(session, ids, job)
+                    session.commit()
+                yield BatchReport(numero, len(ids), transacoes, time.perf_counter() - inicio)
+        elif lotes:
+            url = engine.url.render_as_string(hide_password=False)
+            # spawn: os filhos não herdam o pool de conexões do processo pai
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(lotes)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(url,),
+            ) as pool:
+                futuros = [pool.submit(BatchRecomputeService._executar_lote, ids, job) for ids in lotes]
+                for numero, futuro in enumerate(as_completed(futuros), start=1):
+                    carteiras, transacoes, segundos = futuro.result()
+                    yield BatchReport(numero, carteiras, transacoes, segundos)
+
+        # Execução completa: a próxima começa do zero
+        with Session(engine) as session:
+            session.execute(delete(RecomputeCheckpoint).where(RecomputeCheckpoint.job == job))
+            session.commit()
@@ -0,0 +1,95 @@
+from datetime import date
+from typing import Dict, Optional, Union
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+
+Data = Union[date, pd.Timestamp, np.datetime64]
+
+class BenchmarkIndex:
+    """
+    Índice acumulado de um benchmark em calendário diário denso.
+
+    indice[k] é o fator acumulado ao fim do dia `inicio + k`. Como o calendário
+    é denso, localizar uma data é só uma subtração de ordinais, e o retorno
+    entre duas datas é uma divisão: O(1) por consulta.
+    """
+
+    def __init__(self, inicio: np.datetime64, fatores_diarios: np.ndarray):
+        self.inicio = np.datetime64(inicio, 'D')
+        self.indice = np.cumprod(fatores_diarios)
+        self.fim = self.inicio + np.timedelta64(len(self.indice) - 1, 'D')
+
+    @classmethod
+    def from_daily_rates(cls, taxas: pd.Series) -> 'BenchmarkIndex':
+        """Taxas diárias em % (ex.: CDI). Dias sem taxa (fins de semana) rendem zero."""
+        taxas = taxas.sort_index()
+        calendario = pd.date_range(taxas.index[0], taxas.index[-1], freq='D')
+        fatores = 1 + taxas.reindex(calendario, fill_value=0.0).to_numpy(dtype=np.float64) / 100
+        return cls(calendario[0].to_datetime64(), fatores)
+
+    @classmethod
+    def from_monthly_rates(cls, taxas: pd.Series) -> 'BenchmarkIndex':
+        """Taxas mensais em % (ex.: IPCA), distribuídas pro rata die dentro do mês."""
+        taxas = taxas.sort_index()
+        meses = taxas.index.to_period('M')
+        calendario = pd.date_range(meses[0].start_time, meses[-1].end_time.normalize(), freq='D')
+        mensal = pd.Series(taxas.to_numpy(dtype=np.float64), index=meses)
+        por_dia = mensal.reindex(calendario.to_period('M')).to_numpy()
+        fatores = (1 + por_dia / 100) ** (1 / calendario.days_in_month.to_numpy())
+        return cls(calendario[0].to_datetime64(), fatores)
+
+    def _posicoes(self, datas) -> np.ndarray:
+        dias = (np.asarray(datas, dtype='datetime64[D]') - self.inicio).astype(np.int64)
+        return np.clip(dias, 0, len(self.indice) - 1)
+
+    def accumulated_return(self, a: Data, b: Data) -> float:
+        """Retorno acumulado entre o fim do dia `a` e o fim do dia `b` (0.05 = 5%)."""
+        i, j = self._posicoes([a, b])
+        return float(self.indice[j] / self.indice[i] - 1)
+
+    def rebase(self, datas, valor_inicial: float) -> np.ndarray:
+        """Curva do benchmark nas `datas`, começando em `valor_inicial` na primeira data."""
+        posicoes = self._posicoes(datas)
+        if len(posicoes) == 0:
+            return np.empty(0)
+        return valor_inicial * self.indice[posicoes] / self.indice[posicoes[0]]
+
+class BenchmarkStore:
+    """Conjunto de benchmarks carregado uma única vez por processo."""
+
+    def __init__(self, indices: Optional[Dict[str, BenchmarkIndex]] = None):
+        self.indices = indices or {}
+
+    @staticmethod
+    def _read_rates(path: str) -> pd.Series:
+        """CSV com colunas data,taxa (taxa em %)."""
+        tabela = pd.read_csv(path, parse_dates=['data'])
+        return tabela.set_index('data')['taxa']
+
+    @classmethod
+    def from_files(cls, cdi_file: Optional[str] = None, ipca_file: Optional[str] = None) -> 'BenchmarkStore':
+        indices = {}
+        if cdi_file:
+            indices['cdi'] = BenchmarkIndex.from_daily_rates(cls._read_rates(cdi_file))
+        if ipca_file:
+            indices['ipca'] = BenchmarkIndex.from_monthly_rates(cls._read_rates(ipca_file))
+        return cls(indices)
+
+    def __contains__(self, nome: str) -> bool:
+        return nome in self.indices
+
+    def accumulated_return(self, nome: str, a: Data, b: Data) -> float:
+        return self.indices[nome].accumulated_return(a, b)
+
+    def rebase(self, nome: str, datas, valor_inicial: float) -> np.ndarray:
+        return self.indices[nome].rebase(datas, valor_inicial)
+
+_benchmark_store: Optional[BenchmarkStore] = None
+
+def get_benchmark_store() -> BenchmarkStore:
+    """Store global, carregado dos arquivos configurados no Settings."""
+    global _benchmark_store
+    if _benchmark_store is None:
+        _benchmark_store = BenchmarkStore.from_files(settings.CDI_FILE, settings.IPCA_FILE)
+    return _benchmark_store
@@ -0,0 +1,90 @@
+from typing import Dict, List
+from sqlalchemy import func, select, update
+from sqlmodel import Session
+from app.core.metrics import timed
+from app.models.corporate_action import BONIFICACAO, DESDOBRAMENTO, GRUPAMENTO, CorporateAction
+from app.models.position import Position, PositionHistory
+from app.models.transaction import Transaction
+from app.services.adjustments import AdjustmentFactors, round_quantity_sql
+from app.services.positions import PositionStateService
+from app.services.snapshots import SnapshotService
+
+TIPOS: Dict[str, str] = {
+    'desdobramento': DESDOBRAMENTO,
+    'grupamento': GRUPAMENTO,
+    'bonificacao': BONIFICACAO,
+}
+
+class CorporateActionService:
+    """
+    Registro de desdobramentos, grupamentos e bonificações.
+
+    As transações nunca são reescritas: a leitura aplica os fatores acumulados
+    (AdjustmentFactors). Um evento novo só mexe no estado derivado do próprio
+    ticker: o histórico anterior à data "ex" e as posições sem negociação desde
+    então mudam de base com um UPDATE; carteiras que negociaram a partir do
+    "ex" refazem o ticker só desse ponto em diante.
+    """
+
+    @staticmethod
+    def validate(acao: CorporateAction):
+        if acao.tipo not in TIPOS.values():
+            raise ValueError(f"Tipo de evento inválido: {acao.tipo!r}")
+        if not acao.fator or acao.fator <= 0:
+            raise ValueError("O fator do evento deve ser positivo")
+        if acao.tipo == GRUPAMENTO and acao.fator >= 1:
+            raise ValueError("Grupamento reduz a quantidade: use fator < 1 (ex.: 10 para 1 = 0.1)")
+        if acao.tipo in (DESDOBRAMENTO, BONIFICACAO) and acao.fator <= 1:
+            raise ValueError("Desdobramento e bonificação aumentam a quantidade: use fator > 1")
+
+    @staticmethod
+    @timed('corporate_actions.register')
+    def register(session: Session, acao: CorporateAction) -> List[int]:
+        """
+        Grava o evento e leva o estado derivado do ticker para a nova base (sem commit).
+        Retorna as carteiras afetadas.
+        """
+        CorporateActionService.validate(acao)
+        acao.ticker = acao.ticker.upper()
+        session.add(acao)
+        session.flush()
+
+        ticker, ex, fator = acao.ticker, acao.data, acao.fator
+        # Fechamentos anteriores ao "ex": mesma posição, expressa na nova base
+        session.execute(
+            update(PositionHistory)
+            .where(PositionHistory.ticker == ticker, PositionHistory.data < ex)
+            .values(
+                quantidade=round_quantity_sql(PositionHistory.quantidade * fator),
+                preco_medio=PositionHistory.preco_medio / fator,
+            )
+        )
+
+        t = Transaction.__table__.c
+        carteiras = list(session.execute(select(t.portfolio_id).where(t.ticker == ticker).distinct()).scalars())
+        negociaram_depois = set(session.execute(
+            select(t.portfolio_id).where(t.ticker == ticker, t.data >= ex).distinct()
+        ).scalars())
+
+        # Negociações a partir do "ex" foram aplicadas sobre a base antiga: refaz o ticker dali em diante
+        fatores = AdjustmentFactors.load(session)
+        for portfolio_id in sorted(negociaram_depois):
+            PositionStateService.replay_from(session, ticker, ex, portfolio_id, fatores)
+
+        # As demais só mudam de base (o custo total não muda)
+        session.execute(
+            update(Position)
+            .where(
+                Position.ticker == ticker,
+                Position.ultima_data < ex,
+                Position.portfolio_id.not_in(negociaram_depois),
+            )
+            .values(
+                quantidade=round_quantity_sql(Position.quantidade * fator),
+                preco_medio=Position.preco_medio / fator,
+            )
+        )
+
+        for portfolio_id in carteiras:
+            SnapshotService.refresh(session, portfolio_id, desde=ex)
+        return sorted(carteiras)
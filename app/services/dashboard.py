@@ -0,0 +1,217 @@
+import asyncio
+import time
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.core.metrics import timed
+from app.db.session import async_session_factory, engine
+from app.db.versioning import data_version
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.schemas.portfolio import PositionSummary
+from app.services.adjustments import AdjustmentFactors
+from app.services.aggregation import AggregationService
+from app.services.benchmarks import get_benchmark_store
+from app.services.earnings import EarningsService
+from app.services.history import HistoryService
+from app.services.portfolio import CalculationService
+from app.services.positions import PositionStateService
+from app.services.positions_index import PositionsIndex, market_value
+from app.services.quotes import get_quote_cache
+from app.services.snapshots import SnapshotService
+
+# Tabelas cujas mudanças invalidam o view model
+TABELAS_DASHBOARD = (
+    'transacoes', 'proventos', 'proventos_mensais', 'posicoes', 'snapshots_carteira', 'eventos_societarios',
+)
+
+@dataclass
+class DashboardViewModel:
+    """Tudo o que o dashboard exibe, calculado uma vez por versão dos dados."""
+    versao: tuple
+    criado_em: float
+    posicoes: List[PositionSummary]
+    total_investido: float
+    saldo_atual: float
+    total_proventos: float
+    yield_on_cost: float  # Últimos 12 meses, em %
+    historico: pd.Series
+    # Séries pré-agregadas por opção do seletor, lidas de `snapshots_carteira`
+    historicos: Dict[str, pd.Series] = field(default_factory=dict, repr=False)
+    # Preços recentes por ticker (sparklines) e a versão da fonte de onde vieram
+    precos_recentes: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)
+    versao_precos: tuple = ()
+    # Cache por período, compartilhado por todos os clientes desta versão
+    graficos: Dict[str, dict] = field(default_factory=dict, repr=False)
+
+    @cached_property
+    def positions_index(self) -> PositionsIndex:
+        """Índice de ordenação/filtro da tabela de posições, montado uma vez por versão."""
+        return PositionsIndex(self.posicoes)
+
+    @property
+    def lucro_total(self) -> float:
+        return self.saldo_atual - self.total_investido
+
+    @property
+    def rentabilidade_geral(self) -> float:
+        return (self.lucro_total / self.total_investido * 100) if self.total_investido > 0 else 0
+
+    def period_history(self, periodo: str) -> pd.Series:
+        """Valor da carteira no período: snapshots quando existem, senão o recorte do histórico calculado."""
+        if periodo in self.historicos:
+            return self.historicos[periodo]
+        return HistoryService.slice_period(self.historico, periodo)
+
+    def chart_series(self, periodo: str) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Rótulos e séries (carteira + benchmarks rebaseados) de um período."""
+        carteira = self.period_history(periodo)
+        series = {'carteira': carteira.to_numpy()}
+
+        # Benchmarks rebaseados no valor inicial da carteira no período
+        if len(carteira):
+            benchmarks = get_benchmark_store()
+            for nome in ('cdi', 'ipca'):
+                if nome in benchmarks:
+                    series[nome] = benchmarks.rebase(nome, carteira.index, carteira.iloc[0])
+
+        return carteira.index.strftime('%d/%m/%y').tolist(), series
+
+class DashboardService:
+    """
+    Cache do view model compartilhado entre todos os clientes conectados.
+
+    O view model é reconstruído apenas quando a versão dos dados no banco muda
+    (commit em transações/proventos/posições). Cotação nova ou expirada só
+    reavalia as posições a mercado, reaproveitando o resto. Reconstruções
+    simultâneas são coalescidas.
+    """
+
+    _cache: Optional[DashboardViewModel] = None
+    _lock: Optional[asyncio.Lock] = None
+    # (versão da fonte, preços recentes): sobrevive às reconstruções por cotação nova
+    _precos: Optional[Tuple[tuple, Dict[str, np.ndarray]]] = None
+
+    @staticmethod
+    async def current_version(session) -> tuple:
+        """Versão das tabelas no banco (vale para commits de qualquer processo) e, por último, das cotações em cache."""
+        return (*await data_version.key_async(session, TABELAS_DASHBOARD), get_quote_cache().version)
+
+    @classmethod
+    def _valido(cls, vm: Optional[DashboardViewModel], versao: tuple) -> bool:
+        return (
+            vm is not None
+            and vm.versao == versao
+            and time.monotonic() - vm.criado_em < settings.QUOTES_TTL_SECONDS
+        )
+
+    @classmethod
+    async def get_view_model(cls) -> DashboardViewModel:
+        async with async_session_factory() as session:
+            versao = await cls.current_version(session)
+        if cls._valido(cls._cache, versao):
+            return cls._cache
+
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            # Transações/proventos do caminho incremental deixam os snapshots marcados
+            await SnapshotService.apply_pending_async(engine, CARTEIRA_PADRAO)
+            async with async_session_factory() as session:
+                versao = await cls.current_version(session)
+            vm = cls._cache
+            if vm is None or vm.versao[:-1] != versao[:-1]:
+                cls._cache = await cls.build_view_model(versao)
+            elif not cls._valido(vm, versao):
+                cls._cache = await cls.requote_view_model(vm)
+        return cls._cache
+
+    @staticmethod
+    async def requote_view_model(vm: DashboardViewModel) -> DashboardViewModel:
+        """
+        Mesmo view model com as posições reavaliadas pelas cotações atuais.
+
+        As posições são copiadas: clientes ainda renderizando o anterior não
+        veem a lista mudar no meio. Histórico, preços e gráficos são os mesmos.
+        """
+        quotes = get_quote_cache()
+        posicoes = await CalculationService.enrich_positions_async([p.model_copy() for p in vm.posicoes], quotes)
+        return replace(
+            vm,
+            versao=(*vm.versao[:-1], quotes.version),
+            criado_em=time.monotonic(),
+            posicoes=posicoes,
+            saldo_atual=sum(market_value(p) for p in posicoes),
+        )
+
+    @staticmethod
+    def _historico(frame: pd.DataFrame, fatores: AdjustmentFactors) -> pd.Series:
+        if frame.empty:
+            return pd.Series(dtype=float, name='carteira')
+        return HistoryService.portfolio_value(frame, HistoryService.price_matrix(frame, fatores=fatores))
+
+    @staticmethod
+    async def price_source_version(session) -> tuple:
+        """Versão da fonte de preços históricos: mtime do arquivo ou das transações."""
+        if settings.PRICE_HISTORY_FILE:
+            # Os fechamentos do arquivo são ajustados pelos eventos societários na leitura
+            return ('arquivo', Path(settings.PRICE_HISTORY_FILE).stat().st_mtime,
+                    *await data_version.key_async(session, ('eventos_societarios',)))
+        # Preços de negociação saem ajustados pelos eventos societários
+        return ('transacoes', *await data_version.key_async(session, ('transacoes', 'eventos_societarios')))
+
+    @classmethod
+    async def _precos_recentes(
+        cls, session, frame: Optional[pd.DataFrame], fatores: AdjustmentFactors,
+    ) -> Tuple[tuple, Dict[str, np.ndarray]]:
+        """Preços das sparklines, relidos só quando a fonte muda."""
+        versao = await cls.price_source_version(session)
+        if cls._precos is None or cls._precos[0] != versao:
+            if settings.PRICE_HISTORY_FILE:
+                precos = await asyncio.to_thread(HistoryService.load_price_history, None, fatores)
+            else:
+                if frame is None:
+                    frame = await session.run_sync(AggregationService.transactions_frame)
+                precos = await asyncio.to_thread(HistoryService.trade_price_matrix, frame)
+            cls._precos = (versao, HistoryService.recent_prices(precos))
+        return cls._precos
+
+    @staticmethod
+    @timed('dashboard.build_view_model')
+    async def build_view_model(versao: tuple) -> DashboardViewModel:
+        async with async_session_factory() as session:
+            posicoes = await PositionStateService.current_positions_async(session)
+            total_proventos = await EarningsService.total_async(session)
+            yield_on_cost, _ = await EarningsService.trailing_yield_on_cost_async(session, posicoes)
+            historicos = await session.run_sync(SnapshotService.load_periods)
+            fatores = await session.run_sync(AdjustmentFactors.load)
+            frame = None
+            if historicos:
+                historico = historicos['Tempo máximo']
+            else:
+                # Sem snapshots ainda: calcula a série a partir das transações
+                frame = await session.run_sync(AggregationService.transactions_frame)
+            versao_precos, precos_recentes = await DashboardService._precos_recentes(session, frame, fatores)
+
+        await CalculationService.enrich_positions_async(posicoes, get_quote_cache())
+        if not historicos:
+            historico = await asyncio.to_thread(DashboardService._historico, frame, fatores)
+
+        saldo_atual = sum(market_value(p) for p in posicoes)
+
+        return DashboardViewModel(
+            versao=versao,
+            criado_em=time.monotonic(),
+            posicoes=posicoes,
+            total_investido=sum(p.total_investido for p in posicoes),
+            saldo_atual=saldo_atual,
+            total_proventos=total_proventos,
+            yield_on_cost=yield_on_cost,
+            historico=historico,
+            historicos=historicos,
+            precos_recentes=precos_recentes,
+            versao_precos=versao_precos,
+        )
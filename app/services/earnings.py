@@ -0,0 +1,174 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.earnings import Earnings, EarningsMonthly
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.schemas.portfolio import PositionSummary
+
+def month_start(dia: date) -> date:
+    return dia.replace(day=1)
+
+def add_months(mes: date, n: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+class EarningsService:
+    """
+    Análise de proventos (dividendos e JCP) sobre agregados mensais.
+
+    As consultas leem `proventos_mensais` (uma linha por carteira/ticker/mês/tipo),
+    cujo tamanho cresce com meses × tickers e não com o número de eventos. Janelas
+    são alinhadas por mês: `inicio` e `fim` valem pelo mês em que caem.
+    """
+
+    @staticmethod
+    def record_earning(session: Session, e: Earnings) -> EarningsMonthly:
+        """Persiste o provento e atualiza o agregado do mês em O(1)."""
+        from app.services.snapshots import SnapshotService  # snapshots importa este módulo
+
+        session.add(e)
+        SnapshotService.mark_stale(session, e.portfolio_id, e.data)
+        chave = (e.portfolio_id, e.ticker, month_start(e.data), e.tipo)
+        mensal = session.get(EarningsMonthly, chave) or EarningsMonthly(
+            portfolio_id=chave[0], ticker=chave[1], mes=chave[2], tipo=chave[3]
+        )
+        mensal.valor_total += e.valor_total
+        mensal.eventos += 1
+        session.add(mensal)
+        return mensal
+
+    @staticmethod
+    def _mes_expr(session: Session):
+        coluna = Earnings.__table__.c.data
+        if session.get_bind().dialect.name == 'postgresql':
+            return cast(func.date_trunc('month', coluna), Date)
+        return func.date(coluna, 'start of month')
+
+    @staticmethod
+    def rebuild_monthly(session: Session, portfolio_ids: Optional[Sequence[int]] = None):
+        """
+        Recalcula os agregados com um único INSERT ... SELECT GROUP BY.
+        Com `portfolio_ids`, refaz apenas essas carteiras.
+        """
+        c = Earnings.__table__.c
+        mes = EarningsService._mes_expr(session).label('mes')
+        agregados = select(
+            c.portfolio_id, c.ticker, mes, c.tipo, func.sum(c.valor_total), func.count()
+        ).group_by(c.portfolio_id, c.ticker, mes, c.tipo)
+        apagar = delete(EarningsMonthly)
+        if portfolio_ids is not None:
+            agregados = agregados.where(c.portfolio_id.in_(portfolio_ids))
+            apagar = apagar.where(EarningsMonthly.portfolio_id.in_(portfolio_ids))
+
+        session.execute(apagar)
+        session.execute(
+            insert(EarningsMonthly).from_select(
+                ['portfolio_id', 'ticker', 'mes', 'tipo', 'valor_total', 'eventos'], agregados
+            )
+        )
+
+    @staticmethod
+    def _janela(statement, inicio: Optional[date], fim: Optional[date], portfolio_id: int):
+        statement = statement.where(EarningsMonthly.portfolio_id == portfolio_id)
+        if inicio is not None:
+            statement = statement.where(EarningsMonthly.mes >= month_start(inicio))
+        if fim is not None:
+            statement = statement.where(EarningsMonthly.mes <= month_start(fim))
+        return statement
+
+    @staticmethod
+    def income_by_ticker(
+        session: Session,
+        inicio: Optional[date] = None,
+        fim: Optional[date] = None,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> Dict[str, float]:
+        statement = select(EarningsMonthly.ticker, func.sum(EarningsMonthly.valor_total)) \
+            .group_by(EarningsMonthly.ticker)
+        linhas = session.execute(EarningsService._janela(statement, inicio, fim, portfolio_id)).all()
+        return {ticker: float(total) for ticker, total in linhas}
+
+    @staticmethod
+    def income_by_month(
+        session: Session,
+        inicio: Optional[date] = None,
+        fim: Optional[date] = None,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> List[dict]:
+        """Série mensal com a divisão DIV x JCP: [{'mes', 'DIV', 'JCP', 'total'}]."""
+        statement = select(EarningsMonthly.mes, EarningsMonthly.tipo, func.sum(EarningsMonthly.valor_total)) \
+            .group_by(EarningsMonthly.mes, EarningsMonthly.tipo) \
+            .order_by(EarningsMonthly.mes)
+        meses: Dict[date, Dict[str, float]] = defaultdict(lambda: {'DIV': 0.0, 'JCP': 0.0})
+        for mes, tipo, total in session.execute(EarningsService._janela(statement, inicio, fim, portfolio_id)):
+            meses[mes][tipo] = meses[mes].get(tipo, 0.0) + float(total)
+        return [
+            {'mes': mes, **valores, 'total': sum(valores.values())}
+            for mes, valores in meses.items()
+        ]
+
+    @staticmethod
+    def split_by_type(
+        session: Session,
+        inicio: Optional[date] = None,
+        fim: Optional[date] = None,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> Dict[str, float]:
+        statement = select(EarningsMonthly.tipo, func.sum(EarningsMonthly.valor_total)) \
+            .group_by(EarningsMonthly.tipo)
+        return {tipo: float(total) for tipo, total in session.execute(EarningsService._janela(statement, inicio, fim, portfolio_id))}
+
+    @staticmethod
+    def total(
+        session: Session,
+        inicio: Optional[date] = None,
+        fim: Optional[date] = None,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> float:
+        statement = select(func.sum(EarningsMonthly.valor_total))
+        return float(session.execute(EarningsService._janela(statement, inicio, fim, portfolio_id)).scalar() or 0.0)
+
+    @staticmethod
+    def trailing_yield_on_cost(
+        session: Session,
+        posicoes: List[PositionSummary],
+        referencia: Optional[date] = None,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> Tuple[float, Dict[str, float]]:
+        """
+        Yield on cost dos últimos 12 meses (em %), total e por ticker em carteira.
+        A janela cobre os 12 meses terminados no mês de `referencia` (hoje por padrão).
+        """
+        fim = month_start(referencia or date.today())
+        recebido = EarningsService.income_by_ticker(session, add_months(fim, -11), fim, portfolio_id)
+
+        por_ticker = {
+            p.ticker: (recebido.get(p.ticker, 0.0) / p.total_investido * 100) if p.total_investido > 0 else 0.0
+            for p in posicoes
+        }
+        investido = sum(p.total_investido for p in posicoes)
+        total = sum(recebido.get(p.ticker, 0.0) for p in posicoes)
+        return ((total / investido * 100) if investido > 0 else 0.0), por_ticker
+
+    # Variantes assíncronas para o dashboard/API
+
+    @staticmethod
+    async def total_async(
+        session: AsyncSession,
+        inicio: Optional[date] = None,
+        fim: Optional[date] = None,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> float:
+        return await session.run_sync(EarningsService.total, inicio, fim, portfolio_id)
+
+    @staticmethod
+    async def trailing_yield_on_cost_async(
+        session: AsyncSession,
+        posicoes: List[PositionSummary],
+        referencia: Optional[date] = None,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ):
+        return await session.run_sync(EarningsService.trailing_yield_on_cost, posicoes, referencia, portfolio_id)
@@ -0,0 +1,163 @@
+from datetime import date
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+from app.services.adjustments import AdjustmentFactors
+
+# Opções do seletor de período do dashboard (None = todo o histórico)
+PERIODOS: Dict[str, Optional[pd.DateOffset]] = {
+    '1 mês': pd.DateOffset(months=1),
+    '6 meses': pd.DateOffset(months=6),
+    '1 ano': pd.DateOffset(years=1),
+    '5 anos': pd.DateOffset(years=5),
+    '10 anos': pd.DateOffset(years=10),
+    'Tempo máximo': None,
+}
+
+SPARKLINE_DIAS = 90  # Janela de preços das sparklines da tabela de posições
+
+def period_start(fim: date, periodo: str, inicio_historico: Optional[date] = None) -> Optional[pd.Timestamp]:
+    """Data inicial de uma opção do seletor de período."""
+    offset = PERIODOS[periodo]
+    if offset is None:
+        return pd.Timestamp(inicio_historico) if inicio_historico else None
+    return pd.Timestamp(fim) - offset
+
+class HistoryService:
+    """
+    Série histórica do valor de mercado da carteira.
+
+    Tudo é feito como matriz datas × tickers: os deltas de quantidade são
+    somados por dia, acumulados ao longo do eixo do tempo e multiplicados
+    pelos preços alinhados. Não há laço Python por dia nem por ticker.
+    """
+
+    @staticmethod
+    def load_price_history(path: Optional[str] = None, fatores: Optional[AdjustmentFactors] = None) -> pd.DataFrame:
+        """
+        Lê um CSV longo (data,ticker,preco) e devolve a matriz datas × tickers.
+
+        O arquivo traz fechamentos brutos; com `fatores`, os preços anteriores a
+        cada evento societário são levados para a base atual, a mesma das
+        quantidades (sem isso um desdobramento vira uma queda falsa na data ex).
+        """
+        path = path or settings.PRICE_HISTORY_FILE
+        longo = pd.read_csv(path, parse_dates=['data'])
+        precos = longo.pivot_table(index='data', columns='ticker', values='preco', aggfunc='last').sort_index()
+        return fatores.adjust_prices(precos) if fatores else precos
+
+    @staticmethod
+    def trade_price_matrix(frame: pd.DataFrame, fim: Optional[date] = None) -> pd.DataFrame:
+        """
+        Matriz de preços diária usando o preço da última negociação de cada ticker.
+        Fallback para quando não há histórico de mercado configurado.
+        """
+        if frame.empty:
+            return pd.DataFrame()
+        datas = pd.to_datetime(frame['data'])
+        calendario = pd.date_range(datas.min(), pd.Timestamp(fim or date.today()), freq='D')
+        return (
+            frame.assign(data=datas)
+            .pivot_table(index='data', columns='ticker', values='preco', aggfunc='last')
+            .reindex(calendario)
+            .ffill()
+        )
+
+    @staticmethod
+    def price_matrix(
+        frame: pd.DataFrame,
+        fim: Optional[date] = None,
+        fatores: Optional[AdjustmentFactors] = None,
+    ) -> pd.DataFrame:
+        """
+        Histórico de mercado configurado (ajustado por `fatores`) ou, na falta
+        dele, o preço das negociações (`frame` já vem na base atual).
+        """
+        if settings.PRICE_HISTORY_FILE:
+            return HistoryService.load_price_history(fatores=fatores)
+        return HistoryService.trade_price_matrix(frame, fim)
+
+    @staticmethod
+    def recent_prices(precos: pd.DataFrame, dias: int = SPARKLINE_DIAS) -> Dict[str, np.ndarray]:
+        """Preços dos últimos `dias` de cada ticker da matriz, sem buracos."""
+        if precos.empty:
+            return {}
+        # Preenche antes de recortar: o último preço anterior à janela ainda vale nela
+        precos = precos.sort_index().ffill()
+        recorte = precos[precos.index >= precos.index[-1] - pd.Timedelta(days=dias)]
+        return {
+            ticker: valores[~np.isnan(valores)]
+            for ticker, valores in zip(recorte.columns, recorte.to_numpy(dtype=np.float64).T)
+        }
+
+    @staticmethod
+    def holdings_matrix(frame: pd.DataFrame, datas: pd.DatetimeIndex, tickers: pd.Index) -> np.ndarray:
+        """
+        Quantidade em carteira ao fim de cada data do calendário, por ticker.
+
+        `frame` segue COLUNAS_TRANSACAO, na ordem (data, id) das transações.
+        Transações em dias sem pregão contam no próximo dia do calendário; as
+        anteriores ao calendário entram no primeiro dia. Transações posteriores
+        à última data são um erro: o calendário precisa cobri-las.
+        """
+        # Quantidades ajustadas por eventos societários podem ser fracionárias
+        tipo = np.float64 if not frame.empty and frame['quantidade'].dtype.kind == 'f' else np.int64
+        if frame.empty or len(datas) == 0:
+            return np.zeros((len(datas), len(tickers)), dtype=tipo)
+
+        dias = pd.to_datetime(frame['data']).to_numpy(dtype='datetime64[D]')
+        linhas = datas.searchsorted(dias, side='left')
+        if (linhas >= len(datas)).any():
+            raise ValueError(
+                f"Há transações depois do fim do calendário ({datas[-1].date()}); estenda o calendário"
+            )
+
+        colunas = tickers.get_indexer(frame['ticker'])
+        validas = colunas >= 0
+        sinal = np.select([frame['tipo'] == 'C', frame['tipo'] == 'V'], [1, -1], 0)
+        delta = (frame['quantidade'].to_numpy(dtype=tipo) * sinal)[validas]
+        linhas, colunas, dias = linhas[validas], colunas[validas], dias[validas]
+
+        # Mesma regra de zerar do cálculo de posições, transação a transação:
+        # q_k = max(q_{k-1} + d_k, 0) == S_k - min(0, min_{j<=k} S_j) dentro de cada ticker.
+        # A ordenação estável por (ticker, data) preserva a ordem de entrada no mesmo dia
+        ordem = np.lexsort((dias, colunas))
+        linhas, colunas = linhas[ordem], colunas[ordem]
+        grupos = pd.Series(colunas)
+        soma = pd.Series(delta[ordem]).groupby(grupos).cumsum().to_numpy()
+        piso = pd.Series(soma).groupby(grupos).cummin().to_numpy()
+        qtde = soma - np.minimum(piso, 0)
+
+        # Fechamento de cada dia = quantidade após a última transação do (ticker, dia);
+        # dias sem transação repetem o fechamento anterior
+        ultima = np.r_[(colunas[1:] != colunas[:-1]) | (linhas[1:] != linhas[:-1]), True]
+        fechamentos = np.full((len(datas), len(tickers)), np.nan)
+        fechamentos[linhas[ultima], colunas[ultima]] = qtde[ultima]
+        return pd.DataFrame(fechamentos).ffill().fillna(0).to_numpy(dtype=tipo)
+
+    @staticmethod
+    def portfolio_value(frame: pd.DataFrame, precos: pd.DataFrame) -> pd.Series:
+        """
+        Valor de mercado diário da carteira no calendário de `precos`.
+
+        `precos` é datas × tickers (ex.: load_price_history); buracos são
+        preenchidos com o último preço conhecido.
+        """
+        precos = precos.sort_index().ffill()
+        if not frame.empty and not precos.empty:
+            # Negociações depois do último preço: o calendário vai até elas, com o último preço conhecido
+            ultima = pd.Timestamp(pd.to_datetime(frame['data']).max())
+            if ultima > precos.index[-1]:
+                precos = precos.reindex(precos.index.union(pd.DatetimeIndex([ultima]))).ffill()
+        quantidades = HistoryService.holdings_matrix(frame, precos.index, precos.columns)
+        valores = quantidades * np.nan_to_num(precos.to_numpy(dtype=np.float64))
+        return pd.Series(valores.sum(axis=1), index=precos.index, name='carteira')
+
+    @staticmethod
+    def slice_period(serie: pd.Series, periodo: str) -> pd.Series:
+        """Recorta a série para uma opção do seletor de período."""
+        if serie.empty:
+            return serie
+        inicio = period_start(serie.index[-1], periodo)
+        return serie if inicio is None else serie[serie.index >= inicio]
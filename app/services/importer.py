@@ -0,0 +1,256 @@
+import io
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator
+import pandas as pd
+from sqlalchemy import Column, Date, Float, Integer, MetaData, String, Table, and_, exists, insert, literal, select
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+from app.db.versioning import data_version
+from app.models.earnings import Earnings
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.transaction import Transaction
+from app.services.positions import PositionStateService
+from app.services.earnings import EarningsService
+from app.services.snapshots import SnapshotService
+
+# Colunas de cada tipo de importação (além da chave de importação, ver ImportService.import_keys)
+LAYOUTS: Dict[str, dict] = {
+    'transacoes': {
+        'tabela': Transaction.__table__,
+        'colunas': {'ticker': String, 'data': Date, 'quantidade': Integer, 'preco': Float, 'tipo': String},
+    },
+    'proventos': {
+        'tabela': Earnings.__table__,
+        'colunas': {'ticker': String, 'data': Date, 'valor_total': Float, 'tipo': String},
+    },
+}
+
+# Nomes de colunas usados em extratos de corretora/B3
+ALIASES = {
+    'código de negociação': 'ticker',
+    'codigo de negociacao': 'ticker',
+    'produto': 'ticker',
+    'data do negócio': 'data',
+    'data do negocio': 'data',
+    'data de pagamento': 'data',
+    'preço': 'preco',
+    'preço unitário': 'preco',
+    'tipo de movimentação': 'tipo',
+    'tipo de evento': 'tipo',
+    'valor líquido': 'valor_total',
+    'valor': 'valor_total',
+    'número do negócio': 'id_negocio',
+    'numero do negocio': 'id_negocio',
+    'id da operação': 'id_negocio',
+    'id da operacao': 'id_negocio',
+}
+
+COLUNA_CHAVE = 'chave_importacao'
+
+TIPOS = {
+    'transacoes': {'C': 'C', 'COMPRA': 'C', 'V': 'V', 'VENDA': 'V'},
+    'proventos': {'DIV': 'DIV', 'DIVIDENDO': 'DIV', 'JCP': 'JCP', 'JUROS SOBRE CAPITAL PRÓPRIO': 'JCP'},
+}
+
+@dataclass
+class ChunkReport:
+    """Resultado de um lote importado."""
+    lote: int
+    lidas: int
+    validas: int
+    inseridas: int
+    segundos: float
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.lidas / self.segundos if self.segundos > 0 else 0.0
+
+class ImportService:
+    """
+    Importação em massa de extratos CSV (transações e proventos).
+
+    O arquivo é lido em lotes de tamanho fixo, cada lote é validado com
+    operações vetorizadas do pandas, copiado para uma tabela temporária (COPY
+    com psycopg2, executemany nos demais drivers) e inserido na tabela final
+    com um único INSERT ... SELECT que descarta as linhas cuja chave de
+    importação já existe na carteira. As posições materializadas são
+    recalculadas uma vez no final.
+
+    A chave é o identificador do negócio na corretora, quando o arquivo traz
+    um; senão, os campos da linha mais o número da ocorrência dela no arquivo.
+    Assim duas execuções idênticas no mesmo dia entram as duas, e só a
+    reimportação do arquivo é descartada.
+    """
+
+    @staticmethod
+    def read_chunks(path, chunk_size: int = 100_000, sep: str = ',') -> Iterator[pd.DataFrame]:
+        for lote in pd.read_csv(path, chunksize=chunk_size, dtype=str, sep=sep):
+            lote.columns = [ALIASES.get(c.strip().lower(), c.strip().lower()) for c in lote.columns]
+            yield lote
+
+    @staticmethod
+    def _numero(serie: pd.Series) -> pd.Series:
+        """Aceita tanto 1234.56 quanto o formato brasileiro 1.234,56 (e prefixo R$)."""
+        texto = serie.astype(str).str.replace('R$', '', regex=False).str.strip()
+        brasileiro = texto.str.contains(',', regex=False)
+        texto = texto.where(~brasileiro, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+        return pd.to_numeric(texto, errors='coerce')
+
+    @staticmethod
+    def _data(serie: pd.Series) -> pd.Series:
+        """Aceita AAAA-MM-DD e DD/MM/AAAA."""
+        serie = serie.str.strip()
+        iso = pd.to_datetime(serie, format='%Y-%m-%d', errors='coerce')
+        return iso.fillna(pd.to_datetime(serie, format='%d/%m/%Y', errors='coerce'))
+
+    @staticmethod
+    def validate(lote: pd.DataFrame, tipo: str) -> pd.DataFrame:
+        """Normaliza e descarta as linhas inválidas de um lote."""
+        layout = LAYOUTS[tipo]
+        faltando = set(layout['colunas']) - set(lote.columns)
+        if faltando:
+            raise ValueError(f"Colunas ausentes no arquivo de {tipo}: {sorted(faltando)}")
+
+        limpo = pd.DataFrame({
+            'ticker': lote['ticker'].str.strip().str.upper(),
+            'data': ImportService._data(lote['data']),
+            'tipo': lote['tipo'].str.strip().str.upper().map(TIPOS[tipo]),
+        })
+        if tipo == 'transacoes':
+            limpo['quantidade'] = ImportService._numero(lote['quantidade'])
+            limpo['preco'] = ImportService._numero(lote['preco'])
+            validas = (limpo['quantidade'] > 0) & (limpo['quantidade'] % 1 == 0) & (limpo['preco'] > 0)
+        else:
+            limpo['valor_total'] = ImportService._numero(lote['valor_total'])
+            validas = limpo['valor_total'] > 0
+
+        validas &= limpo['ticker'].str.len().fillna(0).gt(0) & limpo['data'].notna() & limpo['tipo'].notna()
+        if 'id_negocio' in lote.columns:
+            limpo['id_negocio'] = lote['id_negocio'].astype(str).str.strip()
+            validas &= lote['id_negocio'].notna() & limpo['id_negocio'].str.len().gt(0)
+
+        limpo = limpo[validas]
+        if tipo == 'transacoes':
+            limpo = limpo.astype({'quantidade': 'int64'})
+        limpo['data'] = limpo['data'].dt.date
+        return limpo[list(layout['colunas']) + (['id_negocio'] if 'id_negocio' in limpo else [])]
+
+    @staticmethod
+    def import_keys(limpo: pd.DataFrame, tipo: str, ocorrencias: Dict[str, int]) -> pd.DataFrame:
+        """
+        Troca `id_negocio` (se houver) pela chave de importação de cada linha validada.
+
+        `ocorrencias` conta as linhas já vistas por conteúdo nos lotes
+        anteriores do mesmo arquivo e é atualizado aqui. O mesmo número de
+        negócio repetido no lote (mesmo com conteúdo corrigido) fica só na
+        primeira linha, como acontece entre lotes e em reimportações.
+        """
+        nomes = list(LAYOUTS[tipo]['colunas'])
+        if 'id_negocio' in limpo:
+            chaveado = limpo[nomes].assign(**{COLUNA_CHAVE: 'id:' + limpo['id_negocio']})
+            return chaveado.drop_duplicates(COLUNA_CHAVE, keep='first')
+
+        conteudo = limpo['ticker']
+        for nome in nomes[1:]:
+            conteudo = conteudo + '|' + limpo[nome].astype(str)
+        ordem = conteudo.groupby(conteudo).cumcount() + conteudo.map(ocorrencias).fillna(0).astype('int64')
+        for chave, vezes in conteudo.value_counts().items():
+            ocorrencias[chave] = ocorrencias.get(chave, 0) + vezes
+        return limpo[nomes].assign(**{COLUNA_CHAVE: conteudo + '#' + (ordem + 1).astype(str)})
+
+    @staticmethod
+    def _staging_table(tipo: str) -> Table:
+        colunas = LAYOUTS[tipo]['colunas']
+        return Table(
+            f'staging_{tipo}', MetaData(),
+            *(Column(nome, tipo_coluna) for nome, tipo_coluna in colunas.items()),
+            Column(COLUNA_CHAVE, String),
+            prefixes=['TEMPORARY'],
+        )
+
+    @staticmethod
+    def _copy(conn: Connection, staging: Table, lote: pd.DataFrame):
+        cursor = conn.connection.cursor() if conn.dialect.name == 'postgresql' else None
+        # COPY só pelo psycopg2 (copy_expert); outros drivers caem no executemany
+        if hasattr(cursor, 'copy_expert'):
+            buffer = io.StringIO()
+            lote.to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {staging.name} ({', '.join(lote.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        else:
+            conn.execute(insert(staging), lote.to_dict('records'))
+
+    @staticmethod
+    def _merge(conn: Connection, staging: Table, tipo: str, portfolio_id: int = CARTEIRA_PADRAO) -> int:
+        """Move o lote da tabela temporária para a carteira, ignorando o que já existe nela."""
+        destino = LAYOUTS[tipo]['tabela']
+        nomes = [*LAYOUTS[tipo]['colunas'], COLUNA_CHAVE]
+        mesma_chave = and_(
+            destino.c.portfolio_id == portfolio_id,
+            destino.c[COLUNA_CHAVE] == staging.c[COLUNA_CHAVE],
+        )
+
+        novos = (
+            select(literal(portfolio_id).label('portfolio_id'), *(staging.c[n] for n in nomes))
+            .where(~exists().where(mesma_chave))
+        )
+        resultado = conn.execute(insert(destino).from_select(['portfolio_id', *nomes], novos))
+        conn.execute(staging.delete())
+        return resultado.rowcount
+
+    @staticmethod
+    def import_file(
+        engine: Engine,
+        path,
+        tipo: str,
+        chunk_size: int = 100_000,
+        sep: str = ',',
+        rebuild_derived: bool = True,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> Iterator[ChunkReport]:
+        """
+        Importa um CSV para a carteira lote a lote, produzindo um ChunkReport por lote.
+        """
+        staging = ImportService._staging_table(tipo)
+        ocorrencias: Dict[str, int] = {}
+
+        with engine.connect() as conn:
+            staging.create(conn)
+            conn.commit()
+
+            for numero, bruto in enumerate(ImportService.read_chunks(path, chunk_size, sep), start=1):
+                inicio = time.perf_counter()
+                lote = ImportService.validate(bruto, tipo)
+                inseridas = 0
+                if not lote.empty:
+                    lote = ImportService.import_keys(lote, tipo, ocorrencias)
+                    ImportService._copy(conn, staging, lote)
+                    inseridas = ImportService._merge(conn, staging, tipo, portfolio_id)
+                if inseridas:
+                    # Na mesma transação do lote: quem lê a versão nunca vê dados sem ela
+                    data_version.bump(conn, tipo)
+                conn.commit()
+
+                yield ChunkReport(
+                    lote=numero,
+                    lidas=len(bruto),
+                    validas=len(lote),
+                    inseridas=inseridas,
+                    segundos=time.perf_counter() - inicio,
+                )
+
+            staging.drop(conn)
+            conn.commit()
+
+        # Estado derivado recalculado uma única vez, não por linha
+        if rebuild_derived:
+            with Session(engine) as session:
+                if tipo == 'transacoes':
+                    PositionStateService.rebuild(session, portfolio_ids=[portfolio_id])
+                else:
+                    EarningsService.rebuild_monthly(session, portfolio_ids=[portfolio_id])
+                SnapshotService.refresh(session, portfolio_id)
+                session.commit()
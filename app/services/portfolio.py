@@ -1,10 +1,18 @@
 from typing import List, Dict
+import numpy as np
+import pandas as pd
+from app.core.metrics import timed
 from app.models.transaction import Transaction
 from app.schemas.portfolio import PositionSummary
+from app.services.adjustments import CASAS_QUANTIDADE, whole_shares
+
+# Colunas esperadas pelo motor colunar (mesmos nomes do modelo Transaction)
+COLUNAS_TRANSACAO = ['ticker', 'data', 'quantidade', 'preco', 'tipo']
 
 class CalculationService:
     
     @staticmethod
+    @timed('calculation.calculate_positions')
     def calculate_positions(transactions: List[Transaction]) -> List[PositionSummary]:
         """
         Recebe o histórico bruto de transações e calcula a posição atual (PM, Qtd).
@@ -24,27 +32,7 @@ class CalculationService:
                     'pm': 0.0
                 }
             
-            posicao = carteira[ticker]
-
-            if t.tipo == 'C':
-                custo_compra = t.quantidade * t.preco
-                posicao['total_investido'] += custo_compra
-                posicao['qtde'] += t.quantidade
-                
-                # Recalcula Preço Médio Ponderado
-                if posicao['qtde'] > 0:
-                    posicao['pm'] = posicao['total_investido'] / posicao['qtde']
-            
-            elif t.tipo == 'V':
-                custo_venda = t.quantidade * posicao['pm']
-                posicao['total_investido'] -= custo_venda
-                posicao['qtde'] -= t.quantidade
-            
-            # Limpeza se zerou a posição
-            if posicao['qtde'] <= 0:
-                posicao['qtde'] = 0
-                posicao['total_investido'] = 0.0
-                posicao['pm'] = 0.0
+            CalculationService.aplicar_transacao(carteira[ticker], t)
 
         # Converte o dicionário sujo em uma lista de Objetos Pydantic limpos
         resultados = []
@@ -57,4 +45,182 @@ class CalculationService:
                     total_investido=dados['total_investido']
                 ))
                 
-        return resultados
\ No newline at end of file
+        return resultados
+
+    @staticmethod
+    def aplicar_transacao(posicao: dict, t: Transaction, fator: float = 1.0) -> dict:
+        """
+        Aplica uma única transação sobre o estado {'qtde', 'total_investido', 'pm'}.
+
+        `fator` é o ajuste acumulado dos eventos societários posteriores à
+        negociação (ver AdjustmentFactors): quantidade × fator, preço ÷ fator.
+        """
+        quantidade, preco = t.quantidade, t.preco
+        if fator != 1.0:
+            quantidade, preco = round(quantidade * fator, CASAS_QUANTIDADE), preco / fator
+
+        if t.tipo == 'C':
+            custo_compra = quantidade * preco
+            posicao['total_investido'] += custo_compra
+            posicao['qtde'] += quantidade
+            
+            # Recalcula Preço Médio Ponderado
+            if posicao['qtde'] > 0:
+                posicao['pm'] = posicao['total_investido'] / posicao['qtde']
+        
+        elif t.tipo == 'V':
+            custo_venda = quantidade * posicao['pm']
+            posicao['total_investido'] -= custo_venda
+            posicao['qtde'] -= quantidade
+        
+        # Limpeza se zerou a posição
+        if posicao['qtde'] <= 0:
+            posicao['qtde'] = 0
+            posicao['total_investido'] = 0.0
+            posicao['pm'] = 0.0
+
+        return posicao
+
+    @staticmethod
+    def enrich_positions(posicoes: List[PositionSummary], cotacoes: Dict[str, float]) -> List[PositionSummary]:
+        """
+        Preenche os campos de mercado (preço atual, saldo, lucro, % da carteira).
+        Tickers sem cotação mantêm os valores padrão.
+        """
+        for p in posicoes:
+            preco = cotacoes.get(p.ticker)
+            if preco is None:
+                continue
+            p.preco_atual = preco
+            p.valor_total_atual = p.quantidade * preco
+            p.lucro_prejuizo = p.valor_total_atual - p.total_investido
+            p.rentabilidade_pct = (p.lucro_prejuizo / p.total_investido * 100) if p.total_investido > 0 else 0.0
+
+        patrimonio = sum(p.valor_total_atual for p in posicoes)
+        for p in posicoes:
+            p.percentual_carteira = (p.valor_total_atual / patrimonio * 100) if patrimonio > 0 else 0.0
+
+        return posicoes
+
+    @staticmethod
+    async def enrich_positions_async(posicoes: List[PositionSummary], quote_cache) -> List[PositionSummary]:
+        """
+        Busca as cotações de todas as posições em um único lote e enriquece a lista.
+        """
+        cotacoes = await quote_cache.get_many(p.ticker for p in posicoes)
+        return CalculationService.enrich_positions(posicoes, cotacoes)
+
+    @staticmethod
+    def transactions_to_frame(transactions: List[Transaction]) -> pd.DataFrame:
+        """
+        Converte uma lista de transações ORM no formato colunar do motor vetorizado.
+        """
+        return pd.DataFrame(
+            [(t.ticker, t.data, t.quantidade, t.preco, t.tipo) for t in transactions],
+            columns=COLUNAS_TRANSACAO
+        )
+
+    @staticmethod
+    @timed('calculation.calculate_positions_columnar')
+    def calculate_positions_columnar(frame: pd.DataFrame) -> List[PositionSummary]:
+        """
+        Versão vetorizada de calculate_positions para entrada colunar.
+
+        Recebe um DataFrame com as colunas de COLUNAS_TRANSACAO e devolve a mesma
+        lista de PositionSummary (inclusive a ordem e a regra de zerar a posição).
+        """
+        codigos, tickers = pd.factorize(frame['ticker'], sort=False)
+        datas = pd.to_datetime(frame['data']).to_numpy(dtype='datetime64[D]').astype(np.int64)
+        tipos = frame['tipo'].to_numpy()
+
+        return CalculationService.calculate_positions_arrays(
+            codigos=codigos,
+            tickers=np.asarray(tickers, dtype=object),
+            datas=datas,
+            # float64 quando ajustadas por eventos societários (podem ser fracionárias)
+            quantidades=frame['quantidade'].to_numpy(
+                dtype=np.float64 if frame['quantidade'].dtype.kind == 'f' else np.int64
+            ),
+            precos=frame['preco'].to_numpy(dtype=np.float64),
+            compras=tipos == 'C',
+            vendas=tipos == 'V',
+        )
+
+    @staticmethod
+    @timed('calculation.calculate_positions_arrays')
+    def calculate_positions_arrays(
+        codigos: np.ndarray,
+        tickers: np.ndarray,
+        datas: np.ndarray,
+        quantidades: np.ndarray,
+        precos: np.ndarray,
+        compras: np.ndarray,
+        vendas: np.ndarray,
+    ) -> List[PositionSummary]:
+        """
+        Núcleo do motor colunar, operando sobre arrays paralelos.
+
+        codigos indexa tickers; datas é qualquer inteiro monotônico no tempo
+        (ex.: ordinal do dia). Todos os tickers são processados juntos em
+        passes agrupados, sem laço Python por transação.
+        """
+        if len(codigos) == 0:
+            return []
+
+        # Ordena por (ticker, data) de forma estável: preserva a ordem de entrada
+        # em transações do mesmo dia, igual ao sorted() do laço original
+        ordem = np.lexsort((datas, codigos))
+        cod = codigos[ordem]
+        qtd = quantidades[ordem]
+        compra = compras[ordem]
+        venda = vendas[ordem]
+        delta = np.where(compra, qtd, np.where(venda, -qtd, 0))
+        grupos = pd.Series(cod)
+
+        # Quantidade com a regra de zerar: q_k = max(q_{k-1} + d_k, 0).
+        # Equivale a S_k - min(0, min_{j<=k} S_j), com S a soma acumulada do grupo
+        soma = pd.Series(delta).groupby(grupos).cumsum().to_numpy()
+        piso = pd.Series(soma).groupby(grupos).cummin().to_numpy()
+        qtde = soma - np.minimum(piso, 0)
+
+        # Só o último segmento (após a última vez que a posição zerou) importa
+        inicio = np.r_[True, cod[1:] != cod[:-1]]
+        idx = np.arange(len(cod))
+        ultimo_zero = pd.Series(np.where(qtde <= 0, idx, -1)).groupby(grupos).transform('max').to_numpy()
+        ativo = idx > ultimo_zero
+
+        # Custo evolui como C_k = C_{k-1} * r_k + b_k, onde a venda escala o custo
+        # por q_k / q_{k-1} (sai pelo PM) e a compra soma b_k = qtd * preço
+        qtde_anterior = np.where(inicio, 0, np.r_[0, qtde[:-1]])
+        fator = np.ones(len(cod))
+        escala = ativo & venda & (qtde_anterior > 0)
+        fator[escala] = qtde[escala] / qtde_anterior[escala]
+        aporte = np.where(ativo & compra, qtd * precos[ordem], 0.0)
+
+        # Solução fechada: C_final = soma_j b_j * prod_{k>j} r_k (produto sufixo exclusivo)
+        reverso = pd.Series(fator[::-1]).groupby(grupos.iloc[::-1].to_numpy()).cumprod().to_numpy()[::-1]
+        fim = np.r_[cod[1:] != cod[:-1], True]
+        sufixo = np.where(fim, 1.0, np.r_[reverso[1:], 1.0])
+        total = np.bincount(cod, weights=aporte * sufixo, minlength=len(tickers))
+
+        # Quantidades ajustadas por eventos societários podem ser fracionárias
+        qtde_final = np.zeros(len(tickers), dtype=qtde.dtype)
+        qtde_final[cod[fim]] = qtde[fim]
+
+        # Mantém a ordem de primeira aparição cronológica (ordem de inserção do dict original)
+        primeira_data = np.full(len(tickers), np.iinfo(np.int64).max)
+        primeira_pos = np.full(len(tickers), np.iinfo(np.int64).max)
+        primeira_data[cod[inicio]] = datas[ordem][inicio]
+        primeira_pos[cod[inicio]] = ordem[inicio]
+
+        resultados = []
+        for c in np.lexsort((primeira_pos, primeira_data)):
+            if qtde_final[c] > 0:
+                resultados.append(PositionSummary(
+                    ticker=tickers[c],
+                    quantidade=whole_shares(qtde_final[c]),
+                    preco_medio=float(total[c] / qtde_final[c]),
+                    total_investido=float(total[c])
+                ))
+
+        return resultados
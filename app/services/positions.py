@@ -0,0 +1,240 @@
+from typing import List, Optional, Sequence
+from sqlalchemy import insert
+from sqlmodel import Session, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.metrics import timed
+from app.models.transaction import Transaction
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.position import Position, PositionHistory
+from app.schemas.portfolio import PositionSummary
+from app.services.adjustments import AdjustmentFactors, whole_shares
+from app.services.portfolio import CalculationService
+from app.services.snapshots import SnapshotService
+
+class PositionStateService:
+    """
+    Mantém a tabela `posicoes` atualizada de forma incremental.
+
+    Transações novas (data >= última aplicada) custam O(1). Transações
+    retroativas refazem apenas o ticker afetado (na carteira da transação) a
+    partir da data inserida, partindo do estado salvo em `posicoes_historico`
+    no dia anterior.
+
+    O estado é guardado na base atual de ações: cada transação entra ajustada
+    pelos eventos societários posteriores a ela (ver CorporateActionService
+    para o que acontece quando um evento novo é registrado).
+    """
+
+    @staticmethod
+    def _estado(posicao: Optional[Position]) -> dict:
+        if posicao is None:
+            return {'qtde': 0, 'total_investido': 0.0, 'pm': 0.0}
+        return {
+            'qtde': posicao.quantidade,
+            'total_investido': posicao.total_investido,
+            'pm': posicao.preco_medio,
+        }
+
+    @staticmethod
+    def _gravar_dia(session: Session, portfolio_id: int, ticker: str, dia, estado: dict):
+        session.merge(PositionHistory(
+            portfolio_id=portfolio_id,
+            ticker=ticker,
+            data=dia,
+            quantidade=estado['qtde'],
+            preco_medio=estado['pm'],
+            total_investido=estado['total_investido'],
+        ))
+
+    @staticmethod
+    def _gravar_posicao(session: Session, posicao: Position, estado: dict, t: Transaction):
+        posicao.quantidade = estado['qtde']
+        posicao.preco_medio = estado['pm']
+        posicao.total_investido = estado['total_investido']
+        posicao.ultima_transacao_id = t.id
+        posicao.ultima_data = t.data
+        session.add(posicao)
+
+    @staticmethod
+    @timed('positions.record_transaction')
+    def record_transaction(session: Session, t: Transaction) -> Position:
+        """
+        Persiste a transação e atualiza o estado da posição do ticker.
+        Os snapshots da carteira ficam marcados para refazer a partir da data dela.
+        """
+        session.add(t)
+        session.flush()  # Garante o id para desempate de transações no mesmo dia
+        SnapshotService.mark_stale(session, t.portfolio_id, t.data)
+
+        posicao = session.get(Position, (t.portfolio_id, t.ticker))
+        if posicao is not None and posicao.ultima_data is not None and t.data < posicao.ultima_data:
+            return PositionStateService.replay_from(session, t.ticker, t.data, t.portfolio_id)
+
+        if posicao is None:
+            posicao = Position(portfolio_id=t.portfolio_id, ticker=t.ticker)
+
+        fator = AdjustmentFactors.load(session).factor(t.ticker, t.data)
+        estado = CalculationService.aplicar_transacao(PositionStateService._estado(posicao), t, fator)
+        PositionStateService._gravar_posicao(session, posicao, estado, t)
+        PositionStateService._gravar_dia(session, t.portfolio_id, t.ticker, t.data, estado)
+        return posicao
+
+    @staticmethod
+    @timed('positions.replay_from')
+    def replay_from(
+        session: Session,
+        ticker: str,
+        inicio,
+        portfolio_id: int = CARTEIRA_PADRAO,
+        fatores: Optional[AdjustmentFactors] = None,
+    ) -> Position:
+        """
+        Refaz o estado de um ticker da carteira a partir de `inicio` (inclusive).
+        Com `inicio=None` refaz o histórico inteiro do ticker.
+        """
+        fatores = fatores if fatores is not None else AdjustmentFactors.load(session)
+        estado = {'qtde': 0, 'total_investido': 0.0, 'pm': 0.0}
+        filtro_historico = [PositionHistory.portfolio_id == portfolio_id, PositionHistory.ticker == ticker]
+        filtro_transacoes = [Transaction.portfolio_id == portfolio_id, Transaction.ticker == ticker]
+
+        if inicio is not None:
+            anterior = session.exec(
+                select(PositionHistory)
+                .where(*filtro_historico, PositionHistory.data < inicio)
+                .order_by(PositionHistory.data.desc())
+                .limit(1)
+            ).first()
+            if anterior is not None:
+                estado = {
+                    'qtde': anterior.quantidade,
+                    'total_investido': anterior.total_investido,
+                    'pm': anterior.preco_medio,
+                }
+            filtro_historico.append(PositionHistory.data >= inicio)
+            filtro_transacoes.append(Transaction.data >= inicio)
+
+        session.execute(delete(PositionHistory).where(*filtro_historico))
+
+        transacoes = session.exec(
+            select(Transaction)
+            .where(*filtro_transacoes)
+            .order_by(Transaction.data, Transaction.id)
+        ).all()
+
+        posicao = session.get(Position, (portfolio_id, ticker)) or Position(portfolio_id=portfolio_id, ticker=ticker)
+        for i, t in enumerate(transacoes):
+            CalculationService.aplicar_transacao(estado, t, fatores.factor(t.ticker, t.data))
+            # Só grava o fechamento do dia (última transação daquela data)
+            if i + 1 == len(transacoes) or transacoes[i + 1].data != t.data:
+                PositionStateService._gravar_dia(session, portfolio_id, ticker, t.data, estado)
+            PositionStateService._gravar_posicao(session, posicao, estado, t)
+
+        return posicao
+
+    @staticmethod
+    @timed('positions.rebuild')
+    def rebuild(session: Session, batch_size: int = 10_000, portfolio_ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Recalcula as posições a partir do histórico completo (carga inicial/importação).
+
+        Lê as transações em streaming, ordenadas por carteira, ticker e data, e
+        grava os estados com INSERTs em lote, sem consultas por linha. Com
+        `portfolio_ids`, refaz apenas essas carteiras. Retorna quantas
+        transações foram processadas.
+        """
+        c = Transaction.__table__.c
+        statement = select(c.id, c.portfolio_id, c.ticker, c.data, c.quantidade, c.preco, c.tipo)
+        apagar_historico, apagar_posicoes = delete(PositionHistory), delete(Position)
+        if portfolio_ids is not None:
+            statement = statement.where(c.portfolio_id.in_(portfolio_ids))
+            apagar_historico = apagar_historico.where(PositionHistory.portfolio_id.in_(portfolio_ids))
+            apagar_posicoes = apagar_posicoes.where(Position.portfolio_id.in_(portfolio_ids))
+
+        session.execute(apagar_historico)
+        session.execute(apagar_posicoes)
+
+        fatores = AdjustmentFactors.load(session)
+        resultado = session.execute(
+            statement
+            .order_by(c.portfolio_id, c.ticker, c.data, c.id)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        linhas = (linha for lote in resultado.partitions() for linha in fatores.adjust_rows(lote))
+
+        historico: List[dict] = []
+        posicoes: List[dict] = []
+        anterior = None
+        estado = None
+        processadas = 0
+
+        def fechar_dia(t):
+            historico.append({
+                'portfolio_id': t.portfolio_id, 'ticker': t.ticker, 'data': t.data, 'quantidade': estado['qtde'],
+                'preco_medio': estado['pm'], 'total_investido': estado['total_investido'],
+            })
+            if len(historico) >= batch_size:
+                session.execute(insert(PositionHistory), historico)
+                historico.clear()
+
+        def fechar_ticker(t):
+            posicoes.append({
+                'portfolio_id': t.portfolio_id, 'ticker': t.ticker, 'quantidade': estado['qtde'], 'preco_medio': estado['pm'],
+                'total_investido': estado['total_investido'],
+                'ultima_transacao_id': t.id, 'ultima_data': t.data,
+            })
+
+        for t in linhas:
+            if anterior is not None and (t.portfolio_id, t.ticker, t.data) != (anterior.portfolio_id, anterior.ticker, anterior.data):
+                fechar_dia(anterior)
+            if anterior is None or (t.portfolio_id, t.ticker) != (anterior.portfolio_id, anterior.ticker):
+                if anterior is not None:
+                    fechar_ticker(anterior)
+                estado = {'qtde': 0, 'total_investido': 0.0, 'pm': 0.0}
+            CalculationService.aplicar_transacao(estado, t)
+            anterior = t
+            processadas += 1
+
+        if anterior is not None:
+            fechar_dia(anterior)
+            fechar_ticker(anterior)
+        if historico:
+            session.execute(insert(PositionHistory), historico)
+        if posicoes:
+            session.execute(insert(Position), posicoes)
+        return processadas
+
+    @staticmethod
+    @timed('positions.current_positions')
+    def current_positions(session: Session, portfolio_id: int = CARTEIRA_PADRAO) -> List[PositionSummary]:
+        """
+        Lê as posições abertas da carteira direto da tabela materializada (sem replay).
+        """
+        posicoes = session.exec(
+            select(Position)
+            .where(Position.portfolio_id == portfolio_id, Position.quantidade > 0)
+            .order_by(Position.ticker)
+        ).all()
+
+        return [
+            PositionSummary(
+                ticker=p.ticker,
+                quantidade=whole_shares(p.quantidade),
+                preco_medio=p.preco_medio,
+                total_investido=p.total_investido
+            )
+            for p in posicoes
+        ]
+
+    # Variantes assíncronas: a mesma lógica roda via run_sync, com I/O não-bloqueante
+
+    @staticmethod
+    async def record_transaction_async(session: AsyncSession, t: Transaction) -> Position:
+        return await session.run_sync(PositionStateService.record_transaction, t)
+
+    @staticmethod
+    async def rebuild_async(session: AsyncSession, portfolio_ids: Optional[Sequence[int]] = None) -> int:
+        return await session.run_sync(PositionStateService.rebuild, portfolio_ids=portfolio_ids)
+
+    @staticmethod
+    async def current_positions_async(session: AsyncSession, portfolio_id: int = CARTEIRA_PADRAO) -> List[PositionSummary]:
+        return await session.run_sync(PositionStateService.current_positions, portfolio_id)
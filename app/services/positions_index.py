@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from operator import attrgetter
+from typing import Dict, List, Tuple
+import numpy as np
+from app.schemas.portfolio import PositionSummary
+from app.services.search import normalize
+
+COLUNAS_ORDENAVEIS = (
+    'ticker', 'quantidade', 'preco_medio', 'total_investido', 'preco_atual',
+    'valor_total_atual', 'rentabilidade_pct', 'lucro_prejuizo', 'percentual_carteira',
+)
+ORDEM_PADRAO = 'valor_total_atual'
+_LIMITE_FILTROS = 128
+
+def market_value(p: PositionSummary) -> float:
+    """Valor exibido da posição: sem cotação, o ativo é avaliado pelo custo."""
+    return p.valor_total_atual if p.preco_atual else p.total_investido
+
+class PositionsIndex:
+    """
+    Posições com a ordem de cada coluna calculada uma única vez.
+
+    Ordenar, filtrar e paginar viram fatias sobre arrays de índices; o custo
+    por página depende do tamanho da página, não do número de ativos.
+    """
+
+    def __init__(self, posicoes: List[PositionSummary]):
+        self.posicoes = posicoes
+        chaves = {coluna: attrgetter(coluna) for coluna in COLUNAS_ORDENAVEIS}
+        chaves['valor_total_atual'] = market_value  # Ordena pelo valor que a tabela mostra
+        self._ordens: Dict[str, np.ndarray] = {
+            coluna: np.argsort(np.array([chave(p) for p in posicoes]), kind='stable')
+            for coluna, chave in chaves.items()
+        }
+        self._tickers = [normalize(p.ticker) for p in posicoes]
+        self._filtros: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.posicoes)
+
+    def _mascara(self, filtro: str) -> np.ndarray:
+        mascara = self._filtros.get(filtro)
+        if mascara is None:
+            mascara = np.array([filtro in t for t in self._tickers], dtype=bool)
+            self._filtros[filtro] = mascara
+            if len(self._filtros) > _LIMITE_FILTROS:
+                self._filtros.popitem(last=False)
+        return mascara
+
+    def query(
+        self,
+        ordenar_por: str = ORDEM_PADRAO,
+        decrescente: bool = True,
+        filtro: str = '',
+        offset: int = 0,
+        limite: int = 20,
+    ) -> Tuple[int, List[PositionSummary]]:
+        """Total após o filtro e as linhas da página pedida."""
+        ordem = self._ordens.get(ordenar_por, self._ordens[ORDEM_PADRAO])
+        if decrescente:
+            ordem = ordem[::-1]
+
+        filtro = normalize(filtro or '')
+        if filtro and len(ordem):
+            ordem = ordem[self._mascara(filtro)[ordem]]
+
+        pagina = ordem[max(offset, 0):max(offset, 0) + limite]
+        return len(ordem), [self.posicoes[i] for i in pagina]
@@ -0,0 +1,320 @@
+import asyncio
+import math
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from app.core.metrics import timed
+from app.db.session import async_session_factory
+from app.db.versioning import data_version
+from app.schemas.portfolio import PositionSummary
+from app.services.adjustments import AdjustmentFactors
+from app.services.aggregation import AggregationService
+from app.services.benchmarks import get_benchmark_store
+from app.services.dashboard import DashboardService
+from app.services.history import HistoryService
+from app.services.positions_index import market_value
+
+# Estratégias de rebalanceamento: meses entre rebalanceamentos (None = só pela banda / nunca)
+ESTRATEGIAS: Dict[str, Optional[int]] = {
+    'Sem rebalanceamento': None,
+    'Mensal': 1,
+    'Trimestral': 3,
+    'Anual': 12,
+    'Banda de 5%': None,
+}
+ESTRATEGIA_BANDA = 'Banda de 5%'
+BANDA = 0.05  # Desvio máximo de um ativo em relação ao peso-alvo antes de rebalancear
+
+PERCENTIS = (5, 25, 50, 75, 95)
+CAMINHOS_POR_BLOCO = 5_000  # Cada bloco tem a própria semente: o resultado não depende do número de workers
+MINIMO_PARA_POOL = 50_000   # Abaixo disso o custo de subir o pool não compensa
+CDI_ANUAL_PADRAO = 0.10     # Usado quando não há CDI_FILE configurado
+LIMITE_CACHE = 32
+MESES_MINIMOS = 12  # Com menos retornos mensais a estimativa não é confiável (a página avisa)
+
+@dataclass(frozen=True)
+class ProjectionParams:
+    """Parâmetros de uma simulação (hashable: fazem parte da chave do cache)."""
+    anos: int = 5
+    caminhos: int = 20_000
+    estrategia: str = 'Sem rebalanceamento'
+    aporte_mensal: float = 0.0
+    custo_transacao: float = 0.0003  # Fração do volume negociado em cada rebalanceamento
+    janela_anos: int = 5  # Histórico usado para estimar retornos e covariâncias
+    semente: int = 42
+
+    @property
+    def meses(self) -> int:
+        return self.anos * 12
+
+@dataclass
+class ReturnStats:
+    """Média e fator da covariância (Σ = F Fᵀ) dos log-retornos mensais dos ativos."""
+    tickers: List[str]
+    media: np.ndarray
+    fator: np.ndarray
+    meses: int = 0  # Retornos mensais usados na estimativa
+
+@dataclass
+class ProjectionResult:
+    """Faixas de percentis do patrimônio projetado, mês a mês, contra o CDI."""
+    params: ProjectionParams
+    datas: pd.DatetimeIndex
+    valor_inicial: float
+    bandas: Dict[int, np.ndarray]
+    cdi: np.ndarray
+    prob_supera_cdi: float
+    comparacao: List[dict] = field(default_factory=list)  # Uma linha por estratégia
+    meses_historico: int = 0
+
+class ProjectionService:
+    """
+    Projeção de Monte Carlo do patrimônio e comparação de estratégias de rebalanceamento.
+
+    Os log-retornos mensais seguem uma normal multivariada estimada do histórico
+    de preços. Cada passo mensal é uma operação sobre a matriz caminhos × ativos;
+    o único laço Python é sobre os meses. Os caminhos são divididos em blocos de
+    tamanho fixo, cada um com uma semente filha de SeedSequence(semente), então
+    o resultado é o mesmo rodando num processo ou num pool.
+    """
+
+    _cache: 'OrderedDict[tuple, ProjectionResult]' = OrderedDict()
+    _lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def return_stats(precos: pd.DataFrame, tickers: Sequence[str], janela_anos: int = 5) -> ReturnStats:
+        """
+        Estima média e covariância dos log-retornos mensais dos `tickers`.
+
+        Meses sem preço contam como retorno zero; ativos sem histórico ficam com
+        média e variância zero. O fator vem da decomposição espectral, que aceita
+        covariâncias singulares (mais ativos do que meses, ativos sem variação).
+        """
+        tickers = list(tickers)
+        if precos.empty or not tickers:
+            n = len(tickers)
+            return ReturnStats(tickers, np.zeros(n), np.zeros((n, n)))
+
+        precos = precos.sort_index().reindex(columns=tickers).ffill()
+        precos = precos[precos.index >= precos.index[-1] - pd.DateOffset(years=janela_anos)]
+        mensal = precos.groupby(precos.index.to_period('M')).last()
+        retornos = np.log(mensal).diff().iloc[1:].fillna(0.0).to_numpy(dtype=np.float64)
+
+        if len(retornos) < 2:
+            n = len(tickers)
+            return ReturnStats(tickers, np.zeros(n), np.zeros((n, n)), len(retornos))
+
+        covariancia = np.atleast_2d(np.cov(retornos, rowvar=False))
+        autovalores, autovetores = np.linalg.eigh(covariancia)
+        fator = autovetores * np.sqrt(np.clip(autovalores, 0.0, None))
+        return ReturnStats(tickers, retornos.mean(axis=0), fator, len(retornos))
+
+    @staticmethod
+    def cdi_monthly_rate() -> float:
+        """Taxa mensal do CDI para a projeção: últimos 12 meses do arquivo, ou CDI_ANUAL_PADRAO."""
+        benchmarks = get_benchmark_store()
+        anual = CDI_ANUAL_PADRAO
+        if 'cdi' in benchmarks:
+            indice = benchmarks.indices['cdi']
+            anual = benchmarks.accumulated_return('cdi', indice.fim - np.timedelta64(365, 'D'), indice.fim)
+        return (1 + anual) ** (1 / 12) - 1
+
+    @staticmethod
+    def cdi_curve(valor_inicial: float, meses: int, taxa_mensal: float, aporte_mensal: float) -> np.ndarray:
+        """Patrimônio aplicado no CDI, com os mesmos aportes mensais."""
+        crescimento = (1 + taxa_mensal) ** np.arange(meses + 1)
+        # Aporte do mês k rende a partir do mês seguinte: soma geométrica fechada
+        aportes = aporte_mensal * ((crescimento - 1) / taxa_mensal if taxa_mensal else np.arange(meses + 1))
+        return valor_inicial * crescimento + aportes
+
+    @staticmethod
+    def simulate_block(
+        semente: np.random.SeedSequence,
+        caminhos: int,
+        stats: ReturnStats,
+        pesos: np.ndarray,
+        valor_inicial: float,
+        params: ProjectionParams,
+        bandas: bool = False,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Patrimônio final de cada caminho de um bloco, com o rebalanceamento de `params.estrategia`.
+
+        Com `bandas`, devolve também os PERCENTIS do bloco mês a mês
+        (len(PERCENTIS) × meses+1); a matriz caminhos × meses nunca é montada.
+        """
+        rng = np.random.default_rng(semente)
+        periodo = ESTRATEGIAS[params.estrategia]
+        banda = params.estrategia == ESTRATEGIA_BANDA
+
+        valores = np.tile(valor_inicial * pesos, (caminhos, 1))
+        total = np.full(caminhos, float(valor_inicial))
+        faixas = None
+        if bandas:
+            faixas = np.empty((len(PERCENTIS), params.meses + 1))
+            faixas[:, 0] = valor_inicial
+
+        for mes in range(1, params.meses + 1):
+            choques = rng.standard_normal((caminhos, len(pesos)))
+            valores *= np.exp(stats.media + choques @ stats.fator.T)
+            valores += params.aporte_mensal * pesos
+            total = valores.sum(axis=1)
+
+            if periodo is not None and mes % periodo == 0:
+                rebalancear = np.ones(caminhos, dtype=bool)
+            elif banda:
+                desvio = np.abs(valores / np.maximum(total, 1e-12)[:, None] - pesos).max(axis=1)
+                rebalancear = desvio > BANDA
+            else:
+                rebalancear = None
+
+            if rebalancear is not None and rebalancear.any():
+                alvo = total[rebalancear, None] * pesos
+                giro = np.abs(alvo - valores[rebalancear]).sum(axis=1) / 2
+                total[rebalancear] -= giro * params.custo_transacao
+                valores[rebalancear] = total[rebalancear, None] * pesos
+
+            if faixas is not None:
+                faixas[:, mes] = np.percentile(total, PERCENTIS)
+        return total, faixas
+
+    @staticmethod
+    def open_pool(params: ProjectionParams, workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+        """
+        Pool de processos para os blocos de `params`, ou None quando não compensa
+        (`workers` <= 1, um só bloco ou menos de MINIMO_PARA_POOL caminhos).
+        """
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        blocos = math.ceil(params.caminhos / CAMINHOS_POR_BLOCO)
+        if workers > 1 and blocos > 1 and params.caminhos >= MINIMO_PARA_POOL:
+            # spawn: os filhos não herdam conexões nem o event loop do processo pai
+            return ProcessPoolExecutor(max_workers=min(workers, blocos), mp_context=multiprocessing.get_context('spawn'))
+        return None
+
+    @staticmethod
+    @timed('projection.simulate')
+    def simulate(
+        stats: ReturnStats,
+        pesos: np.ndarray,
+        valor_inicial: float,
+        params: ProjectionParams,
+        bandas: bool = False,
+        pool: Optional[ProcessPoolExecutor] = None,
+    ) -> Tuple[np.ndarray, Optional[Dict[int, np.ndarray]]]:
+        """
+        Patrimônio final de todos os caminhos, em blocos com sementes filhas, e
+        as faixas de percentis mês a mês quando pedidas.
+
+        Os blocos rodam no `pool` (ver open_pool) ou no próprio processo, com a
+        mesma saída. As faixas de cada mês são a média dos percentis dos blocos,
+        ponderada pelo tamanho; a do último mês sai exata dos valores finais.
+        """
+        blocos = math.ceil(params.caminhos / CAMINHOS_POR_BLOCO)
+        sementes = np.random.SeedSequence(params.semente).spawn(blocos)
+        tamanhos = [min(CAMINHOS_POR_BLOCO, params.caminhos - i * CAMINHOS_POR_BLOCO) for i in range(blocos)]
+        argumentos = [(s, n, stats, pesos, valor_inicial, params, bandas) for s, n in zip(sementes, tamanhos)]
+
+        if pool is not None:
+            partes = list(pool.map(ProjectionService.simulate_block, *zip(*argumentos)))
+        else:
+            partes = [ProjectionService.simulate_block(*a) for a in argumentos]
+
+        finais = np.concatenate([f for f, _ in partes])
+        if not bandas:
+            return finais, None
+        faixas = np.average(np.stack([b for _, b in partes]), axis=0, weights=tamanhos)
+        faixas[:, -1] = np.percentile(finais, PERCENTIS)
+        return finais, dict(zip(PERCENTIS, faixas))
+
+    @staticmethod
+    def project(
+        posicoes: List[PositionSummary],
+        precos: pd.DataFrame,
+        params: ProjectionParams,
+        inicio: Optional[date] = None,
+        workers: Optional[int] = None,
+    ) -> ProjectionResult:
+        """Projeção da estratégia de `params` mais a comparação de todas as estratégias (mesmas sementes)."""
+        valores = np.array([market_value(p) for p in posicoes], dtype=np.float64)
+        valor_inicial = float(valores.sum())
+        datas = pd.date_range(pd.Timestamp(inicio or date.today()), periods=params.meses + 1, freq='MS')
+        taxa_cdi = ProjectionService.cdi_monthly_rate()
+        cdi = ProjectionService.cdi_curve(valor_inicial, params.meses, taxa_cdi, params.aporte_mensal)
+
+        if valor_inicial <= 0:
+            vazio = {p: np.full(params.meses + 1, valor_inicial) for p in PERCENTIS}
+            return ProjectionResult(params, datas, valor_inicial, vazio, cdi, 0.0)
+
+        pesos = valores / valor_inicial
+        stats = ProjectionService.return_stats(precos, [p.ticker for p in posicoes], params.janela_anos)
+
+        resultado = None
+        comparacao = []
+        # Um pool para todas as estratégias: subir processos spawn custa mais que um bloco
+        pool = ProjectionService.open_pool(params, workers)
+        try:
+            for estrategia in ESTRATEGIAS:
+                escolhida = estrategia == params.estrategia
+                variante = replace(params, estrategia=estrategia)
+                finais, bandas = ProjectionService.simulate(stats, pesos, valor_inicial, variante, escolhida, pool)
+                comparacao.append({
+                    'estrategia': estrategia,
+                    'p5': float(np.percentile(finais, 5)),
+                    'mediana': float(np.median(finais)),
+                    'p95': float(np.percentile(finais, 95)),
+                    'prob_supera_cdi': float((finais > cdi[-1]).mean()),
+                })
+                if escolhida:
+                    resultado = ProjectionResult(
+                        params, datas, valor_inicial, bandas, cdi, comparacao[-1]['prob_supera_cdi'],
+                        meses_historico=stats.meses,
+                    )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        resultado.comparacao = comparacao
+        return resultado
+
+    @staticmethod
+    async def positions_version(session) -> tuple:
+        """Versão das posições e da fonte de preços que alimentam a projeção."""
+        return (
+            *await data_version.key_async(session, ('posicoes', 'eventos_societarios')),
+            await DashboardService.price_source_version(session),
+        )
+
+    @classmethod
+    async def project_async(cls, params: ProjectionParams) -> ProjectionResult:
+        """
+        Projeção da carteira atual, em cache por (versão das posições, parâmetros).
+
+        As posições vêm do view model do dashboard (já avaliadas a mercado pelo
+        CalculationService); cotações novas não invalidam a projeção. Pedidos
+        simultâneos iguais esperam o mesmo cálculo, que roda fora do event loop.
+        """
+        async with async_session_factory() as session:
+            chave = (await cls.positions_version(session), params)
+        if chave in cls._cache:
+            cls._cache.move_to_end(chave)
+            return cls._cache[chave]
+
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            if chave not in cls._cache:
+                vm = await DashboardService.get_view_model()
+                async with async_session_factory() as session:
+                    frame = await session.run_sync(AggregationService.transactions_frame)
+                    fatores = await session.run_sync(AdjustmentFactors.load)
+                precos = await asyncio.to_thread(HistoryService.price_matrix, frame, None, fatores)
+                cls._cache[chave] = await asyncio.to_thread(ProjectionService.project, vm.posicoes, precos, params)
+                if len(cls._cache) > LIMITE_CACHE:
+                    cls._cache.popitem(last=False)
+        return cls._cache[chave]
@@ -0,0 +1,177 @@
+import asyncio
+import csv
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+class QuoteProvider(ABC):
+    """Fonte de cotações. Implementações só precisam buscar um lote de tickers."""
+
+    @abstractmethod
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        """Retorna {ticker: preço}; tickers desconhecidos podem ser omitidos."""
+
+class StaticQuoteProvider(QuoteProvider):
+    """Provedor em memória, usado em testes e como fallback."""
+
+    def __init__(self, prices: Dict[str, float]):
+        self.prices = dict(prices)
+        self.calls = 0
+
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        self.calls += 1
+        return {t: self.prices[t] for t in tickers if t in self.prices}
+
+class FileQuoteProvider(QuoteProvider):
+    """
+    Lê cotações de um arquivo local (.json {ticker: preço} ou .csv ticker,preco).
+    O arquivo só é relido quando a data de modificação muda.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._mtime: Optional[float] = None
+        self._prices: Dict[str, float] = {}
+
+    def _load(self):
+        mtime = self.path.stat().st_mtime
+        if mtime == self._mtime:
+            return
+        if self.path.suffix == '.json':
+            prices = json.loads(self.path.read_text(encoding='utf-8'))
+        else:
+            with self.path.open(encoding='utf-8', newline='') as f:
+                prices = {row['ticker']: row['preco'] for row in csv.DictReader(f)}
+        self._prices = {t.upper(): float(p) for t, p in prices.items()}
+        self._mtime = mtime
+
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        self._load()
+        return {t: self._prices[t] for t in tickers if t in self._prices}
+
+class QuoteCache:
+    """
+    Cache em processo na frente de um QuoteProvider.
+
+    - TTL por entrada;
+    - tamanho limitado com descarte LRU;
+    - single-flight: pedidos simultâneos pelo mesmo ticker aguardam a mesma
+      busca, e todos os tickers faltantes de uma chamada vão num único lote.
+    """
+
+    def __init__(self, provider: QuoteProvider, ttl: float = 60.0, maxsize: int = 1024):
+        self.provider = provider
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.version = 0  # Incrementa sempre que um preço muda
+
+    def _get_fresh(self, ticker: str, agora: float) -> Optional[float]:
+        entrada = self._entries.get(ticker)
+        if entrada is None:
+            return None
+        preco, expira = entrada
+        if expira < agora:
+            del self._entries[ticker]
+            return None
+        self._entries.move_to_end(ticker)
+        return preco
+
+    def _put(self, ticker: str, preco: float, agora: float):
+        anterior = self._entries.get(ticker)
+        if anterior is None or anterior[0] != preco:
+            self.version += 1
+        self._entries[ticker] = (preco, agora + self.ttl)
+        self._entries.move_to_end(ticker)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tickers: Optional[Iterable[str]] = None):
+        if tickers is None:
+            self._entries.clear()
+        else:
+            for t in tickers:
+                self._entries.pop(t, None)
+        self.version += 1
+
+    async def get(self, ticker: str) -> Optional[float]:
+        return (await self.get_many([ticker])).get(ticker)
+
+    async def get_many(self, tickers: Iterable[str]) -> Dict[str, float]:
+        agora = time.monotonic()
+        resultado: Dict[str, float] = {}
+        aguardar: Dict[str, asyncio.Future] = {}
+        buscar: List[str] = []
+
+        for ticker in dict.fromkeys(tickers):
+            preco = self._get_fresh(ticker, agora)
+            if preco is not None:
+                resultado[ticker] = preco
+            elif ticker in self._inflight:
+                aguardar[ticker] = self._inflight[ticker]
+            else:
+                buscar.append(ticker)
+
+        if buscar:
+            loop = asyncio.get_running_loop()
+            futuros = {t: loop.create_future() for t in buscar}
+            self._inflight.update(futuros)
+            try:
+                precos = await self.provider.fetch(buscar)
+            except Exception as erro:
+                for f in futuros.values():
+                    f.set_exception(erro)
+                    f.exception()  # Evita aviso de exceção não recuperada
+                raise
+            except BaseException:
+                # Busca cancelada (CancelledError não é Exception): libera quem aguardava
+                for f in futuros.values():
+                    f.cancel()
+                raise
+            finally:
+                for t in buscar:
+                    self._inflight.pop(t, None)
+
+            agora = time.monotonic()
+            for t, f in futuros.items():
+                preco = precos.get(t)
+                if preco is not None:
+                    self._put(t, preco, agora)
+                    resultado[t] = preco
+                f.set_result(preco)
+
+        for t, f in aguardar.items():
+            try:
+                # shield: cancelar esta chamada não cancela o futuro compartilhado
+                preco = await asyncio.shield(f)
+            except asyncio.CancelledError:
+                if not f.cancelled():
+                    raise
+                # Quem buscava foi cancelado: busca de novo por conta própria
+                preco = (await self.get_many([t])).get(t)
+            if preco is not None:
+                resultado[t] = preco
+
+        return resultado
+
+_quote_cache: Optional[QuoteCache] = None
+
+def get_quote_cache() -> QuoteCache:
+    """Cache global do processo, configurado pelo Settings."""
+    global _quote_cache
+    if _quote_cache is None:
+        if settings.QUOTES_FILE:
+            provider: QuoteProvider = FileQuoteProvider(settings.QUOTES_FILE)
+        else:
+            provider = StaticQuoteProvider({})
+        _quote_cache = QuoteCache(
+            provider,
+            ttl=settings.QUOTES_TTL_SECONDS,
+            maxsize=settings.QUOTES_CACHE_SIZE,
+        )
+    return _quote_cache
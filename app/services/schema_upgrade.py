@@ -0,0 +1,99 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+from sqlalchemy import Column, Index, Table, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel
+from app.services.batch import TABELAS_DERIVADAS
+
+@dataclass
+class UpgradePlan:
+    """Diferenças entre o banco e os modelos atuais."""
+    recriar: List[str] = field(default_factory=list)  # Tabelas derivadas com chave/colunas antigas
+    colunas: List[Tuple[str, str]] = field(default_factory=list)  # (tabela, coluna) a adicionar
+    indices: List[Tuple[str, str]] = field(default_factory=list)  # (tabela, índice) a criar
+
+    def __bool__(self) -> bool:
+        return bool(self.recriar or self.colunas or self.indices)
+
+class SchemaUpgradeService:
+    """
+    Leva um banco criado por uma versão anterior para o esquema dos modelos.
+
+    `create_all` só cria tabelas que não existem. Nas tabelas de origem
+    (transações, proventos...) as colunas novas entram com ALTER TABLE ADD
+    COLUMN, usando o default do banco (ex.: `portfolio_id` = 1). As tabelas
+    derivadas com chave, colunas ou tipos diferentes são recriadas vazias e depois
+    refeitas pelo recálculo completo (BatchRecomputeService), como no
+    `recompute.py`.
+    """
+
+    @staticmethod
+    def _tipo_python(tipo):
+        try:
+            tipo_python = tipo.python_type
+        except NotImplementedError:
+            return None
+        # Tipo sem equivalente conhecido (ex.: AutoString do sqlmodel) não entra na comparação
+        return None if tipo_python is object else tipo_python
+
+    @staticmethod
+    def _desatualizada(tabela: Table, inspetor) -> bool:
+        colunas = inspetor.get_columns(tabela.name)
+        chave = inspetor.get_pk_constraint(tabela.name)['constrained_columns']
+        if (
+            {c['name'] for c in colunas} != set(tabela.columns.keys())
+            or set(chave) != {c.name for c in tabela.primary_key.columns}
+        ):
+            return True
+        # Mesmas colunas com tipo trocado (ex.: quantidade INTEGER -> FLOAT)
+        for coluna in colunas:
+            atual = SchemaUpgradeService._tipo_python(coluna['type'])
+            esperado = SchemaUpgradeService._tipo_python(tabela.columns[coluna['name']].type)
+            if atual is not None and esperado is not None and atual is not esperado:
+                return True
+        return False
+
+    @staticmethod
+    def plan(engine: Engine) -> UpgradePlan:
+        inspetor = inspect(engine)
+        existentes = set(inspetor.get_table_names())
+        plano = UpgradePlan()
+
+        for tabela in SQLModel.metadata.sorted_tables:
+            if tabela.name not in existentes:
+                continue  # create_all cria com colunas e índices
+            if tabela.name in TABELAS_DERIVADAS:
+                if SchemaUpgradeService._desatualizada(tabela, inspetor):
+                    plano.recriar.append(tabela.name)
+                    continue
+            else:
+                atuais = {c['name'] for c in inspetor.get_columns(tabela.name)}
+                plano.colunas += [(tabela.name, c.name) for c in tabela.columns if c.name not in atuais]
+
+            atuais = {i['name'] for i in inspetor.get_indexes(tabela.name)}
+            plano.indices += [(tabela.name, i.name) for i in tabela.indexes if i.name not in atuais]
+        return plano
+
+    @staticmethod
+    def _coluna(tabela: str, nome: str) -> Column:
+        coluna = SQLModel.metadata.tables[tabela].columns[nome]
+        if not coluna.nullable and coluna.server_default is None:
+            raise ValueError(f"{tabela}.{nome} é obrigatória e não tem default no banco: migre manualmente")
+        return coluna
+
+    @staticmethod
+    def apply(engine: Engine, plano: UpgradePlan):
+        """Aplica o plano numa transação e cria as tabelas que faltam (sem recalcular nada)."""
+        tabelas = SQLModel.metadata.tables
+        with engine.begin() as conn:
+            for nome in plano.recriar:
+                tabelas[nome].drop(conn)
+            for tabela, nome in plano.colunas:
+                coluna = CreateColumn(SchemaUpgradeService._coluna(tabela, nome)).compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {coluna}'))
+            indices = {(i.table.name, i.name): i for t in tabelas.values() for i in t.indexes}
+            for chave in plano.indices:
+                indice: Index = indices[chave]
+                indice.create(conn)
+            SQLModel.metadata.create_all(conn)
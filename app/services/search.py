@@ -0,0 +1,120 @@
+import asyncio
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from sqlalchemy import select, union
+from sqlmodel import Session
+from app.core.config import settings
+from app.db.session import async_session_factory
+from app.db.versioning import data_version
+from app.models.earnings import Earnings
+from app.models.transaction import Transaction
+
+# Tabelas de onde vêm os tickers conhecidos
+TABELAS_BUSCA = ('transacoes', 'proventos')
+LIMITE_RESULTADOS = 8
+_FIM = '\uffff'  # Maior que qualquer caractere normalizado: fecha o intervalo do prefixo
+
+def normalize(texto: str) -> str:
+    """Maiúsculas, sem acentos e com espaços simples ("Itaúsa  pn" -> "ITAUSA PN")."""
+    sem_acento = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return ' '.join(sem_acento.upper().split())
+
+@dataclass(frozen=True)
+class TickerMatch:
+    ticker: str
+    nome: str = ''
+
+class TickerIndex:
+    """
+    Índice de prefixos em arrays ordenados (busca binária com bisect).
+
+    Tickers e nomes ficam em arrays separados para que casamentos pelo ticker
+    venham antes dos casamentos pelo nome. Cada nome é indexado a partir de
+    cada palavra ("Banco do Brasil" casa com "BRA" e com "DO BR").
+    """
+
+    def __init__(self, nomes: Dict[str, str]):
+        self.ativos: List[TickerMatch] = [TickerMatch(t, nomes[t]) for t in sorted(nomes)]
+        self._tickers: List[Tuple[str, int]] = sorted(
+            (normalize(a.ticker), i) for i, a in enumerate(self.ativos)
+        )
+        chaves_nome = []
+        for i, ativo in enumerate(self.ativos):
+            palavras = normalize(ativo.nome).split()
+            chaves_nome.extend((' '.join(palavras[k:]), i) for k in range(len(palavras)))
+        self._nomes: List[Tuple[str, int]] = sorted(chaves_nome)
+
+    def __len__(self) -> int:
+        return len(self.ativos)
+
+    @staticmethod
+    def _prefixo(chaves: List[Tuple[str, int]], consulta: str):
+        inicio = bisect_left(chaves, (consulta,))
+        fim = bisect_left(chaves, (consulta + _FIM,), lo=inicio)
+        for _, i in chaves[inicio:fim]:
+            yield i
+
+    def search(self, consulta: str, limite: int = LIMITE_RESULTADOS) -> List[TickerMatch]:
+        consulta = normalize(consulta)
+        if not consulta or limite <= 0:
+            return []
+
+        vistos, resultados = set(), []
+        for chaves in (self._tickers, self._nomes):
+            for i in self._prefixo(chaves, consulta):
+                if i not in vistos:
+                    vistos.add(i)
+                    resultados.append(self.ativos[i])
+                    if len(resultados) == limite:
+                        return resultados
+        return resultados
+
+class TickerSearchService:
+    """
+    Busca do header compartilhada por todos os clientes.
+
+    O índice vive em memória e só é reconstruído quando `transacoes` ou
+    `proventos` mudam de versão (inclusive por commits de outros processos);
+    digitar na busca só lê as duas linhas de versão, nunca as tabelas.
+    """
+
+    _indice: TickerIndex = TickerIndex({})
+    _versao: Optional[tuple] = None
+    _lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def load_asset_names(path: Optional[str] = None) -> Dict[str, str]:
+        """CSV opcional ticker,nome com os ativos pesquisáveis além dos que já estão no banco."""
+        path = path or settings.ASSETS_FILE
+        if not path:
+            return {}
+        ativos = pd.read_csv(path, dtype=str).fillna('')
+        return dict(zip(ativos['ticker'].str.strip().str.upper(), ativos['nome'].str.strip()))
+
+    @classmethod
+    def refresh(cls, session: Session):
+        versao = data_version.key(session, TABELAS_BUSCA)
+        tickers = session.execute(union(select(Transaction.ticker), select(Earnings.ticker))).scalars()
+        nomes = cls.load_asset_names()
+        cls._indice = TickerIndex({**{t: '' for t in tickers}, **nomes})
+        cls._versao = versao
+
+    @classmethod
+    async def refresh_async(cls):
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        async with cls._lock:
+            async with async_session_factory() as session:
+                if cls._versao != await data_version.key_async(session, TABELAS_BUSCA):
+                    await session.run_sync(cls.refresh)
+
+    @classmethod
+    async def search_async(cls, consulta: str, limite: int = LIMITE_RESULTADOS) -> List[TickerMatch]:
+        async with async_session_factory() as session:
+            atual = await data_version.key_async(session, TABELAS_BUSCA)
+        if cls._versao != atual:
+            await cls.refresh_async()
+        return cls._indice.search(consulta, limite)
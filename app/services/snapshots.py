@@ -0,0 +1,414 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from app.core.metrics import timed
+from app.db.session import engine
+from app.models.earnings import Earnings
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.position import PositionHistory
+from app.models.snapshot import PortfolioSnapshot, SnapshotPending
+from app.models.transaction import Transaction
+from app.services.adjustments import AdjustmentFactors
+from app.services.aggregation import AggregationService
+from app.services.earnings import month_start
+from app.services.history import PERIODOS, HistoryService, period_start
+from app.services.portfolio import COLUNAS_TRANSACAO
+
+logger = logging.getLogger(__name__)
+
+DIARIA, SEMANAL, MENSAL = 'D', 'S', 'M'
+
+# (granularidade, frequência do rollup no pandas, dias por linha, retenção em dias; None = para sempre)
+NIVEIS: List[Tuple[str, Optional[str], int, Optional[int]]] = [
+    (DIARIA, None, 1, 400),        # Cobre "1 ano" com folga
+    (SEMANAL, 'W-SUN', 7, 1_860),  # Cobre "5 anos"
+    (MENSAL, 'M', 30, None),
+]
+LIMITE_PONTOS = 400  # Máximo de linhas lidas por opção do seletor de período
+
+COLUNAS_SNAPSHOT = ['valor', 'custo', 'proventos']
+
+class SnapshotService:
+    """
+    Histórico pré-agregado da carteira em três níveis de granularidade.
+
+    As linhas diárias são mantidas pelos últimos ~13 meses, as semanais por
+    ~5 anos e as mensais para sempre, então o armazenamento cresce ~12 linhas
+    por ano. Cada opção do seletor de período lê o nível mais fino que cubra
+    o intervalo em até LIMITE_PONTOS linhas.
+
+    Importação, recálculo e eventos societários refazem os snapshots na hora.
+    O caminho incremental (uma transação ou provento por vez) só marca a
+    carteira com `mark_stale`; a marca é aplicada antes do dashboard montar o
+    histórico e pela rotina diária (`run_daily_async`), que também estende a
+    série até o dia corrente e compacta.
+    """
+
+    @staticmethod
+    def _opening_state(session: Session, portfolio_id: int, desde: date, fatores: AdjustmentFactors) -> pd.DataFrame:
+        """
+        Estado de cada ticker no fim da véspera de `desde`, lido de `posicoes_historico`.
+
+        Quantidade e custo já estão na base atual; o preço é o da última
+        negociação anterior, que serve de cotação quando não há histórico de
+        mercado configurado. Tickers zerados também entram: o calendário das
+        negociações começa na véspera como começaria no recálculo completo.
+        """
+        h = PositionHistory.__table__.c
+        ultimo = (
+            select(h.ticker, func.max(h.data).label('data'))
+            .where(h.portfolio_id == portfolio_id, h.data < desde)
+            .group_by(h.ticker)
+            .subquery()
+        )
+        abertura = pd.DataFrame(session.execute(
+            select(h.ticker, h.quantidade, h.total_investido)
+            .join(ultimo, and_(h.ticker == ultimo.c.ticker, h.data == ultimo.c.data))
+            .where(h.portfolio_id == portfolio_id)
+        ).all(), columns=['ticker', 'quantidade', 'total_investido'])
+
+        t = Transaction.__table__.c
+        ordem = func.row_number().over(partition_by=t.ticker, order_by=(t.data.desc(), t.id.desc()))
+        ultimas = (
+            select(t.ticker, t.data, t.preco, ordem.label('ordem'))
+            .where(t.portfolio_id == portfolio_id, t.data < desde)
+            .subquery()
+        )
+        precos = {
+            ticker: preco / fatores.factor(ticker, dia)
+            for ticker, dia, preco in session.execute(
+                select(ultimas.c.ticker, ultimas.c.data, ultimas.c.preco).where(ultimas.c.ordem == 1)
+            ).all()
+        }
+        return abertura.assign(preco=abertura['ticker'].map(precos).astype(float))
+
+    @staticmethod
+    def daily_frame(
+        session: Session,
+        portfolio_id: int = CARTEIRA_PADRAO,
+        fim: Optional[date] = None,
+        desde: Optional[date] = None,
+        precos: Optional[pd.DataFrame] = None,
+        fatores: Optional[AdjustmentFactors] = None,
+    ) -> pd.DataFrame:
+        """
+        Valor de mercado, custo investido e proventos do dia, no calendário de preços.
+
+        Com `desde`, parte do estado gravado na véspera (`_opening_state`) e só
+        lê as transações, custos e proventos a partir dele; as linhas começam
+        no primeiro dia do calendário a partir de `desde`. `precos` (matriz do
+        histórico de mercado, já ajustada) e `fatores` evitam reler o arquivo e
+        os eventos quando várias carteiras são calculadas em sequência.
+        """
+        if fatores is None:
+            fatores = AdjustmentFactors.load(session)
+        frame = AggregationService.transactions_frame(session, portfolio_id=portfolio_id, desde=desde)
+        h = PositionHistory.__table__.c
+        consulta_custos = select(h.data, h.ticker, h.total_investido).where(h.portfolio_id == portfolio_id)
+        if desde is not None:
+            consulta_custos = consulta_custos.where(h.data >= desde)
+        custos = pd.DataFrame(session.execute(consulta_custos).all(), columns=['data', 'ticker', 'total_investido'])
+
+        if desde is not None:
+            # Saldo da véspera como compra sintética: a regra de zerar continua valendo a partir dele
+            abertura = SnapshotService._opening_state(session, portfolio_id, desde, fatores)
+            vespera = pd.Timestamp(desde) - pd.Timedelta(days=1)
+            frame = pd.concat(
+                [abertura.assign(data=vespera, tipo='C')[COLUNAS_TRANSACAO], frame], ignore_index=True,
+            )
+            custos = pd.concat([abertura.assign(data=vespera)[custos.columns], custos], ignore_index=True)
+        if frame.empty:
+            return pd.DataFrame(columns=COLUNAS_SNAPSHOT, dtype=float)
+
+        if precos is None:
+            precos = HistoryService.price_matrix(frame, fim, fatores)
+        corte = None
+        if desde is not None and not precos.empty:
+            # O último dia antes de `desde` fica no cálculo só para carregar preço e limitar os proventos
+            precos = precos.sort_index().ffill()
+            anteriores = precos.index[precos.index < pd.Timestamp(desde)]
+            if len(anteriores):
+                corte = anteriores[-1]
+                precos = precos[precos.index >= corte]
+        valor = HistoryService.portfolio_value(frame, precos)
+        if desde is not None:
+            valor = valor[valor.index >= pd.Timestamp(desde)]
+        calendario = valor.index
+
+        # Custo: último estado de cada ticker até o dia (posicoes_historico só tem dias com movimento)
+        if custos.empty:
+            custo = pd.Series(0.0, index=calendario)
+        else:
+            matriz = custos.assign(data=pd.to_datetime(custos['data'])) \
+                .pivot_table(index='data', columns='ticker', values='total_investido', aggfunc='last')
+            custo = matriz.reindex(matriz.index.union(calendario)).ffill().reindex(calendario).fillna(0.0).sum(axis=1)
+
+        # Proventos em dias fora do calendário contam no próximo dia dele
+        consulta_proventos = select(Earnings.data, func.sum(Earnings.valor_total)) \
+            .where(Earnings.portfolio_id == portfolio_id)
+        if corte is not None:
+            consulta_proventos = consulta_proventos.where(Earnings.data > corte.date())
+        eventos = session.execute(consulta_proventos.group_by(Earnings.data)).all()
+        proventos = np.zeros(len(calendario))
+        if eventos:
+            datas, valores = zip(*eventos)
+            linhas = calendario.searchsorted(pd.to_datetime(list(datas)), side='left')
+            validas = linhas < len(calendario)
+            np.add.at(proventos, linhas[validas], np.asarray(valores, dtype=np.float64)[validas])
+
+        return pd.DataFrame(
+            {'valor': valor.to_numpy(), 'custo': custo.to_numpy(), 'proventos': proventos},
+            index=calendario,
+        )
+
+    @staticmethod
+    def _linhas(portfolio_id: int, granularidade: str, frame: pd.DataFrame) -> List[dict]:
+        return [
+            {'portfolio_id': portfolio_id, 'granularidade': granularidade, 'data': dia.date(),
+             'valor': float(valor), 'custo': float(custo), 'proventos': float(proventos)}
+            for dia, valor, custo, proventos in frame[COLUNAS_SNAPSHOT].itertuples()
+        ]
+
+    @staticmethod
+    def _inicio_periodo(dia, frequencia: str) -> date:
+        return pd.Timestamp(dia).to_period(frequencia).start_time.date()
+
+    @staticmethod
+    @timed('snapshots.refresh')
+    def refresh(
+        session: Session,
+        portfolio_id: int = CARTEIRA_PADRAO,
+        desde: Optional[date] = None,
+        hoje: Optional[date] = None,
+        precos: Optional[pd.DataFrame] = None,
+        fatores: Optional[AdjustmentFactors] = None,
+    ):
+        """
+        Regrava as linhas diárias a partir de `desde` e compacta (`precos` e `fatores` como em `daily_frame`).
+
+        Sem `desde`, ou quando o mês de `desde` já perdeu o detalhe diário, refaz
+        todos os níveis da carteira a partir das transações. Um `desde` depois da
+        última linha diária recua até ela, para não deixar buraco na série.
+        """
+        hoje = hoje or date.today()
+        s = PortfolioSnapshot
+
+        primeira_diaria, ultima_diaria = session.execute(
+            select(func.min(s.data), func.max(s.data))
+            .where(s.portfolio_id == portfolio_id, s.granularidade == DIARIA)
+        ).one()
+        if desde is not None and ultima_diaria is not None:
+            desde = min(desde, ultima_diaria)
+        if desde is None or primeira_diaria is None or month_start(desde) < primeira_diaria:
+            session.execute(delete(s).where(s.portfolio_id == portfolio_id))
+            desde = None
+        else:
+            # Os rollups dos períodos que contêm `desde` são refeitos pela compactação
+            session.execute(delete(s).where(
+                s.portfolio_id == portfolio_id, s.granularidade == DIARIA, s.data >= desde
+            ))
+            for granularidade, frequencia, _, _ in NIVEIS[1:]:
+                session.execute(delete(s).where(
+                    s.portfolio_id == portfolio_id, s.granularidade == granularidade,
+                    s.data >= SnapshotService._inicio_periodo(desde, frequencia),
+                ))
+
+        # Incremental: só os dias a partir de `desde`, partindo do estado gravado na véspera
+        diario = SnapshotService.daily_frame(session, portfolio_id, hoje, desde, precos, fatores)
+        if not diario.empty:
+            session.execute(insert(s), SnapshotService._linhas(portfolio_id, DIARIA, diario))
+        SnapshotService.compact(session, portfolio_id, hoje)
+
+    @staticmethod
+    @timed('snapshots.compact')
+    def compact(session: Session, portfolio_id: int = CARTEIRA_PADRAO, hoje: Optional[date] = None):
+        """
+        Consolida as linhas diárias em semanais e mensais e aplica a retenção de cada nível.
+
+        Cada nível é refeito a partir do seu último período gravado (que pode
+        estar incompleto); períodos anteriores, e os que já perderam dias para a
+        retenção, ficam como foram consolidados enquanto o detalhe diário existia.
+        """
+        hoje = hoje or date.today()
+        s = PortfolioSnapshot
+        linhas = session.execute(
+            select(s.data, s.valor, s.custo, s.proventos)
+            .where(s.portfolio_id == portfolio_id, s.granularidade == DIARIA)
+            .order_by(s.data)
+        ).all()
+        diario = pd.DataFrame(linhas, columns=['data', *COLUNAS_SNAPSHOT])
+        diario['data'] = pd.to_datetime(diario['data'])
+
+        # Sem linhas anteriores à primeira diária, o detalhe diário cobre todo o histórico
+        primeira = linhas[0].data if linhas else None
+        truncado = primeira is not None and session.execute(
+            select(s.data).where(s.portfolio_id == portfolio_id, s.data < primeira).limit(1)
+        ).first() is not None
+
+        for granularidade, frequencia, _, _ in NIVEIS[1:]:
+            ultimo = session.execute(
+                select(func.max(s.data)).where(s.portfolio_id == portfolio_id, s.granularidade == granularidade)
+            ).scalar()
+            pendente = diario
+            if ultimo is not None:
+                inicio = SnapshotService._inicio_periodo(ultimo, frequencia)
+                if truncado and inicio < primeira:
+                    # O período do último rollup já perdeu dias: fica como está
+                    pendente = diario[diario['data'] > pd.Timestamp(ultimo)]
+                else:
+                    pendente = diario[diario['data'] >= pd.Timestamp(inicio)]
+                    session.execute(delete(s).where(
+                        s.portfolio_id == portfolio_id, s.granularidade == granularidade, s.data >= inicio
+                    ))
+            if pendente.empty:
+                continue
+
+            grupos = pendente.groupby(pendente['data'].dt.to_period(frequencia)).agg(
+                data=('data', 'last'), valor=('valor', 'last'),
+                custo=('custo', 'last'), proventos=('proventos', 'sum'),
+            )
+            session.execute(insert(s), SnapshotService._linhas(
+                portfolio_id, granularidade, grupos.set_index('data')
+            ))
+
+        for granularidade, _, _, retencao in NIVEIS:
+            if retencao is not None:
+                session.execute(delete(s).where(
+                    s.portfolio_id == portfolio_id, s.granularidade == granularidade,
+                    s.data < hoje - timedelta(days=retencao),
+                ))
+
+    @staticmethod
+    def mark_stale(session: Session, portfolio_id: int, desde: date):
+        """Marca os snapshots da carteira para refazer a partir de `desde` (vale o dia mais antigo)."""
+        pendente = session.get(SnapshotPending, portfolio_id)
+        if pendente is None:
+            session.add(SnapshotPending(portfolio_id=portfolio_id, desde=desde))
+        elif desde < pendente.desde:
+            pendente.desde = desde
+            session.add(pendente)
+
+    @staticmethod
+    @timed('snapshots.apply_pending')
+    def apply_pending(
+        session: Session,
+        portfolio_id: Optional[int] = None,
+        hoje: Optional[date] = None,
+    ) -> List[int]:
+        """
+        Refaz os snapshots marcados por `mark_stale` e remove as marcas.
+
+        Carteira ainda sem snapshots só perde a marca: o dashboard calcula a
+        série dela direto das transações. Retorna as carteiras que estavam marcadas.
+        """
+        consulta = select(SnapshotPending)
+        if portfolio_id is not None:
+            consulta = consulta.where(SnapshotPending.portfolio_id == portfolio_id)
+        pendentes = session.execute(consulta).scalars().all()
+        for pendente in pendentes:
+            tem_snapshots = session.execute(
+                select(PortfolioSnapshot.data).where(PortfolioSnapshot.portfolio_id == pendente.portfolio_id).limit(1)
+            ).first() is not None
+            if tem_snapshots:
+                SnapshotService.refresh(session, pendente.portfolio_id, desde=pendente.desde, hoje=hoje)
+            session.delete(pendente)
+        return [p.portfolio_id for p in pendentes]
+
+    @staticmethod
+    def _apply_pending_commit(engine: Engine, portfolio_id: Optional[int] = None) -> List[int]:
+        with Session(engine) as session:
+            carteiras = SnapshotService.apply_pending(session, portfolio_id)
+            if carteiras:
+                session.commit()
+            return carteiras
+
+    @staticmethod
+    async def apply_pending_async(engine: Engine, portfolio_id: Optional[int] = None) -> List[int]:
+        """
+        `apply_pending` numa thread com sessão síncrona própria.
+
+        O refresh lê preços e recalcula séries; rodando via `run_sync` ele
+        ocuparia a thread do event loop e travaria todos os clientes.
+        """
+        return await asyncio.to_thread(SnapshotService._apply_pending_commit, engine, portfolio_id)
+
+    @staticmethod
+    def _roll_forward_commit(engine: Engine) -> List[int]:
+        with Session(engine) as session:
+            carteiras = SnapshotService.roll_forward(session)
+            session.commit()
+            return carteiras
+
+    @staticmethod
+    @timed('snapshots.roll_forward')
+    def roll_forward(session: Session, hoje: Optional[date] = None) -> List[int]:
+        """
+        Rotina diária: estende os snapshots de todas as carteiras até `hoje`.
+
+        Refaz a partir da última linha diária (ou da marca pendente mais antiga),
+        o que também consolida os rollups e aplica a retenção de cada nível.
+        """
+        hoje = hoje or date.today()
+        carteiras = session.execute(select(PortfolioSnapshot.portfolio_id).distinct()).scalars().all()
+        for portfolio_id in carteiras:
+            SnapshotService.mark_stale(session, portfolio_id, hoje)
+        return SnapshotService.apply_pending(session, hoje=hoje)
+
+    @staticmethod
+    async def run_daily_async():
+        """Roda `roll_forward` na subida do servidor e depois a cada virada de dia."""
+        while True:
+            try:
+                # Fora do event loop, como em apply_pending_async
+                await asyncio.to_thread(SnapshotService._roll_forward_commit, engine)
+            except Exception:
+                logger.exception("Falha na atualização diária dos snapshots")
+            amanha = datetime.combine(date.today() + timedelta(days=1), time())
+            await asyncio.sleep(max((amanha - datetime.now()).total_seconds(), 1.0))
+
+    @staticmethod
+    def _granularidade(inicio: date, fim: date, cobertura: Dict[str, date]) -> str:
+        """Nível mais fino que tem linhas desde `inicio` sem passar de LIMITE_PONTOS."""
+        for granularidade, _, passo, _ in NIVEIS:
+            primeira = cobertura.get(granularidade)
+            if primeira is not None and primeira <= inicio and (fim - inicio).days / passo <= LIMITE_PONTOS:
+                return granularidade
+        return MENSAL
+
+    @staticmethod
+    def load_periods(session: Session, portfolio_id: int = CARTEIRA_PADRAO) -> Dict[str, pd.Series]:
+        """Série de valor de cada opção do seletor de período ({} se não houver snapshots)."""
+        s = PortfolioSnapshot
+        cobertura = dict(session.execute(
+            select(s.granularidade, func.min(s.data))
+            .where(s.portfolio_id == portfolio_id)
+            .group_by(s.granularidade)
+        ).all())
+        if not cobertura:
+            return {}
+
+        fim = session.execute(select(func.max(s.data)).where(s.portfolio_id == portfolio_id)).scalar()
+        inicio_historico = min(cobertura.values())
+
+        series = {}
+        for periodo in PERIODOS:
+            inicio = period_start(fim, periodo, inicio_historico).date()
+            inicio = max(inicio, inicio_historico)
+            granularidade = SnapshotService._granularidade(inicio, fim, cobertura)
+            linhas = session.execute(
+                select(s.data, s.valor)
+                .where(s.portfolio_id == portfolio_id, s.granularidade == granularidade, s.data >= inicio)
+                .order_by(s.data)
+            ).all()
+            series[periodo] = pd.Series(
+                [valor for _, valor in linhas],
+                index=pd.DatetimeIndex([dia for dia, _ in linhas]),
+                name='carteira', dtype=float,
+            )
+        return series
@@ -0,0 +1,122 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from sqlmodel import Session
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.schemas.portfolio import PositionSummary
+from app.services.adjustments import AdjustmentFactors
+from app.services.aggregation import AggregationService
+from app.services.portfolio import CalculationService
+
+SINAIS = {'C': 1, 'V': -1}
+_EPOCA = date(1970, 1, 1).toordinal()
+
+class TransactionStore:
+    """
+    Representação compacta e somente leitura das transações para o cálculo.
+
+    Arrays paralelos tipados em vez de objetos SQLModel: tickers internados em
+    códigos int32, datas como ordinal int32, quantidades e preços float64 e
+    compra/venda como sinal int8. Cerca de 25 bytes por transação, contra ~1 KB
+    de um objeto ORM. Quantidades em float64 não estouram em posições grandes
+    e aceitam as frações dos eventos societários.
+
+    Guarda as quantidades e preços como gravados; os eventos societários
+    entram no cálculo pelos fatores em `fatores`.
+    """
+
+    __slots__ = ('tickers', 'codigos', 'datas', 'quantidades', 'precos', 'sinais', 'fatores')
+
+    def __init__(self, tickers: List[str], codigos, datas, quantidades, precos, sinais,
+                 fatores: Optional[AdjustmentFactors] = None):
+        self.fatores = fatores or AdjustmentFactors()
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.codigos = np.asarray(codigos, dtype=np.int32)
+        self.datas = np.asarray(datas, dtype=np.int32)
+        self.quantidades = np.asarray(quantidades, dtype=np.float64)
+        self.precos = np.asarray(precos, dtype=np.float64)
+        self.sinais = np.asarray(sinais, dtype=np.int8)
+        for array in (self.codigos, self.datas, self.quantidades, self.precos, self.sinais):
+            array.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.codigos)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.codigos, self.datas, self.quantidades, self.precos, self.sinais))
+
+    @classmethod
+    def from_rows(cls, linhas: Iterable, batch_size: int = 100_000) -> 'TransactionStore':
+        """
+        Monta o store a partir de tuplas (ticker, data, quantidade, preco, tipo),
+        convertendo em lotes para não manter listas Python do tamanho da tabela.
+        """
+        internados: Dict[str, int] = {}
+        partes: List[tuple] = []
+        lote: List[tuple] = []
+
+        def fechar_lote():
+            tickers, datas, quantidades, precos, tipos = zip(*lote)
+            partes.append((
+                np.fromiter((internados.setdefault(t, len(internados)) for t in tickers), np.int32, len(lote)),
+                np.fromiter((d.toordinal() for d in datas), np.int32, len(lote)),
+                np.fromiter(quantidades, np.float64, len(lote)),
+                np.fromiter(precos, np.float64, len(lote)),
+                np.fromiter((SINAIS.get(t, 0) for t in tipos), np.int8, len(lote)),
+            ))
+            lote.clear()
+
+        for linha in linhas:
+            lote.append(linha)
+            if len(lote) >= batch_size:
+                fechar_lote()
+        if lote:
+            fechar_lote()
+
+        colunas = [np.concatenate(c) if c else np.empty(0) for c in zip(*partes)] or [np.empty(0)] * 5
+        return cls(list(internados), *colunas)
+
+    @classmethod
+    def from_session(
+        cls,
+        session: Session,
+        batch_size: int = 100_000,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> 'TransactionStore':
+        """Carrega a carteira direto do cursor do banco, sem hidratar objetos ORM."""
+        linhas = (
+            tuple(l)[1:]
+            for l in AggregationService.stream_transactions(
+                session, batch_size, portfolio_id=portfolio_id, ajustar=False
+            )
+        )
+        store = cls.from_rows(linhas, batch_size)
+        store.fatores = AdjustmentFactors.load(session)
+        return store
+
+    def positions(self, ate: Optional[date] = None) -> List[PositionSummary]:
+        """Posições (opcionalmente até uma data) pelo motor colunar."""
+        mascara = slice(None) if ate is None else self.datas <= ate.toordinal()
+        sinais = self.sinais[mascara]
+        codigos, datas = self.codigos[mascara], self.datas[mascara]
+        quantidades, precos = self.quantidades[mascara], self.precos[mascara]
+
+        if self.fatores and len(codigos):
+            # Ajuste na leitura, vetorizado: ordinal -> datetime64 para a busca nas datas "ex"
+            fatores = self.fatores.factors(
+                self.tickers[codigos], (datas - _EPOCA).astype('datetime64[D]')
+            )
+            if (fatores != 1.0).any():
+                quantidades = AdjustmentFactors.scale_quantities(quantidades, fatores)
+                precos = precos / fatores
+
+        return CalculationService.calculate_positions_arrays(
+            codigos=codigos,
+            tickers=self.tickers,
+            datas=datas,
+            quantidades=quantidades,
+            precos=precos,
+            compras=sinais > 0,
+            vendas=sinais < 0,
+        )
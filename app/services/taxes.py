@@ -0,0 +1,268 @@
+import os
+from dataclasses import dataclass, field, asdict
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+from sqlalchemy import select
+from sqlmodel import Session
+from app.core.config import settings
+from app.models.corporate_action import CorporateAction
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.transaction import Transaction
+from app.services.adjustments import CASAS_QUANTIDADE
+from app.services.aggregation import AggregationService
+from app.services.earnings import month_start
+from app.services.portfolio import CalculationService
+
+# Regras mensais de IR sobre ganho de capital em operações comuns (swing trade)
+ACAO = 'ACAO'
+FII = 'FII'
+ALIQUOTAS = {ACAO: 0.15, FII: 0.20}
+LIMITE_ISENCAO_ACOES = 20_000.00  # Vendas de ações no mês até este valor: ganho isento
+
+# Cadastro lido por arquivo, válido enquanto o mtime não mudar
+_classes_em_cache: Dict[str, Tuple[float, Dict[str, str]]] = {}
+
+def load_asset_classes(path: Optional[str] = None) -> Dict[str, str]:
+    """
+    Classes dos ativos pela coluna `classe` (ACAO ou FII) do cadastro de ativos
+    (ASSETS_FILE, o mesmo CSV ticker,nome da busca). Sem arquivo ou sem a
+    coluna, devolve um mapeamento vazio. O arquivo só é relido quando muda.
+    """
+    path = path or settings.ASSETS_FILE
+    if not path:
+        return {}
+    modificado = os.stat(path).st_mtime
+    em_cache = _classes_em_cache.get(path)
+    if em_cache is not None and em_cache[0] == modificado:
+        return dict(em_cache[1])
+
+    ativos = pd.read_csv(path, dtype=str).fillna('')
+    classes: Dict[str, str] = {}
+    if 'classe' in ativos.columns:
+        ativos = ativos[ativos['classe'].str.strip() != '']
+        classes = dict(zip(ativos['ticker'].str.strip().str.upper(), ativos['classe'].str.strip().str.upper()))
+    invalidas = sorted({c for c in classes.values() if c not in ALIQUOTAS})
+    if invalidas:
+        raise ValueError(f"Classes de ativo inválidas em {path}: {invalidas} (use {sorted(ALIQUOTAS)})")
+    _classes_em_cache[path] = (modificado, classes)
+    return dict(classes)
+
+def require_classes(tickers: Iterable[str], classes: Dict[str, str]):
+    """Um único erro de configuração listando todos os tickers sem classe."""
+    faltando = sorted(set(tickers) - set(classes))
+    if not faltando:
+        return
+    if not classes:
+        raise ValueError(
+            f"Nenhuma classe de ativo cadastrada: configure ASSETS_FILE com a coluna `classe` "
+            f"(ACAO ou FII) ou passe `classes=`. Vendas de: {faltando}"
+        )
+    raise ValueError(f"Classe de ativo desconhecida para {faltando}: informe ACAO ou FII na coluna `classe` do ASSETS_FILE")
+
+def asset_class(ticker: str, classes: Dict[str, str]) -> str:
+    """
+    Classe do ativo pelo mapeamento explícito.
+
+    Não dá para deduzir pelo código: units de ações (TAEE11, KLBN11, SANB11...)
+    também terminam em 11 e têm a isenção e a alíquota de ações.
+    """
+    classe = classes.get(ticker)
+    if classe is None:
+        raise ValueError(
+            f"Classe do ativo {ticker} desconhecida: informe ACAO ou FII na coluna `classe` do ASSETS_FILE"
+        )
+    return classe
+
+@dataclass
+class RealizedGain:
+    """Resultado realizado em uma venda (custo pelo preço médio)."""
+    data: date
+    ticker: str
+    classe: str
+    quantidade: int
+    preco_venda: float
+    preco_medio: float
+
+    @property
+    def valor_venda(self) -> float:
+        return self.quantidade * self.preco_venda
+
+    @property
+    def ganho(self) -> float:
+        return self.quantidade * (self.preco_venda - self.preco_medio)
+
+@dataclass
+class MonthlyTaxBucket:
+    """Apuração de um mês para uma classe de ativo."""
+    mes: date
+    classe: str
+    vendas: float = 0.0
+    ganho_liquido: float = 0.0
+    isento: bool = False
+    prejuizo_compensado: float = 0.0
+    base_calculo: float = 0.0
+    imposto: float = 0.0
+    prejuizo_a_compensar: float = 0.0  # Saldo após o mês
+
+@dataclass
+class TaxState:
+    """
+    Estado para continuar a apuração de onde parou: posições (para o preço
+    médio), prejuízos a compensar por classe, a data até a qual (exclusive)
+    as transações já foram aplicadas e os eventos societários já refletidos
+    nas posições.
+    Pode ser serializado com to_dict() e recarregado com TaxState(**dados).
+    """
+    posicoes: Dict[str, dict] = field(default_factory=dict)
+    prejuizos: Dict[str, float] = field(default_factory=lambda: {ACAO: 0.0, FII: 0.0})
+    processado_ate: Optional[date] = None
+    eventos: List[int] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+class TaxService:
+    """
+    P&L realizado e apuração mensal em uma única passada cronológica.
+
+    Tudo funciona como gerador sobre qualquer iterável de transações (inclusive
+    o cursor em streaming), então o relatório de anos inteiros não exige carregar
+    o histórico. Os meses são emitidos assim que fecham.
+    """
+
+    @staticmethod
+    def realized_gains(
+        transacoes: Iterable,
+        estado: Optional[TaxState] = None,
+        classes: Optional[Dict[str, str]] = None,
+    ) -> Iterator[RealizedGain]:
+        """
+        Emite um RealizedGain por venda, atualizando as posições de `estado`.
+
+        Sem `classes`, usa load_asset_classes(); vender um ativo sem classe
+        conhecida é um erro (ValueError), nunca um palpite.
+        """
+        posicoes = (estado or TaxState()).posicoes
+        classes = classes if classes is not None else load_asset_classes()
+
+        for t in transacoes:
+            posicao = posicoes.get(t.ticker)
+            if posicao is None:
+                posicao = posicoes[t.ticker] = {'qtde': 0, 'total_investido': 0.0, 'pm': 0.0}
+
+            if t.tipo == 'V' and posicao['qtde'] > 0:
+                # Venda acima da posição só realiza o que existia em carteira
+                yield RealizedGain(
+                    data=t.data,
+                    ticker=t.ticker,
+                    classe=asset_class(t.ticker, classes),
+                    quantidade=min(t.quantidade, posicao['qtde']),
+                    preco_venda=t.preco,
+                    preco_medio=posicao['pm'],
+                )
+
+            CalculationService.aplicar_transacao(posicao, t)
+
+    @staticmethod
+    def _apurar(mes: date, classe: str, vendas: float, ganho: float, estado: TaxState) -> MonthlyTaxBucket:
+        bucket = MonthlyTaxBucket(mes=mes, classe=classe, vendas=vendas, ganho_liquido=ganho)
+        prejuizo = estado.prejuizos.get(classe, 0.0)
+
+        if ganho < 0:
+            prejuizo += -ganho
+        elif classe == ACAO and vendas <= LIMITE_ISENCAO_ACOES:
+            bucket.isento = True
+        else:
+            bucket.prejuizo_compensado = min(prejuizo, ganho)
+            prejuizo -= bucket.prejuizo_compensado
+            bucket.base_calculo = ganho - bucket.prejuizo_compensado
+            bucket.imposto = round(bucket.base_calculo * ALIQUOTAS[classe], 2)
+
+        estado.prejuizos[classe] = prejuizo
+        bucket.prejuizo_a_compensar = prejuizo
+        return bucket
+
+    @staticmethod
+    def monthly_report(
+        transacoes: Iterable,
+        estado: Optional[TaxState] = None,
+        classes: Optional[Dict[str, str]] = None,
+    ) -> Iterator[MonthlyTaxBucket]:
+        """
+        Apuração mensal por classe, emitida mês a mês conforme as vendas chegam.
+
+        Com um `estado` salvo, basta passar as transações ainda não aplicadas
+        (a partir do início de um mês) para continuar a apuração incrementalmente.
+        """
+        estado = estado if estado is not None else TaxState()
+        mes_atual: Optional[date] = None
+        acumulado: Dict[str, List[float]] = {}  # classe -> [vendas, ganho]
+
+        def fechar() -> Iterator[MonthlyTaxBucket]:
+            for classe in sorted(acumulado):
+                vendas, ganho = acumulado[classe]
+                yield TaxService._apurar(mes_atual, classe, vendas, ganho, estado)
+            acumulado.clear()
+
+        for venda in TaxService.realized_gains(transacoes, estado, classes):
+            mes = month_start(venda.data)
+            if mes_atual is not None and mes != mes_atual:
+                yield from fechar()
+            mes_atual = mes
+            soma = acumulado.setdefault(venda.classe, [0.0, 0.0])
+            soma[0] += venda.valor_venda
+            soma[1] += venda.ganho
+
+        if mes_atual is not None:
+            yield from fechar()
+
+    @staticmethod
+    def monthly_report_from_db(
+        session: Session,
+        estado: Optional[TaxState] = None,
+        ate: Optional[date] = None,
+        classes: Optional[Dict[str, str]] = None,
+        batch_size: int = 10_000,
+        portfolio_id: int = CARTEIRA_PADRAO,
+    ) -> Iterator[MonthlyTaxBucket]:
+        """
+        Relatório direto do banco via cursor em streaming, só com meses fechados.
+
+        Lê as transações de `estado.processado_ate` (ou do início) até o primeiro
+        dia do mês de `ate` (hoje por padrão). Guardando o `estado` ao final, a
+        próxima execução processa apenas os meses que fecharam desde então.
+        Sem `classes`, usa load_asset_classes(); tickers vendidos no intervalo
+        sem classe falham num único ValueError antes da apuração.
+        """
+        estado = estado if estado is not None else TaxState()
+        limite = month_start(ate or date.today())
+        if estado.processado_ate is not None and estado.processado_ate >= limite:
+            return
+
+        # Cadastro incompleto falha antes de mexer no estado, e não na primeira venda sem classe
+        classes = classes if classes is not None else load_asset_classes()
+        t = Transaction.__table__.c
+        vendidos = select(t.ticker).distinct().where(t.portfolio_id == portfolio_id, t.tipo == 'V', t.data < limite)
+        if estado.processado_ate is not None:
+            vendidos = vendidos.where(t.data >= estado.processado_ate)
+        require_classes(session.execute(vendidos).scalars(), classes)
+
+        # As transações chegam na base atual de ações; eventos registrados desde
+        # a última execução levam as posições guardadas para essa mesma base
+        aplicados = set(estado.eventos)
+        e = CorporateAction.__table__.c
+        for id_evento, ticker, fator in session.execute(select(e.id, e.ticker, e.fator).order_by(e.id)):
+            if id_evento in aplicados:
+                continue
+            posicao = estado.posicoes.get(ticker)
+            if posicao is not None and posicao['qtde'] > 0:
+                posicao['qtde'] = round(posicao['qtde'] * fator, CASAS_QUANTIDADE)
+                posicao['pm'] /= fator
+            estado.eventos.append(id_evento)
+
+        transacoes = AggregationService.stream_transactions(
+            session, batch_size, desde=estado.processado_ate, ate=limite, portfolio_id=portfolio_id
+        )
+        yield from TaxService.monthly_report(transacoes, estado, classes)
+        estado.processado_ate = limite
@@ -0,0 +1,221 @@
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+# Largura aproximada do card do gráfico (col-span-5) quando não se conhece o cliente
+LARGURA_PADRAO_PX = 800
+
+# Cores e estilos de cada série do gráfico de evolução
+ESTILOS_SERIES = {
+    'carteira': {
+        'name': 'Minha Carteira',
+        'itemStyle': {'color': '#10B981'},
+        'lineStyle': {'width': 3, 'shadowColor': 'rgba(16, 185, 129, 0.5)', 'shadowBlur': 10},
+        'areaStyle': {
+            'color': {
+                'type': 'linear',
+                'x': 0, 'y': 0, 'x2': 0, 'y2': 1,
+                'colorStops': [
+                    {'offset': 0, 'color': 'rgba(16, 185, 129, 0.3)'}, 
+                    {'offset': 1, 'color': 'rgba(16, 185, 129, 0)'}
+                ]
+            }
+        }
+    },
+    'cdi': {
+        'name': 'CDI',
+        'itemStyle': {'color': '#FBBF24'},
+        'lineStyle': {'width': 2, 'type': 'dashed'}
+    },
+    'ipca': {
+        'name': 'IPCA',
+        'itemStyle': {'color': '#6B7280'},
+        'lineStyle': {'width': 2, 'type': 'dotted'}
+    },
+}
+
+def point_budget(largura_px: int = LARGURA_PADRAO_PX, pontos_por_px: float = 0.5) -> int:
+    """Quantidade de pontos que vale a pena enviar para um gráfico com essa largura."""
+    return max(int(largura_px * pontos_por_px), 3)
+
+def minmax_indices(y: np.ndarray, limite: int) -> np.ndarray:
+    """
+    Bucketização min/max: em cada balde mantém o ponto mínimo e o máximo.
+    Totalmente vetorizado; preserva picos e vales exatamente.
+    """
+    n = len(y)
+    if n <= limite:
+        return np.arange(n)
+
+    baldes = max(limite // 2 - 1, 1)
+    limites = np.linspace(1, n - 1, baldes + 1).astype(np.int64)
+    grupo = np.repeat(np.arange(baldes), np.diff(limites))
+    miolo = y[1:n - 1]
+    posicao = np.arange(1, n - 1)
+
+    ordem = np.lexsort((miolo, grupo))
+    inicio = np.r_[0, np.cumsum(np.bincount(grupo, minlength=baldes))[:-1]]
+    fim = inicio + np.bincount(grupo, minlength=baldes) - 1
+    preenchidos = fim >= inicio
+
+    escolhidos = np.concatenate((
+        [0],
+        posicao[ordem[inicio[preenchidos]]],
+        posicao[ordem[fim[preenchidos]]],
+        [n - 1],
+    ))
+    return np.unique(escolhidos)
+
+def lttb_indices(y: np.ndarray, limite: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets sobre um eixo x uniforme.
+    Mantém o formato visual da série com `limite` pontos.
+    """
+    n = len(y)
+    if n <= limite or limite < 3:
+        return np.arange(n)
+
+    limites = np.linspace(1, n - 1, limite - 1).astype(np.int64)
+    escolhidos = np.empty(limite, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    x = np.arange(n, dtype=np.float64)
+    a = 0
+
+    for i in range(limite - 2):
+        ini, fim = limites[i], limites[i + 1]
+        # Média do próximo balde (ou o último ponto)
+        prox_ini, prox_fim = fim, (limites[i + 2] if i + 2 < len(limites) else n)
+        cx = x[prox_ini:prox_fim].mean()
+        cy = y[prox_ini:prox_fim].mean()
+
+        areas = np.abs((x[a] - cx) * (y[ini:fim] - y[a]) - (x[a] - x[ini:fim]) * (cy - y[a]))
+        a = ini + int(np.argmax(areas))
+        escolhidos[i + 1] = a
+
+    return escolhidos
+
+def downsample(
+    rotulos: Sequence,
+    series: Dict[str, Sequence[float]],
+    limite: int,
+    metodo: str = 'minmax',
+) -> Tuple[List, Dict[str, List[float]]]:
+    """
+    Reduz séries que compartilham o mesmo eixo x a no máximo ~`limite` pontos.
+
+    Cada série escolhe seus pontos com o orçamento dividido entre elas e o eixo
+    final é a união dos índices, para que os picos de todas apareçam.
+    """
+    n = len(rotulos)
+    if n <= limite or not series:
+        return list(rotulos), {nome: np.asarray(valores, dtype=np.float64).tolist() for nome, valores in series.items()}
+
+    seletor = lttb_indices if metodo == 'lttb' else minmax_indices
+    por_serie = max(limite // len(series), 3)
+    indices = np.unique(np.concatenate([
+        seletor(np.asarray(valores, dtype=np.float64), por_serie)
+        for valores in series.values()
+    ]))
+
+    rotulos = [rotulos[i] for i in indices]
+    return rotulos, {
+        nome: np.asarray(valores, dtype=np.float64)[indices].round(2).tolist()
+        for nome, valores in series.items()
+    }
+
+def evolution_chart_options(
+    rotulos: Sequence,
+    series: Dict[str, Sequence[float]],
+    largura_px: int = LARGURA_PADRAO_PX,
+) -> dict:
+    """Opções do ECharts para o gráfico de Evolução Patrimonial, já reduzidas."""
+    rotulos, series = downsample(rotulos, series, point_budget(largura_px))
+
+    return {
+        'backgroundColor': 'transparent',
+        'grid': {'top': 20, 'bottom': 30, 'left': 50, 'right': 20, 'containLabel': True},
+        'tooltip': {
+            'trigger': 'axis',
+            'backgroundColor': '#1F1A1A',
+            'borderColor': '#374151',
+            'textStyle': {'color': '#fff'},
+            'valueFormatter': '(val) => "R$ " + val.toLocaleString("pt-BR", {minimumFractionDigits: 2})'
+        },
+        'legend': {'show': False}, # Legenda nativa desativada em favor da customizada
+        'xAxis': {
+            'type': 'category',
+            'data': rotulos,
+            'boundaryGap': False,
+            'axisLine': {'lineStyle': {'color': '#374151'}},
+            'axisLabel': {'color': '#9CA3AF'}
+        },
+        'yAxis': {
+            'type': 'value',
+            'splitLine': {'lineStyle': {'color': '#2A2B2F', 'type': 'dashed'}},
+            'axisLabel': {'color': '#9CA3AF'}
+        },
+        'series': [
+            {
+                **ESTILOS_SERIES[nome],
+                'type': 'line',
+                'smooth': True,
+                'showSymbol': False,
+                'data': valores,
+            }
+            for nome, valores in series.items()
+        ]
+    }
+
+# Faixas da projeção: séries com nome iniciado em "_" só existem para o empilhamento
+_TOOLTIP_PROJECAO = (
+    'params => params[0].axisValue + "<br>" + params'
+    '.filter(p => !p.seriesName.startsWith("_"))'
+    '.map(p => p.marker + p.seriesName + ": R$ " + p.value.toLocaleString("pt-BR", {maximumFractionDigits: 0}))'
+    '.join("<br>")'
+)
+
+def projection_chart_options(rotulos: Sequence[str], bandas: Dict[int, Sequence[float]], cdi: Sequence[float]) -> dict:
+    """Opções do ECharts para o leque de percentis da projeção, com a curva do CDI."""
+    faixa = lambda valores: np.asarray(valores, dtype=np.float64).round(2).tolist()
+    invisivel = {'type': 'line', 'showSymbol': False, 'lineStyle': {'opacity': 0}, 'smooth': True}
+
+    series = []
+    for inferior, superior, opacidade in ((5, 95, 0.12), (25, 75, 0.25)):
+        pilha = f'p{inferior}-{superior}'
+        series += [
+            {**invisivel, 'name': f'Percentil {inferior}', 'stack': pilha, 'data': faixa(bandas[inferior])},
+            {**invisivel, 'name': f'_{pilha}', 'stack': pilha,
+             'areaStyle': {'color': f'rgba(16, 185, 129, {opacidade})'},
+             'data': faixa(np.subtract(bandas[superior], bandas[inferior]))},
+            {**invisivel, 'name': f'Percentil {superior}', 'data': faixa(bandas[superior])},
+        ]
+    series += [
+        {'name': 'Mediana', 'type': 'line', 'smooth': True, 'showSymbol': False,
+         'itemStyle': {'color': '#10B981'}, 'lineStyle': {'width': 3}, 'data': faixa(bandas[50])},
+        {**ESTILOS_SERIES['cdi'], 'type': 'line', 'smooth': True, 'showSymbol': False, 'data': faixa(cdi)},
+    ]
+
+    return {
+        'backgroundColor': 'transparent',
+        'grid': {'top': 20, 'bottom': 30, 'left': 50, 'right': 20, 'containLabel': True},
+        'tooltip': {
+            'trigger': 'axis',
+            'backgroundColor': '#1F1A1A',
+            'borderColor': '#374151',
+            'textStyle': {'color': '#fff'},
+            ':formatter': _TOOLTIP_PROJECAO,
+        },
+        'legend': {'show': False},
+        'xAxis': {
+            'type': 'category',
+            'data': list(rotulos),
+            'boundaryGap': False,
+            'axisLine': {'lineStyle': {'color': '#374151'}},
+            'axisLabel': {'color': '#9CA3AF'}
+        },
+        'yAxis': {
+            'type': 'value',
+            'splitLine': {'lineStyle': {'color': '#2A2B2F', 'type': 'dashed'}},
+            'axisLabel': {'color': '#9CA3AF'}
+        },
+        'series': series,
+    }
@@ -0,0 +1,98 @@
+from typing import Callable, List
+from nicegui import ui
+from app.schemas.portfolio import PositionSummary
+from app.services.dashboard import DashboardViewModel
+from app.services.positions_index import ORDEM_PADRAO, market_value
+from app.ui.components.search import DEBOUNCE_MS
+from app.ui.components.sparkline import ALTURA, LARGURA, cached_sparkline_path
+from app.ui.formatting import format_currency, format_percent
+
+LINHAS_POR_PAGINA = 10
+
+# `name` das colunas ordenáveis é a coluna correspondente do PositionsIndex
+COLUNAS = [
+    {'name': 'ticker', 'label': 'Ativo', 'field': 'ticker', 'sortable': True, 'align': 'left'},
+    {'name': 'sparkline', 'label': '90 dias', 'field': 'sparkline', 'align': 'center'},
+    {'name': 'valor_total_atual', 'label': 'Valor', 'field': 'valor', 'sortable': True, 'align': 'right'},
+    {'name': 'rentabilidade_pct', 'label': 'Rent.', 'field': 'rentabilidade', 'sortable': True, 'align': 'right'},
+]
+
+# Só o <path> viaja por linha; o resto do SVG fica no template do slot
+SLOT_SPARKLINE = f'''
+    <q-td :props="props">
+        <svg viewBox="0 0 {LARGURA} {ALTURA}" width="{LARGURA}" height="{ALTURA}" preserveAspectRatio="none">
+            <path :d="props.value" fill="none" :stroke="props.row.positivo ? '#10B981' : '#EF4444'"
+                  stroke-width="1.5" vector-effect="non-scaling-stroke" />
+        </svg>
+    </q-td>
+'''
+
+SLOT_RENTABILIDADE = '''
+    <q-td :props="props" :class="props.row.positivo ? 'text-[#10B981]' : 'text-red-500'">{{ props.value }}</q-td>
+'''
+
+def position_rows(vm: DashboardViewModel, posicoes: List[PositionSummary]) -> List[dict]:
+    """Linhas de uma página, já formatadas; o path da sparkline sai do cache por versão da série."""
+    linhas = []
+    for p in posicoes:
+        precos = vm.precos_recentes.get(p.ticker, ())
+        linhas.append({
+            'ticker': p.ticker,
+            'sparkline': cached_sparkline_path(p.ticker, vm.versao_precos, precos),
+            'valor': format_currency(market_value(p)),
+            'rentabilidade': format_percent(p.rentabilidade_pct),
+            'positivo': p.rentabilidade_pct >= 0,
+        })
+    return linhas
+
+def positions_table(vm: DashboardViewModel) -> Callable[[DashboardViewModel], None]:
+    """
+    Tabela de posições paginada no servidor.
+
+    O navegador só recebe a página visível: ordenação, filtro e paginação são
+    consultas ao PositionsIndex do view model. Devolve a função que troca o
+    view model exibido mantendo ordem, filtro e página atuais.
+    """
+    estado = {'vm': vm}
+
+    def consultar(pagination: dict):
+        total, posicoes = estado['vm'].positions_index.query(
+            ordenar_por=pagination.get('sortBy') or ORDEM_PADRAO,
+            decrescente=bool(pagination.get('descending')),
+            filtro=filtro.value or '',
+            offset=(pagination['page'] - 1) * pagination['rowsPerPage'],
+            limite=pagination['rowsPerPage'],
+        )
+        # Página além do fim (ex.: filtro mais restrito): volta para a última válida
+        paginas = max((total - 1) // pagination['rowsPerPage'] + 1, 1)
+        if pagination['page'] > paginas:
+            consultar({**pagination, 'page': paginas})
+            return
+        tabela.rows = position_rows(estado['vm'], posicoes)
+        tabela.pagination = {**pagination, 'rowsNumber': total}
+        tabela.update()
+
+    with ui.card().classes('w-full bg-[#15161A] shadow-lg p-6 rounded-xl gap-4'):
+        with ui.row().classes('w-full items-center justify-between'):
+            ui.label('Posições').classes('text-lg text-white font-semibold')
+            filtro = ui.input(placeholder='Filtrar ativo...',
+                              on_change=lambda: consultar({**tabela.pagination, 'page': 1})) \
+                .props(f'dark dense outlined clearable debounce={DEBOUNCE_MS}') \
+                .classes('w-40 text-xs')
+
+        paginacao = {'sortBy': ORDEM_PADRAO, 'descending': True, 'page': 1, 'rowsPerPage': LINHAS_POR_PAGINA}
+        tabela = ui.table(columns=COLUNAS, rows=[], row_key='ticker', pagination=paginacao) \
+            .props('dark flat dense virtual-scroll binary-state-sort :rows-per-page-options="[10, 25, 50]"') \
+            .classes('w-full bg-transparent text-gray-300 max-h-[560px]')
+        tabela.add_slot('body-cell-sparkline', SLOT_SPARKLINE)
+        tabela.add_slot('body-cell-rentabilidade_pct', SLOT_RENTABILIDADE)
+        # Em modo servidor o q-table não ordena nem pagina: só emite 'request'
+        tabela.on('request', lambda e: consultar(e.args['pagination']), ['pagination'])
+
+    consultar(paginacao)
+
+    def atualizar(novo: DashboardViewModel):
+        estado['vm'] = novo
+        consultar(tabela.pagination)
+
+    return atualizar
@@ -0,0 +1,46 @@
+from nicegui import ui
+from app.services.search import TickerSearchService
+
+DEBOUNCE_MS = 250  # O navegador só envia o texto depois dessa pausa na digitação
+
+def ticker_search():
+    """Barra de pesquisa do header, consultando o índice de tickers em memória."""
+
+    # Ticker escolhido no menu: o on_change que ele dispara no campo não é uma busca
+    escolhido = {'ticker': None}
+
+    async def buscar(e):
+        if e.value is not None and e.value == escolhido['ticker']:
+            return
+        escolhido['ticker'] = None
+        resultados = await TickerSearchService.search_async(e.value or '')
+        if campo.value != e.value:
+            return  # Texto mudou durante a busca: vale a resposta mais nova
+        menu.clear()
+        if not resultados:
+            menu.close()
+            return
+        with menu:
+            for r in resultados:
+                with ui.item(on_click=lambda r=r: selecionar(r.ticker)).classes('gap-3'):
+                    ui.label(r.ticker).classes('font-semibold text-white w-16')
+                    ui.label(r.nome).classes('text-gray-400 text-xs truncate')
+        menu.open()
+
+    def selecionar(ticker: str):
+        escolhido['ticker'] = ticker
+        menu.close()
+        campo.value = ticker
+
+    campo = ui.input(placeholder='Pesquisar...', on_change=buscar) \
+        .props(f'dark dense borderless input-class="text-gray-300" debounce={DEBOUNCE_MS}') \
+        .classes('w-64 bg-[#2A2B2F] rounded-lg pl-3 text-sm')
+
+    with campo:
+        # Ícone de Lupa (Injetado no slot 'append' do input)
+        ui.icon('search').props('slot=append').classes('text-gray-400 text-xl cursor-pointer hover:text-white transition-colors mr-2 self-center')
+
+        # Resultados abrem sob o campo sem tirar o foco da digitação
+        menu = ui.menu().props('no-parent-event no-focus fit').classes('bg-[#15161A]')
+
+    return campo
@@ -0,0 +1,36 @@
+from collections import OrderedDict
+from typing import Hashable, Sequence
+import numpy as np
+from app.ui.components.charts import minmax_indices
+
+LARGURA, ALTURA = 80, 24  # viewBox das sparklines
+PONTOS_SPARKLINE = 40     # ~2 pontos por px na largura exibida
+LIMITE_CACHE = 2_048
+
+_paths: 'OrderedDict[tuple, str]' = OrderedDict()
+
+def sparkline_path(valores: Sequence[float]) -> str:
+    """Atributo `d` de um <path> com a série normalizada no viewBox LARGURA × ALTURA."""
+    y = np.asarray(valores, dtype=np.float64)
+    if len(y) < 2:
+        return ''
+    y = y[minmax_indices(y, PONTOS_SPARKLINE)]
+
+    x = np.linspace(0, LARGURA, len(y))
+    amplitude = y.max() - y.min()
+    # Série constante fica no meio; o eixo y do SVG cresce para baixo
+    yn = np.full(len(y), ALTURA / 2) if amplitude == 0 else ALTURA - (y - y.min()) / amplitude * ALTURA
+    pontos = [f'{a:.1f} {b:.1f}' for a, b in zip(x, yn)]
+    return f'M{pontos[0]} L{" ".join(pontos[1:])}'
+
+def cached_sparkline_path(ticker: str, versao: Hashable, valores: Sequence[float]) -> str:
+    """sparkline_path memorizado por (ticker, versão da série); LRU limitado."""
+    chave = (ticker, versao)
+    path = _paths.get(chave)
+    if path is None:
+        path = _paths[chave] = sparkline_path(valores)
+        if len(_paths) > LIMITE_CACHE:
+            _paths.popitem(last=False)
+    else:
+        _paths.move_to_end(chave)
+    return path
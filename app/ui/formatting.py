@@ -0,0 +1,5 @@
+def format_currency(valor: float) -> str:
+    return f'R${valor:,.2f}'.replace(",", "v").replace(".", ",").replace("v", ".")
+
+def format_percent(valor: float) -> str:
+    return f'{valor:+.2f}%'.replace(".", ",")
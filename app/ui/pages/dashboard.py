@@ -1,44 +1,12 @@
 from nicegui import ui
+from app.core.config import settings
+from app.core.metrics import timed
+from app.services.dashboard import DashboardService, DashboardViewModel
+from app.services.history import PERIODOS
 from app.ui.theme import frame
-from dataclasses import dataclass
-from typing import List, Dict
-
-# Estrutura de dados para representar os ativos financeiros
-@dataclass
-class Ativo:
-    ticker: str
-    qtd: int
-    preco_medio: float
-    preco_atual: float
-    total_proventos: float = 0.0
-
-    @property
-    def saldo_total(self) -> float:
-        return self.qtd * self.preco_atual
-
-    @property
-    def custo_total(self) -> float:
-        return self.qtd * self.preco_medio
-
-    @property
-    def proventos_acumulados(self) -> float:
-        return self.qtd * self.total_proventos
-
-# Simulação de dados atuais (Backend Mock)
-def get_carteira_mock() -> List[Ativo]:
-    return [
-        Ativo('PETR4', 4000, 24.50, 38.50, total_proventos=1.50),
-    ]
-
-# Simulação de dados históricos para o gráfico (Jan - Dez)
-def get_historico_mock() -> Dict[str, List[float]]:
-    meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-    
-    carteira = [100000, 102500, 98000, 105000, 110000, 108000, 115000, 122000, 119000, 130000, 142000, 154000]
-    cdi = [100000 * (1.009 ** i) for i in range(12)]
-    ipca = [100000 * (1.004 ** i) for i in range(12)]
-
-    return {'meses': meses, 'carteira': carteira, 'cdi': cdi, 'ipca': ipca}
+from app.ui.components.charts import evolution_chart_options
+from app.ui.components.positions_table import positions_table
+from app.ui.formatting import format_currency
 
 # Gera o SVG de fundo dos cards (Sparklines)
 def get_sparkline_svg(color: str = '#10B981', type: str = 'up') -> str:
@@ -58,29 +26,39 @@ def get_sparkline_svg(color: str = '#10B981', type: str = 'up') -> str:
         </svg>
     '''
 
-def format_currency(valor: float) -> str:
-    return f'R${valor:,.2f}'.replace(",", "v").replace(".", ",").replace("v", ".")
+def chart_options(vm: DashboardViewModel, periodo: str) -> dict:
+    """Opções do gráfico do período, montadas uma vez por versão dos dados."""
+    if periodo not in vm.graficos:
+        vm.graficos[periodo] = evolution_chart_options(*vm.chart_series(periodo))
+    return vm.graficos[periodo]
+
+def kpi_values(vm: DashboardViewModel) -> dict:
+    """Textos e estilos exibidos nos cards, derivados do view model."""
+    positivo = vm.rentabilidade_geral >= 0
+    rent_lucro_fmt = f"{vm.rentabilidade_geral:.2f}".replace(".", ",")
+    yield_fmt = f"{vm.yield_on_cost:.2f}".replace(".", ",")
+
+    return {
+        'lucro': format_currency(vm.lucro_total),
+        'rentabilidade': f"{'▲' if positivo else '▼'}{rent_lucro_fmt}%",
+        'classe_rentabilidade': 'text-[#10B981]' if positivo else 'text-red-500',
+        'sparkline_lucro': get_sparkline_svg(
+            color='#10B981' if positivo else '#EF4444',
+            type='up' if positivo else 'down'
+        ),
+        'proventos': format_currency(vm.total_proventos),
+        'yield': f'+{yield_fmt}% (DY)',
+        'investido': format_currency(vm.total_investido),
+        'patrimonio': format_currency(vm.saldo_atual),
+    }
 
 # Renderização da página principal
-def dashboard_page():
-    
-    # Carregamento e processamento dos dados
-    carteira = get_carteira_mock()
-    historico = get_historico_mock()
+@timed('page.dashboard')
+async def dashboard_page():
     
-    total_investido = sum(a.custo_total for a in carteira)
-    saldo_atual = sum(a.saldo_total for a in carteira)
-    lucro_total = saldo_atual - total_investido
-    total_proventos = sum(a.proventos_acumulados for a in carteira)
-    
-    rentabilidade_geral = (lucro_total / total_investido * 100) if total_investido > 0 else 0
-    yield_on_cost = (total_proventos / total_investido * 100) if total_investido > 0 else 0
-
-    # Definição de estilos condicionais (Cores e Indicadores)
-    cor_lucro = '#10B981' if rentabilidade_geral >= 0 else '#EF4444'
-    classe_cor_lucro = 'text-[#10B981]' if rentabilidade_geral >= 0 else 'text-red-500'
-    seta_lucro = '▲' if rentabilidade_geral >= 0 else '▼'
-    sparkline_type = 'up' if rentabilidade_geral >= 0 else 'down'
+    # O view model é calculado uma vez por versão dos dados e compartilhado entre clientes
+    vm = await DashboardService.get_view_model()
+    valores = kpi_values(vm)
 
     with frame("Dashboard"):
         
@@ -90,16 +68,15 @@ def dashboard_page():
             
             # Card 1: Lucro/Prejuízo
             with ui.card().classes('relative overflow-hidden bg-[#15161A] shadow-lg p-5 rounded-xl flex-row items-center gap-4 py-8'):
-                ui.html(get_sparkline_svg(color=cor_lucro, type=sparkline_type), sanitize=False).classes('absolute bottom-0 left-0 w-full h-16 pointer-events-none z-0')
+                sparkline_lucro = ui.html(valores['sparkline_lucro'], sanitize=False).classes('absolute bottom-0 left-0 w-full h-16 pointer-events-none z-0')
                 with ui.element('div').classes('z-10 w-14 h-14 bg-[#2A2B2F] rounded-xl flex items-center justify-center flex-shrink-0'):
                     ui.icon('account_balance_wallet').classes('text-2xl text-[#10B981]')
                 with ui.element('div').classes('z-10 flex-1 flex justify-center'):
                     with ui.column().classes('items-end gap-1'):
                         ui.label('Lucro/Prejuízo').classes('text-gray-400 text-[13px] tracking-wide self-start')
-                        ui.label(format_currency(lucro_total)).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
+                        label_lucro = ui.label(valores['lucro']).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
                         with ui.row().classes('items-center gap-1 mt-1 self-end'):
-                            rent_lucro_fmt = f"{rentabilidade_geral:.2f}".replace(".", ",")
-                            ui.label(f'{seta_lucro}{rent_lucro_fmt}%').classes(f'{classe_cor_lucro} text-xs font-bold')
+                            label_rentabilidade = ui.label(valores['rentabilidade']).classes(f"{valores['classe_rentabilidade']} text-xs font-bold")
 
             # Card 2: Proventos
             with ui.card().classes('relative overflow-hidden bg-[#15161A] shadow-lg p-5 rounded-xl flex-row items-center gap-4 py-8'):
@@ -109,10 +86,9 @@ def dashboard_page():
                 with ui.element('div').classes('z-10 flex-1 flex justify-center'):
                     with ui.column().classes('items-end gap-1'):
                         ui.label('Proventos').classes('text-gray-400 text-[13px] tracking-wide self-start')
-                        ui.label(format_currency(total_proventos)).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
+                        label_proventos = ui.label(valores['proventos']).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
                         with ui.row().classes('items-center gap-1 mt-1 self-end'):
-                            yield_fmt = f"{yield_on_cost:.2f}".replace(".", ",")
-                            ui.label(f'+{yield_fmt}% (DY)').classes('text-[#10B981] text-xs font-bold')
+                            label_yield = ui.label(valores['yield']).classes('text-[#10B981] text-xs font-bold')
 
             # Card 3: Investido
             with ui.card().classes('relative overflow-hidden bg-[#15161A] shadow-lg p-5 rounded-xl flex-row items-center gap-4 py-8'):
@@ -122,7 +98,7 @@ def dashboard_page():
                 with ui.element('div').classes('z-10 flex-1 flex justify-center'):
                     with ui.column().classes('items-end gap-1'):
                         ui.label('Investido').classes('text-gray-400 text-[13px] tracking-wide self-start')
-                        ui.label(format_currency(total_investido)).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
+                        label_investido = ui.label(valores['investido']).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
                         ui.label('Custo de Aquisição').classes('text-gray-600 text-[10px] font-medium self-end')
 
             # Card 4: Patrimônio
@@ -133,7 +109,7 @@ def dashboard_page():
                 with ui.element('div').classes('z-10 flex-1 flex justify-center'):
                     with ui.column().classes('items-end gap-1'):
                         ui.label('Patrimônio').classes('text-gray-400 text-[13px] tracking-wide self-start')
-                        ui.label(format_currency(saldo_atual)).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
+                        label_patrimonio = ui.label(valores['patrimonio']).classes('text-xl text-white leading-none mt-1 self-end font-semibold')
                         ui.label('Valor de Mercado').classes('text-gray-600 text-[10px] font-medium self-end')
 
         # Área de Conteúdo Principal
@@ -171,77 +147,57 @@ def dashboard_page():
                                 ui.label('IPCA').classes('text-xs text-gray-400 font-medium')
 
                         # Seletor de Período
-                        opcoes_tempo = ['1 mês', '6 meses', '1 ano', '5 anos', '10 anos', 'Tempo máximo']
-                        ui.select(options=opcoes_tempo, value='1 ano') \
+                        opcoes_tempo = list(PERIODOS)
+                        seletor_periodo = ui.select(options=opcoes_tempo, value='1 ano') \
                             .classes('w-32 text-xs') \
                             .props('outlined dense dark options-dense behavior="menu" label="Período"')
 
                 # Componente de Gráfico (ECharts)
-                ui.echart({
-                    'backgroundColor': 'transparent',
-                    'grid': {'top': 20, 'bottom': 30, 'left': 50, 'right': 20, 'containLabel': True},
-                    'tooltip': {
-                        'trigger': 'axis',
-                        'backgroundColor': '#1F1A1A',
-                        'borderColor': '#374151',
-                        'textStyle': {'color': '#fff'},
-                        'valueFormatter': '(val) => "R$ " + val.toLocaleString("pt-BR", {minimumFractionDigits: 2})'
-                    },
-                    'legend': {'show': False}, # Legenda nativa desativada em favor da customizada
-                    'xAxis': {
-                        'type': 'category',
-                        'data': historico['meses'],
-                        'boundaryGap': False,
-                        'axisLine': {'lineStyle': {'color': '#374151'}},
-                        'axisLabel': {'color': '#9CA3AF'}
-                    },
-                    'yAxis': {
-                        'type': 'value',
-                        'splitLine': {'lineStyle': {'color': '#2A2B2F', 'type': 'dashed'}},
-                        'axisLabel': {'color': '#9CA3AF'}
-                    },
-                    'series': [
-                        {
-                            'name': 'Minha Carteira',
-                            'type': 'line',
-                            'smooth': True,
-                            'showSymbol': False,
-                            'data': historico['carteira'],
-                            'itemStyle': {'color': '#10B981'},
-                            'lineStyle': {'width': 3, 'shadowColor': 'rgba(16, 185, 129, 0.5)', 'shadowBlur': 10},
-                            'areaStyle': {
-                                'color': {
-                                    'type': 'linear',
-                                    'x': 0, 'y': 0, 'x2': 0, 'y2': 1,
-                                    'colorStops': [
-                                        {'offset': 0, 'color': 'rgba(16, 185, 129, 0.3)'}, 
-                                        {'offset': 1, 'color': 'rgba(16, 185, 129, 0)'}
-                                    ]
-                                }
-                            }
-                        },
-                        {
-                            'name': 'CDI',
-                            'type': 'line',
-                            'smooth': True,
-                            'showSymbol': False,
-                            'data': historico['cdi'],
-                            'itemStyle': {'color': '#FBBF24'},
-                            'lineStyle': {'width': 2, 'type': 'dashed'}
-                        },
-                        {
-                            'name': 'IPCA',
-                            'type': 'line',
-                            'smooth': True,
-                            'showSymbol': False,
-                            'data': historico['ipca'],
-                            'itemStyle': {'color': '#6B7280'},
-                            'lineStyle': {'width': 2, 'type': 'dotted'}
-                        }
-                    ]
-                }).classes('w-full h-[350px]')
+                # As séries passam pelo downsampling antes de irem para o navegador
+                grafico = ui.echart(chart_options(vm, seletor_periodo.value)).classes('w-full h-[350px]')
             
-            # Espaço Lateral (Placeholder)
-            # Reservado para lista de ativos ou notícias futuras (37.5% da largura)
+            # Espaço Lateral
+            # Tabela de posições paginada no servidor (37.5% da largura)
             with ui.column().classes('col-span-3 gap-6'):
-                pass
\ No newline at end of file
+                atualizar_posicoes = positions_table(vm)
+
+    # Atualização incremental
+    # Em vez de reconstruir a página, empurra para o navegador apenas o que mudou
+    estado = {'vm': vm, 'valores': valores}
+    labels = {
+        'lucro': label_lucro,
+        'rentabilidade': label_rentabilidade,
+        'proventos': label_proventos,
+        'yield': label_yield,
+        'investido': label_investido,
+        'patrimonio': label_patrimonio,
+    }
+
+    def atualizar_grafico():
+        grafico.options.clear()
+        grafico.options.update(chart_options(estado['vm'], seletor_periodo.value))
+        grafico.update()
+
+    async def sincronizar():
+        novo = await DashboardService.get_view_model()
+        if novo is estado['vm']:
+            return
+
+        novos_valores = kpi_values(novo)
+        antigos = estado['valores']
+        for chave, label in labels.items():
+            if novos_valores[chave] != antigos[chave]:
+                label.set_text(novos_valores[chave])
+        if novos_valores['classe_rentabilidade'] != antigos['classe_rentabilidade']:
+            label_rentabilidade.classes(
+                remove=antigos['classe_rentabilidade'], add=novos_valores['classe_rentabilidade']
+            )
+        if novos_valores['sparkline_lucro'] != antigos['sparkline_lucro']:
+            sparkline_lucro.set_content(novos_valores['sparkline_lucro'])
+
+        estado['vm'], estado['valores'] = novo, novos_valores
+        atualizar_grafico()
+        atualizar_posicoes(novo)
+
+    seletor_periodo.on_value_change(lambda e: atualizar_grafico())
+    ui.timer(settings.DASHBOARD_REFRESH_SECONDS, sincronizar)
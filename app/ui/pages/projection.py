@@ -0,0 +1,140 @@
+from nicegui import ui
+from app.core.metrics import timed
+from app.services.projection import ESTRATEGIAS, MESES_MINIMOS, ProjectionParams, ProjectionResult, ProjectionService
+from app.ui.components.charts import projection_chart_options
+from app.ui.formatting import format_currency
+from app.ui.theme import frame
+
+HORIZONTES = {1: '1 ano', 3: '3 anos', 5: '5 anos', 10: '10 anos', 20: '20 anos'}
+CAMINHOS = {10_000: '10 mil', 20_000: '20 mil', 50_000: '50 mil', 100_000: '100 mil'}
+
+COLUNAS_COMPARACAO = [
+    {'name': 'estrategia', 'label': 'Estratégia', 'field': 'estrategia', 'align': 'left'},
+    {'name': 'p5', 'label': 'Pessimista (P5)', 'field': 'p5', 'align': 'right'},
+    {'name': 'mediana', 'label': 'Mediana', 'field': 'mediana', 'align': 'right'},
+    {'name': 'p95', 'label': 'Otimista (P95)', 'field': 'p95', 'align': 'right'},
+    {'name': 'prob_supera_cdi', 'label': 'Supera o CDI', 'field': 'prob_supera_cdi', 'align': 'right'},
+]
+
+def format_probability(valor: float) -> str:
+    return f'{valor * 100:.1f}%'.replace(".", ",")
+
+def result_values(resultado: ProjectionResult) -> dict:
+    """Textos dos cards e linhas da tabela comparativa de uma projeção."""
+    return {
+        'atual': format_currency(resultado.valor_inicial),
+        'mediana': format_currency(resultado.bandas[50][-1]),
+        'intervalo': f'{format_currency(resultado.bandas[5][-1])} a {format_currency(resultado.bandas[95][-1])}',
+        'cdi': format_probability(resultado.prob_supera_cdi),
+        'linhas': [
+            {
+                'estrategia': linha['estrategia'],
+                'p5': format_currency(linha['p5']),
+                'mediana': format_currency(linha['mediana']),
+                'p95': format_currency(linha['p95']),
+                'prob_supera_cdi': format_probability(linha['prob_supera_cdi']),
+            }
+            for linha in resultado.comparacao
+        ],
+    }
+
+# Renderização da página de projeção
+@timed('page.projection')
+async def projection_page():
+
+    with frame("Projeção"):
+
+        # Controles da simulação
+        with ui.row().classes('w-full items-center gap-6 mb-8'):
+            seletor_horizonte = ui.select(options=HORIZONTES, value=5) \
+                .classes('w-32 text-xs') \
+                .props('outlined dense dark options-dense behavior="menu" label="Horizonte"')
+            seletor_estrategia = ui.select(options=list(ESTRATEGIAS), value='Sem rebalanceamento') \
+                .classes('w-52 text-xs') \
+                .props('outlined dense dark options-dense behavior="menu" label="Rebalanceamento"')
+            campo_aporte = ui.number(value=0, min=0, step=100, format='%.2f') \
+                .classes('w-40 text-xs') \
+                .props('outlined dense dark label="Aporte mensal (R$)"')
+            seletor_caminhos = ui.select(options=CAMINHOS, value=20_000) \
+                .classes('w-32 text-xs') \
+                .props('outlined dense dark options-dense behavior="menu" label="Cenários"')
+            botao = ui.button('Simular', icon='play_arrow').props('unelevated color=primary')
+            carregando = ui.spinner(size='lg', color='secondary')
+
+        # Cards com o resultado no fim do horizonte
+        labels = {}
+        with ui.grid(columns=4).classes('w-full gap-6 mb-8'):
+            for chave, titulo, icone in (
+                ('atual', 'Patrimônio Atual', 'monetization_on'),
+                ('mediana', 'Mediana no Horizonte', 'insights'),
+                ('intervalo', 'Intervalo de 90%', 'swap_vert'),
+                ('cdi', 'Chance de Superar o CDI', 'emoji_events'),
+            ):
+                with ui.card().classes('bg-[#15161A] shadow-lg p-5 rounded-xl flex-row items-center gap-4 py-8'):
+                    with ui.element('div').classes('w-14 h-14 bg-[#2A2B2F] rounded-xl flex items-center justify-center flex-shrink-0'):
+                        ui.icon(icone).classes('text-2xl text-[#10B981]')
+                    with ui.column().classes('gap-1'):
+                        ui.label(titulo).classes('text-gray-400 text-[13px] tracking-wide')
+                        labels[chave] = ui.label('—').classes('text-lg text-white leading-none mt-1 font-semibold')
+
+        with ui.grid(columns=8).classes('w-full gap-6'):
+
+            # Leque de percentis contra o CDI
+            with ui.card().classes('col-span-5 bg-[#15161A] p-6 rounded-xl shadow-lg border border-[#2A2B2F]'):
+                with ui.row().classes('w-full items-center justify-between mb-6'):
+                    with ui.column().classes('gap-0'):
+                        ui.label('Patrimônio Projetado').classes('text-lg font-semibold text-white tracking-tight')
+                        ui.label('Faixas de 50% e 90% dos cenários simulados').classes('text-xs text-gray-400')
+                        aviso = ui.label('Histórico de preços insuficiente para estimar o risco: configure PRICE_HISTORY_FILE') \
+                            .classes('text-xs text-[#FBBF24]')
+                        aviso.set_visibility(False)
+                    with ui.row().classes('items-center gap-4'):
+                        with ui.row().classes('items-center gap-2'):
+                            ui.icon('circle').classes('text-[10px] text-[#10B981]')
+                            ui.label('Mediana').classes('text-xs text-gray-400 font-medium')
+                        with ui.row().classes('items-center gap-2'):
+                            ui.icon('circle').classes('text-[10px] text-[#FBBF24]')
+                            ui.label('CDI').classes('text-xs text-gray-400 font-medium')
+                grafico = ui.echart({}).classes('w-full h-[350px]')
+
+            # Comparação das estratégias com os mesmos cenários
+            with ui.card().classes('col-span-3 bg-[#15161A] p-6 rounded-xl shadow-lg border border-[#2A2B2F]'):
+                ui.label('Estratégias de Rebalanceamento').classes('text-lg font-semibold text-white tracking-tight')
+                ui.label('Valor final no horizonte, mesmos cenários').classes('text-xs text-gray-400 mb-4')
+                tabela = ui.table(columns=COLUNAS_COMPARACAO, rows=[], row_key='estrategia') \
+                    .classes('w-full bg-transparent text-white') \
+                    .props('flat dense dark hide-bottom')
+
+    async def simular():
+        params = ProjectionParams(
+            anos=seletor_horizonte.value,
+            caminhos=seletor_caminhos.value,
+            estrategia=seletor_estrategia.value,
+            aporte_mensal=float(campo_aporte.value or 0),
+        )
+        botao.disable()
+        carregando.set_visibility(True)
+        try:
+            resultado = await ProjectionService.project_async(params)
+        finally:
+            botao.enable()
+            carregando.set_visibility(False)
+
+        valores = result_values(resultado)
+        for chave, label in labels.items():
+            label.set_text(valores[chave])
+        grafico.options.clear()
+        grafico.options.update(projection_chart_options(
+            resultado.datas.strftime('%m/%Y').tolist(), resultado.bandas, resultado.cdi
+        ))
+        grafico.update()
+        # Histórico curto ou sem variação (ex.: só os preços das próprias negociações) subestima o risco
+        sem_risco = bool(resultado.bandas[95][-1] <= resultado.bandas[5][-1])
+        insuficiente = resultado.valor_inicial > 0 and (resultado.meses_historico < MESES_MINIMOS or sem_risco)
+        aviso.set_visibility(insuficiente)
+        tabela.rows = valores['linhas']
+        tabela.update()
+
+    botao.on_click(simular)
+    # A primeira simulação roda depois que a página já foi entregue ao navegador
+    ui.timer(0, simular, once=True)
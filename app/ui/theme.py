@@ -1,5 +1,13 @@
 from nicegui import ui
 from contextlib import contextmanager
+from app.ui.components.search import ticker_search
+
+# Itens do menu lateral: (rótulo, ícone, rota); o rótulo é o título da página
+MENU = (
+    ('Dashboard', 'dashboard', '/'),
+    ('Projeção', 'insights', '/projecao'),
+    ('Transações', 'account_balance_wallet', None),
+)
 
 @contextmanager
 def frame(nav_title: str):
@@ -25,17 +33,17 @@ def frame(nav_title: str):
                 ui.label('Logo').classes('text-3xl tracking-tighter text-white')
 
             # Lista de Menus de Navegação
+            # O item da página atual fica destacado; os demais mudam de cor no hover
             with ui.column().classes('w-full gap-10 px-10 mt-16'):
-                
-                # Dashboard (Estado Ativo)
-                with ui.row().classes('w-full items-center gap-6 cursor-pointer group'):
-                    ui.icon('dashboard').classes('text-2xl text-[#51567D]')
-                    ui.label('Dashboard').classes('text-base text-[#51567D]')
-
-                # Transações (Estado Inativo com Hover)
-                with ui.row().classes('w-full items-center gap-6 cursor-pointer transition-colors group'):
-                    ui.icon('account_balance_wallet').classes('text-2xl text-[#FFFFFF] group-hover:text-[#51567D] transition-colors')
-                    ui.label('Transações').classes('text-base text-[#FFFFFF] group-hover:text-[#51567D] transition-colors')
+                for rotulo, icone, rota in MENU:
+                    ativo = rotulo == nav_title
+                    cor = 'text-[#51567D]' if ativo else 'text-[#FFFFFF] group-hover:text-[#51567D] transition-colors'
+                    item = ui.row().classes('w-full items-center gap-6 cursor-pointer transition-colors group')
+                    if rota and not ativo:
+                        item.on('click', lambda rota=rota: ui.navigate.to(rota))
+                    with item:
+                        ui.icon(icone).classes(f'text-2xl {cor}')
+                        ui.label(rotulo).classes(f'text-base {cor}')
 
         # Conteúdo Fluido
         # Ocupa todo o espaço restante da tela e contém o Header e o Corpo
@@ -51,13 +59,8 @@ def frame(nav_title: str):
                 # Área de Ferramentas (Direita do Header)
                 with ui.row().classes('items-center gap-6'):
                     
-                    # Barra de Pesquisa
-                    with ui.input(placeholder='Pesquisar...') \
-                            .props('dark dense borderless input-class="text-gray-300"') \
-                            .classes('w-64 bg-[#2A2B2F] rounded-lg pl-3 text-sm'):
-                        
-                        # Ícone de Lupa (Injetado no slot 'append' do input)
-                        ui.icon('search').props('slot=append').classes('text-gray-400 text-xl cursor-pointer hover:text-white transition-colors mr-2 self-center')
+                    # Barra de Pesquisa (busca de tickers)
+                    ticker_search()
 
                     # Ícone de Notificações com indicador (Badge)
                     with ui.element('div').classes('relative cursor-pointer ml-2'):
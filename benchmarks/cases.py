@@ -0,0 +1,92 @@
+"""
+Casos medidos por benchmarks/run.py.
+
+Os módulos do app leem o Settings na importação: este módulo só deve ser
+importado depois que o run.py apontar DATABASE_URL para o banco de benchmark.
+"""
+import asyncio
+import statistics
+import time
+from nicegui import Client, ui
+from sqlmodel import Session, SQLModel, select
+from app.db.init_db import init_db
+from app.db.session import async_engine, async_session_factory, engine
+from app.models.transaction import Transaction
+from app.services.aggregation import AggregationService
+from app.services.dashboard import DashboardService
+from app.services.earnings import EarningsService
+from app.services.history import HistoryService
+from app.services.portfolio import CalculationService
+from app.services.positions import PositionStateService
+from app.services.store import TransactionStore
+from app.ui.pages.dashboard import dashboard_page
+from benchmarks.generator import load_into
+
+def medir(funcao, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {'min': min(tempos), 'mediana': statistics.median(tempos), 'max': max(tempos)}
+
+def preparar_banco(carteira):
+    SQLModel.metadata.drop_all(engine)
+    init_db()
+    load_into(engine, carteira)
+    with Session(engine) as session:
+        PositionStateService.rebuild(session)
+        EarningsService.rebuild_monthly(session)
+        session.commit()
+
+def rodar(coro_fn):
+    """Executa uma medição assíncrona num event loop próprio, fechado ao fim."""
+    async def executar():
+        try:
+            return await coro_fn()
+        finally:
+            # As conexões do pool assíncrono ficam presas ao loop que as abriu
+            await async_engine.dispose()
+    return asyncio.run(executar())
+
+async def renderizar_dashboard(frio: bool):
+    if frio:
+        DashboardService._cache = None
+    with Client(ui.page('/benchmark'), request=None):
+        await dashboard_page()
+
+async def montar_view_model():
+    async with async_session_factory() as session:
+        versao = await DashboardService.current_version(session)
+    return await DashboardService.build_view_model(versao)
+
+def casos(carteira, tamanho: int, limite_laco: int) -> dict:
+    """Casos de benchmark para um tamanho: {nome: função sem argumentos}."""
+    frame = carteira.transacoes
+    store = TransactionStore.from_rows(frame.itertuples(index=False, name=None))
+
+    def com_sessao(funcao):
+        def executar():
+            with Session(engine) as session:
+                return funcao(session)
+        return executar
+
+    resultado = {
+        'calc_columnar': lambda: CalculationService.calculate_positions_columnar(frame),
+        'calc_store': store.positions,
+        'history_portfolio_value': lambda: HistoryService.portfolio_value(frame, carteira.precos),
+        'db_sql_aggregate': com_sessao(AggregationService.calculate_positions_sql),
+        'db_stream_positions': com_sessao(AggregationService.calculate_positions_streaming),
+        'db_store_load': com_sessao(TransactionStore.from_session),
+        'db_snapshot_read': com_sessao(PositionStateService.current_positions),
+        'kpi_view_model': lambda: rodar(montar_view_model),
+        'dashboard_render_cold': lambda: rodar(lambda: renderizar_dashboard(frio=True)),
+        'dashboard_render_warm': lambda: rodar(lambda: renderizar_dashboard(frio=False)),
+    }
+
+    if tamanho <= limite_laco:
+        transacoes = [Transaction(**linha) for linha in frame.to_dict('records')]
+        resultado['calc_loop'] = lambda: CalculationService.calculate_positions(transacoes)
+        resultado['db_fetch_orm'] = com_sessao(lambda s: s.exec(select(Transaction)).all())
+
+    return resultado
@@ -0,0 +1,28 @@
+"""
+Compara dois arquivos de resultado de benchmarks/run.py.
+
+Uso: python -m benchmarks.compare base.json novo.json
+"""
+import json
+import sys
+
+def carregar(caminho: str) -> dict:
+    with open(caminho, encoding='utf-8') as f:
+        dados = json.load(f)
+    return dados['meta'], {(r['caso'], r['tamanho']): r['mediana'] for r in dados['resultados']}
+
+def main(base: str, novo: str):
+    meta_base, antes = carregar(base)
+    meta_novo, depois = carregar(novo)
+    print(f"base: {meta_base['commit']} ({meta_base['banco']})  x  novo: {meta_novo['commit']} ({meta_novo['banco']})")
+    print(f"{'CASO':<26} | {'TAMANHO':>10} | {'BASE (ms)':>11} | {'NOVO (ms)':>11} | {'RAZÃO':>7}")
+    print("-" * 78)
+    for chave in sorted(antes.keys() & depois.keys(), key=lambda c: (c[1], c[0])):
+        caso, tamanho = chave
+        razao = depois[chave] / antes[chave] if antes[chave] else float('inf')
+        print(f"{caso:<26} | {tamanho:>10,} | {antes[chave] * 1000:>11.2f} | {depois[chave] * 1000:>11.2f} | {razao:>6.2f}x")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,58 @@
+"""
+Gerador determinístico de carteiras sintéticas para benchmarks.
+
+A mesma semente gera sempre os mesmos dados, então resultados de commits
+diferentes são comparáveis.
+"""
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from app.models.earnings import Earnings
+from app.models.transaction import Transaction
+
+@dataclass
+class SyntheticPortfolio:
+    transacoes: pd.DataFrame  # COLUNAS_TRANSACAO
+    proventos: pd.DataFrame   # ticker, data, valor_total, tipo
+    precos: pd.DataFrame      # datas (dias úteis) x tickers
+
+def generate(n_transacoes: int, n_tickers: int = 300, anos: int = 10, seed: int = 42) -> SyntheticPortfolio:
+    rng = np.random.default_rng(seed)
+    tickers = np.array([f"TCK{i:04d}" for i in range(n_tickers)])
+    datas = pd.bdate_range(end=pd.Timestamp('2024-12-31'), periods=anos * 252)
+
+    # Passeio aleatório geométrico por ticker
+    retornos = rng.normal(0.0003, 0.02, (len(datas), n_tickers))
+    precos = pd.DataFrame(
+        rng.uniform(5, 100, n_tickers) * np.exp(np.cumsum(retornos, axis=0)),
+        index=datas, columns=tickers,
+    ).round(2)
+
+    linha = np.sort(rng.integers(0, len(datas), n_transacoes))
+    coluna = rng.integers(0, n_tickers, n_transacoes)
+    transacoes = pd.DataFrame({
+        'ticker': tickers[coluna],
+        'data': datas[linha].date,
+        'quantidade': rng.integers(1, 500, n_transacoes),
+        'preco': precos.to_numpy()[linha, coluna],
+        'tipo': np.where(rng.random(n_transacoes) < 0.7, 'C', 'V'),
+    })
+
+    n_proventos = max(n_transacoes // 10, 1)
+    proventos = pd.DataFrame({
+        'ticker': tickers[rng.integers(0, n_tickers, n_proventos)],
+        'data': datas[np.sort(rng.integers(0, len(datas), n_proventos))].date,
+        'valor_total': rng.uniform(1, 500, n_proventos).round(2),
+        'tipo': np.where(rng.random(n_proventos) < 0.75, 'DIV', 'JCP'),
+    })
+
+    return SyntheticPortfolio(transacoes, proventos, precos)
+
+def load_into(engine: Engine, carteira: SyntheticPortfolio, batch_size: int = 50_000):
+    """Grava a carteira em lotes (executemany), sem objetos ORM."""
+    with engine.begin() as conn:
+        for tabela, frame in ((Transaction.__table__, carteira.transacoes), (Earnings.__table__, carteira.proventos)):
+            for inicio in range(0, len(frame), batch_size):
+                conn.execute(insert(tabela), frame.iloc[inicio:inicio + batch_size].to_dict('records'))
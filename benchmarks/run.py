@@ -0,0 +1,86 @@
+"""
+Suíte de benchmarks de desempenho.
+
+Gera carteiras sintéticas de tamanhos crescentes, grava num banco de
+benchmark (SQLite temporário por padrão, ou --db postgresql://...) e mede
+os caminhos de cálculo, leitura do banco, KPIs e renderização do dashboard.
+O resultado é um JSON comparável entre commits (ver benchmarks/compare.py).
+
+ATENÇÃO: as tabelas do banco indicado em --db são apagadas e recriadas.
+
+Uso: python -m benchmarks.run --sizes 1000,10000,100000 --output resultados.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Quantidades de transações, separadas por vírgula (até 10000000)")
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=None, help="URL do banco de benchmark (padrão: SQLite temporário)")
+    parser.add_argument("--loop-limit", type=int, default=1_000_000,
+                        help="Acima deste tamanho os caminhos com objetos ORM são pulados")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: stdout)")
+    return parser.parse_args(argv)
+
+def commit_atual() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+def main(args):
+    with tempfile.TemporaryDirectory() as pasta:
+        os.environ["DATABASE_URL"] = args.db or f"sqlite:///{Path(pasta) / 'bench.db'}"
+        os.environ.setdefault("DB_ECHO", "false")
+        executar(args)
+
+def executar(args):
+    # Os módulos do app leem o Settings na importação, por isso vêm depois do ambiente
+    from benchmarks.cases import casos, medir, preparar_banco
+    from benchmarks.generator import generate
+    from app.db.session import engine
+
+    saida = {
+        'meta': {
+            'commit': commit_atual(),
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'plataforma': platform.platform(),
+            'banco': engine.dialect.name,
+            'seed': args.seed,
+            'tickers': args.tickers,
+            'repeticoes': args.repeat,
+        },
+        'resultados': [],
+    }
+
+    for tamanho in (int(float(s)) for s in args.sizes.split(',')):
+        print(f"[{tamanho:,} transações] gerando e carregando...", file=sys.stderr)
+        carteira = generate(tamanho, n_tickers=args.tickers, seed=args.seed)
+        preparar_banco(carteira)
+
+        for nome, funcao in casos(carteira, tamanho, args.loop_limit).items():
+            tempos = medir(funcao, args.repeat)
+            saida['resultados'].append({'caso': nome, 'tamanho': tamanho, **tempos})
+            print(f"  {nome:<24} mediana {tempos['mediana'] * 1000:>10.2f} ms", file=sys.stderr)
+
+    texto = json.dumps(saida, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(texto, encoding='utf-8')
+    else:
+        print(texto)
+    engine.dispose()
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,71 @@
+"""
+Compara memória e tempo de carga: lista de objetos ORM vs TransactionStore.
+
+Uso: python -m benchmarks.store_memory --rows 1000000
+"""
+import argparse
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.transaction import Transaction
+from app.services.store import TransactionStore
+
+def popular(engine, linhas: int, seed: int = 42):
+    rng = random.Random(seed)
+    inicio = date(2010, 1, 1)
+    tickers = [f"T{i:03d}" for i in range(300)]
+    with Session(engine) as session:
+        for base in range(0, linhas, 50_000):
+            session.execute(insert(Transaction), [
+                {
+                    'ticker': rng.choice(tickers),
+                    'data': inicio + timedelta(days=rng.randint(0, 5000)),
+                    'quantidade': rng.randint(1, 500),
+                    'preco': round(rng.uniform(5, 100), 2),
+                    'tipo': 'C' if rng.random() < 0.7 else 'V',
+                }
+                for _ in range(min(50_000, linhas - base))
+            ])
+        session.commit()
+
+def medir(nome: str, carregar):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = carregar()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nome:<18} | {segundos:>8.2f}s | retido {atual / 2**20:>9.1f} MiB | pico {pico / 2**20:>9.1f} MiB")
+    return resultado
+
+def main(linhas: int):
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{Path(pasta) / 'bench.db'}")
+        SQLModel.metadata.create_all(engine)
+        print(f"Gerando {linhas:,} transações...")
+        popular(engine, linhas)
+
+        print(f"{'CAMINHO':<18} | {'CARGA':>9} | {'MEMÓRIA':>20} | {'PICO':>16}")
+        with Session(engine) as session:
+            store = medir("TransactionStore", lambda: TransactionStore.from_session(session))
+            print(f"  arrays: {store.nbytes / 2**20:.1f} MiB ({store.nbytes / max(len(store), 1):.0f} bytes/transação)")
+            del store
+
+        with Session(engine) as session:
+            orm = medir("Lista ORM", lambda: session.exec(select(Transaction)).all())
+            del orm
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    main(parser.parse_args().rows)
@@ -0,0 +1,32 @@
+import argparse
+from datetime import date
+from sqlmodel import Session
+from app.db.init_db import init_db
+from app.db.session import engine
+from app.models.corporate_action import CorporateAction
+from app.services.corporate_actions import TIPOS, CorporateActionService
+
+def registrar(ticker: str, data: date, tipo: str, fator: float):
+    init_db()
+    ticker = ticker.upper()
+    with Session(engine) as session:
+        carteiras = CorporateActionService.register(
+            session, CorporateAction(ticker=ticker, data=data, tipo=TIPOS[tipo], fator=fator)
+        )
+        session.commit()
+    print(f"{tipo.capitalize()} de {ticker} em {data:%d/%m/%Y} (fator {fator:g}) registrado; "
+          f"{len(carteiras)} carteira(s) ajustada(s).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Registra um evento societário e ajusta posições e histórico do ticker."
+    )
+    parser.add_argument("ticker")
+    parser.add_argument("data", type=date.fromisoformat, help="Data ex (AAAA-MM-DD)")
+    parser.add_argument("tipo", choices=list(TIPOS))
+    parser.add_argument(
+        "fator", type=float,
+        help="Multiplicador da quantidade: desdobramento 1 para 2 = 2, grupamento 10 para 1 = 0.1, bonificação de 10%% = 1.1",
+    )
+    args = parser.parse_args()
+    registrar(args.ticker, args.data, args.tipo, args.fator)
@@ -0,0 +1,33 @@
+import argparse
+import time
+from app.db.init_db import init_db
+from app.db.session import engine
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.services.importer import ImportService, LAYOUTS
+
+def importar(tipo: str, arquivo: str, chunk_size: int, sep: str, carteira: int):
+    init_db()
+    print(f"Importando {tipo} de {arquivo} para a carteira {carteira} (lotes de {chunk_size:,} linhas)...")
+
+    inicio = time.perf_counter()
+    lidas = inseridas = 0
+    for r in ImportService.import_file(engine, arquivo, tipo, chunk_size=chunk_size, sep=sep, portfolio_id=carteira):
+        lidas += r.lidas
+        inseridas += r.inseridas
+        print(
+            f"Lote {r.lote:>4}: {r.lidas:>9,} lidas | {r.validas:>9,} válidas | "
+            f"{r.inseridas:>9,} novas | {r.linhas_por_segundo:>12,.0f} linhas/s"
+        )
+
+    total = time.perf_counter() - inicio
+    print(f"Concluído: {lidas:,} linhas lidas, {inseridas:,} inseridas em {total:.1f}s.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa extratos CSV de corretora.")
+    parser.add_argument("tipo", choices=list(LAYOUTS))
+    parser.add_argument("arquivo")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--sep", default=",", help="Separador de colunas (extratos da B3 usam ';')")
+    parser.add_argument("--carteira", type=int, default=CARTEIRA_PADRAO, help="portfolio_id de destino")
+    args = parser.parse_args()
+    importar(args.tipo, args.arquivo, args.chunk_size, args.sep, args.carteira)
@@ -0,0 +1,31 @@
+import argparse
+import time
+from app.db.init_db import init_db
+from app.db.session import engine
+from app.services.batch import BatchRecomputeService
+
+def recalcular(job: str, workers, chunk_size, restart: bool):
+    init_db()
+    print(f"Recalculando carteiras (job '{job}')...")
+
+    inicio = time.perf_counter()
+    carteiras = transacoes = 0
+    for r in BatchRecomputeService.recompute_all(engine, job, workers, chunk_size, restart):
+        carteiras += r.carteiras
+        transacoes += r.transacoes
+        print(
+            f"Lote {r.lote:>5}: {r.carteiras:>6,} carteiras | {r.transacoes:>11,} transações | "
+            f"{r.segundos:>7.2f}s"
+        )
+
+    total = time.perf_counter() - inicio
+    print(f"Concluído: {carteiras:,} carteiras, {transacoes:,} transações em {total:.1f}s.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula posições, histórico e proventos de todas as carteiras.")
+    parser.add_argument("--job", default="recalculo", help="Nome do checkpoint (mesmo nome retoma execução interrompida)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do pool (padrão: número de cores)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Carteiras por lote")
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint e recalcula tudo")
+    args = parser.parse_args()
+    recalcular(args.job, args.workers, args.chunk_size, args.restart)
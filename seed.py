@@ -4,6 +4,9 @@ from app.db.init_db import init_db
 from app.db.session import engine
 from app.models.transaction import Transaction
 from app.models.earnings import Earnings
+from app.services.positions import PositionStateService
+from app.services.earnings import EarningsService
+from app.services.snapshots import SnapshotService
 
 def create_fake_data():
     init_db() 
@@ -39,6 +42,12 @@ def create_fake_data():
         # Adiciona e Salva
         session.add_all(transacoes)
         session.add_all(proventos)
+        session.flush()
+
+        # Materializa as posições e os agregados de proventos a partir da carga inicial
+        PositionStateService.rebuild(session)
+        EarningsService.rebuild_monthly(session)
+        SnapshotService.refresh(session)
         session.commit()
         print("Carteira criada com sucesso no PostgreSQL!")
 
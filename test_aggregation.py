@@ -0,0 +1,40 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.transaction import Transaction
+from app.services.aggregation import AggregationService
+from app.services.portfolio import CalculationService
+
+@pytest.mark.parametrize('seed', range(10))
+def test_caminhos_de_banco_iguais_ao_laco(seed):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(seed)
+
+    with Session(engine) as session:
+        for _ in range(rng.randint(0, 400)):
+            session.add(Transaction(
+                ticker=rng.choice(['PETR4', 'VALE3', 'WEGE3', 'MXRF11']),
+                data=date(2020, 1, 1) + timedelta(days=rng.randint(0, 300)),
+                quantidade=rng.randint(1, 300),
+                preco=round(rng.uniform(5, 80), 2),
+                tipo=rng.choice(['C', 'C', 'V']),
+            ))
+        session.commit()
+
+        esperado = CalculationService.calculate_positions(
+            session.exec(select(Transaction).order_by(Transaction.id)).all()
+        )
+
+        for obtido in (
+            AggregationService.calculate_positions_sql(session),
+            AggregationService.calculate_positions_streaming(session, batch_size=50),
+        ):
+            assert [p.ticker for p in obtido] == [p.ticker for p in esperado]
+            for o, e in zip(obtido, esperado):
+                assert o.quantidade == e.quantidade
+                assert o.preco_medio == pytest.approx(e.preco_medio)
+                assert o.total_investido == pytest.approx(e.total_investido)
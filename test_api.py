@@ -0,0 +1,121 @@
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.routes import decode_cursor, router
+from app.db.session import get_async_session, get_session
+from app.models.transaction import Transaction
+from app.services.positions import PositionStateService
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def client(engine, tmp_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}")
+
+    def sessao():
+        with Session(engine) as session:
+            yield session
+
+    async def sessao_async():
+        async with AsyncSession(async_engine) as session:
+            yield session
+
+    api = FastAPI()
+    api.include_router(router)
+    api.dependency_overrides[get_session] = sessao
+    api.dependency_overrides[get_async_session] = sessao_async
+    with TestClient(api) as client:
+        yield client
+
+def _inserir(engine, n=25):
+    inicio = date(2024, 1, 1)
+    with Session(engine) as session:
+        for i in range(n):
+            # Duas transações por dia para exercitar o desempate por id
+            t = Transaction(ticker='PETR4' if i % 3 else 'VALE3', data=inicio + timedelta(days=i // 2),
+                            quantidade=10, preco=20.0 + i, tipo='C')
+            session.add(t)
+            session.flush()
+            PositionStateService.record_transaction(session, t)
+        session.commit()
+
+def test_paginacao_keyset_percorre_tudo_sem_repetir(engine, client):
+    _inserir(engine)
+    ids, cursor = [], None
+    while True:
+        params = {'limit': 7, **({'cursor': cursor} if cursor else {})}
+        corpo = client.get('/api/transactions', params=params).json()
+        ids += [t['id'] for t in corpo['items']]
+        cursor = corpo['next_cursor']
+        if cursor is None:
+            break
+    assert ids == list(range(1, 26))
+
+    corpo = client.get('/api/transactions', params={'limit': 5, 'desc': True}).json()
+    assert [t['id'] for t in corpo['items']] == [25, 24, 23, 22, 21]
+    assert decode_cursor(corpo['next_cursor']) == (date(2024, 1, 11), 21)
+
+    vale = client.get('/api/transactions', params={'ticker': 'vale3', 'limit': 100}).json()
+    assert {t['ticker'] for t in vale['items']} == {'VALE3'} and len(vale['items']) == 9
+
+    assert client.get('/api/transactions', params={'cursor': 'lixo'}).status_code == 400
+
+def test_etag_devolve_304_ate_os_dados_mudarem(engine, client):
+    _inserir(engine, 3)
+    primeira = client.get('/api/positions')
+    etag = primeira.headers['etag']
+    assert {p['ticker'] for p in primeira.json()} == {'PETR4', 'VALE3'}
+
+    repetida = client.get('/api/positions', headers={'If-None-Match': etag})
+    assert repetida.status_code == 304 and repetida.content == b''
+
+    with Session(engine) as session:
+        t = Transaction(ticker='WEGE3', data=date(2024, 2, 1), quantidade=5, preco=40.0, tipo='C')
+        session.add(t)
+        session.flush()
+        PositionStateService.record_transaction(session, t)
+        session.commit()
+
+    nova = client.get('/api/positions', headers={'If-None-Match': etag})
+    assert nova.status_code == 200 and nova.headers['etag'] != etag
+    assert 'WEGE3' in {p['ticker'] for p in nova.json()}
+
+def test_etag_muda_com_escrita_de_outro_processo(engine, client):
+    _inserir(engine, 3)
+    etag = client.get('/api/transactions').headers['etag']
+
+    # Como o import_csv.py ou outro worker: o commit não passa por este processo
+    script = (
+        "import sys\n"
+        "from datetime import date\n"
+        "from sqlmodel import Session, create_engine\n"
+        "import app.db.session\n"
+        "from app.models.transaction import Transaction\n"
+        "with Session(create_engine(sys.argv[1])) as session:\n"
+        "    session.add(Transaction(ticker='WEGE3', data=date(2024, 2, 1), quantidade=5, preco=40.0, tipo='C'))\n"
+        "    session.commit()\n"
+    )
+    subprocess.run([sys.executable, '-c', script, str(engine.url)], check=True, cwd=Path(__file__).parent)
+
+    nova = client.get('/api/transactions', headers={'If-None-Match': etag})
+    assert nova.status_code == 200 and nova.headers['etag'] != etag
+    assert 'WEGE3' in {t['ticker'] for t in nova.json()['items']}
+
+def test_proventos_e_periodo_invalido(client):
+    corpo = client.get('/api/earnings').json()
+    assert corpo == {'total': 0.0, 'por_tipo': {}, 'por_ticker': {}, 'por_mes': []}
+    assert client.get('/api/history', params={'periodo': 'ontem'}).status_code == 400
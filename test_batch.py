@@ -0,0 +1,120 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.config import settings
+from app.models.earnings import Earnings
+from app.models.portfolio import RecomputeCheckpoint
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.services.batch import BatchRecomputeService
+from app.services.earnings import EarningsService
+from app.services.history import HistoryService
+from app.services.portfolio import CalculationService
+from app.services.positions import PositionStateService
+from app.services.snapshots import SnapshotService
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(7)
+    with Session(engine) as session:
+        for carteira in range(1, 7):
+            for i in range(40):
+                session.add(Transaction(
+                    portfolio_id=carteira, ticker=rng.choice(['PETR4', 'VALE3', 'MXRF11']),
+                    data=date(2024, 1, 1) + timedelta(days=rng.randint(0, 300)),
+                    quantidade=rng.randint(1, 50), preco=rng.uniform(10, 50), tipo=rng.choice('CCV'),
+                ))
+            session.add(Earnings(portfolio_id=carteira, ticker='PETR4', data=date(2024, 3, 5), valor_total=10.0 * carteira, tipo='DIV'))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+def _esperado(session, carteira):
+    transacoes = session.exec(
+        select(Transaction).where(Transaction.portfolio_id == carteira).order_by(Transaction.data, Transaction.id)
+    ).all()
+    return sorted(
+        ((p.ticker, p.quantidade, round(p.total_investido, 6)) for p in CalculationService.calculate_positions(transacoes))
+    )
+
+def _obtido(session, carteira):
+    return sorted(
+        (p.ticker, p.quantidade, round(p.total_investido, 6))
+        for p in PositionStateService.current_positions(session, carteira)
+    )
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_recalculo_de_todas_as_carteiras(engine, workers):
+    relatorios = list(BatchRecomputeService.recompute_all(engine, workers=workers, chunk_size=2))
+
+    assert sum(r.carteiras for r in relatorios) == 6
+    assert sum(r.transacoes for r in relatorios) == 240
+    with Session(engine) as session:
+        for carteira in range(1, 7):
+            assert _obtido(session, carteira) == _esperado(session, carteira)
+            assert EarningsService.total(session, portfolio_id=carteira) == 10.0 * carteira
+        # Checkpoint limpo ao final
+        assert session.exec(select(RecomputeCheckpoint)).all() == []
+
+def test_retoma_apenas_carteiras_pendentes(engine):
+    with Session(engine) as session:
+        session.add(RecomputeCheckpoint(job='noturno', portfolio_id=3, concluido_em=datetime.now(timezone.utc)))
+        session.commit()
+
+    relatorios = list(BatchRecomputeService.recompute_all(engine, job='noturno', workers=1, chunk_size=10))
+    assert [r.carteiras for r in relatorios] == [5]
+
+    with Session(engine) as session:
+        # A carteira 3 constava como concluída e não foi tocada
+        assert session.exec(select(Position).where(Position.portfolio_id == 3)).all() == []
+        assert _obtido(session, 4) == _esperado(session, 4)
+
+    # restart ignora o checkpoint e também processa a 3
+    relatorios = list(BatchRecomputeService.recompute_all(engine, job='noturno', workers=1, restart=True))
+    assert sum(r.carteiras for r in relatorios) == 6
+
+def test_estado_incremental_isolado_por_carteira():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for carteira, preco in ((1, 10.0), (2, 30.0)):
+            PositionStateService.record_transaction(session, Transaction(
+                portfolio_id=carteira, ticker='PETR4', data=date(2024, 1, 1), quantidade=100, preco=preco, tipo='C'))
+        # Retroativa na carteira 2 não altera a carteira 1
+        PositionStateService.record_transaction(session, Transaction(
+            portfolio_id=2, ticker='PETR4', data=date(2023, 12, 1), quantidade=100, preco=10.0, tipo='C'))
+        session.commit()
+
+        assert [p.preco_medio for p in PositionStateService.current_positions(session, 1)] == [10.0]
+        assert [p.preco_medio for p in PositionStateService.current_positions(session, 2)] == [20.0]
+
+def test_historico_de_precos_lido_uma_vez_por_lote(engine, tmp_path, monkeypatch):
+    dias = pd.date_range('2023-12-01', '2024-12-31', freq='B')
+    pd.DataFrame(
+        [(dia.date(), ticker, 20.0 + i * 0.01) for ticker in ('PETR4', 'VALE3', 'MXRF11') for i, dia in enumerate(dias)],
+        columns=['data', 'ticker', 'preco'],
+    ).to_csv(tmp_path / 'precos.csv', index=False)
+    monkeypatch.setattr(settings, 'PRICE_HISTORY_FILE', str(tmp_path / 'precos.csv'))
+
+    leituras = []
+    original = HistoryService.load_price_history
+
+    def contar(*args, **kwargs):
+        leituras.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(HistoryService, 'load_price_history', contar)
+    relatorios = list(BatchRecomputeService.recompute_all(engine, workers=1, chunk_size=3))
+    assert len(relatorios) == 2 and len(leituras) == 2
+
+    # Mesmo resultado de refazer a carteira sozinha, lendo o arquivo
+    with Session(engine) as session:
+        em_lote = SnapshotService.load_periods(session, 5)['Tempo máximo']
+        SnapshotService.refresh(session, 5)
+        pd.testing.assert_series_equal(SnapshotService.load_periods(session, 5)['Tempo máximo'], em_lote)
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.benchmarks import BenchmarkIndex
+
+def test_retorno_acumulado_cdi():
+    dias_uteis = pd.bdate_range('2024-01-01', '2024-03-31')
+    cdi = BenchmarkIndex.from_daily_rates(pd.Series(0.04, index=dias_uteis))
+
+    entre = dias_uteis[(dias_uteis > '2024-01-10') & (dias_uteis <= '2024-02-20')]
+    esperado = 1.0004 ** len(entre) - 1
+    assert cdi.accumulated_return(pd.Timestamp('2024-01-10'), pd.Timestamp('2024-02-20')) == pytest.approx(esperado)
+
+def test_ipca_mensal_pro_rata_e_rebase():
+    meses = pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01'])
+    ipca = BenchmarkIndex.from_monthly_rates(pd.Series([0.5, 0.4, 0.3], index=meses))
+
+    # Mês cheio: do último dia de jan ao último de fev rende exatamente a taxa de fevereiro
+    assert ipca.accumulated_return(pd.Timestamp('2024-01-31'), pd.Timestamp('2024-02-29')) == pytest.approx(0.004)
+
+    datas = pd.to_datetime(['2024-01-31', '2024-02-29', '2024-03-31'])
+    curva = ipca.rebase(datas, 100_000)
+    np.testing.assert_allclose(curva, [100_000, 100_400, 100_400 * 1.003])
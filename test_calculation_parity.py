@@ -0,0 +1,71 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.transaction import Transaction
+from app.services.portfolio import CalculationService
+from app.services.store import TransactionStore
+
+TICKERS = ['PETR4', 'VALE3', 'WEGE3', 'MXRF11', 'BBAS3', 'ITSA4']
+
+def gerar_historico(seed: int, tamanho: int):
+    """Histórico aleatório de compras e vendas, com vendas a descoberto e zeragens."""
+    rng = random.Random(seed)
+    inicio = date(2015, 1, 1)
+    transacoes = []
+    for _ in range(tamanho):
+        transacoes.append(Transaction(
+            ticker=rng.choice(TICKERS),
+            data=inicio + timedelta(days=rng.randint(0, 365 * 5)),
+            quantidade=rng.randint(1, 500),
+            preco=round(rng.uniform(5, 100), 2),
+            tipo=rng.choice(['C', 'C', 'V']),
+        ))
+    return transacoes
+
+@pytest.mark.parametrize('seed', range(25))
+@pytest.mark.parametrize('tamanho', [0, 1, 10, 200, 2000])
+def test_motor_colunar_igual_ao_laco(seed, tamanho):
+    transacoes = gerar_historico(seed, tamanho)
+
+    esperado = CalculationService.calculate_positions(transacoes)
+    obtido = CalculationService.calculate_positions_columnar(
+        CalculationService.transactions_to_frame(transacoes)
+    )
+
+    assert [p.ticker for p in obtido] == [p.ticker for p in esperado]
+    for o, e in zip(obtido, esperado):
+        assert o.quantidade == e.quantidade
+        assert o.preco_medio == pytest.approx(e.preco_medio, rel=1e-9, abs=1e-9)
+        assert o.total_investido == pytest.approx(e.total_investido, rel=1e-9, abs=1e-6)
+
+@pytest.mark.parametrize('seed', range(5))
+def test_store_compacto_igual_ao_laco(seed):
+    transacoes = gerar_historico(seed, 500)
+    store = TransactionStore.from_rows(
+        ((t.ticker, t.data, t.quantidade, t.preco, t.tipo) for t in transacoes), batch_size=64
+    )
+
+    esperado = CalculationService.calculate_positions(transacoes)
+    obtido = store.positions()
+
+    assert [p.ticker for p in obtido] == [p.ticker for p in esperado]
+    assert [p.quantidade for p in obtido] == [p.quantidade for p in esperado]
+    assert [p.total_investido for p in obtido] == pytest.approx([p.total_investido for p in esperado])
+
+def test_store_nao_estoura_quantidades_grandes():
+    # Acima de 2**31 por linha: em int32 estouraria
+    linhas = [('PETR4', date(2024, 1, d), 3_000_000_000, 1.0, 'C') for d in (2, 3, 4)]
+    [posicao] = TransactionStore.from_rows(linhas).positions()
+    assert posicao.quantidade == 9_000_000_000
+    assert posicao.total_investido == pytest.approx(9e9)
+
+def test_motor_colunar_mantem_quantidades_fracionarias():
+    # Frame ajustado por bonificação (ver AdjustmentFactors.adjust_frame): 15 × 1.1 duas vezes
+    frame = CalculationService.transactions_to_frame([
+        Transaction(ticker='ITSA4', data=date(2024, 1, 2), quantidade=15, preco=10.0, tipo='C'),
+        Transaction(ticker='ITSA4', data=date(2024, 1, 3), quantidade=15, preco=10.0, tipo='C'),
+    ]).assign(quantidade=[16.5, 16.5], preco=[10 / 1.1, 10 / 1.1])
+    [posicao] = CalculationService.calculate_positions_columnar(frame)
+    assert posicao.quantidade == 33
@@ -0,0 +1,25 @@
+import numpy as np
+
+from app.ui.components.charts import downsample, lttb_indices, minmax_indices
+
+def test_reducao_preserva_extremos_e_bordas():
+    y = np.cumsum(np.random.default_rng(3).normal(size=2500)) + 100
+    rotulos = list(range(len(y)))
+
+    novos_rotulos, series = downsample(rotulos, {'carteira': y, 'cdi': y * 0.5}, limite=300)
+
+    assert len(novos_rotulos) <= 300
+    assert novos_rotulos[0] == 0 and novos_rotulos[-1] == len(y) - 1
+    assert max(series['carteira']) == round(y.max(), 2)
+    assert min(series['carteira']) == round(y.min(), 2)
+
+def test_indices_ordenados_e_no_limite():
+    y = np.sin(np.linspace(0, 50, 5000))
+    for seletor in (lttb_indices, minmax_indices):
+        indices = seletor(y, 200)
+        assert len(indices) <= 200
+        assert np.all(np.diff(indices) > 0)
+
+def test_series_curtas_nao_mudam():
+    rotulos, series = downsample(['Jan', 'Fev'], {'carteira': [1.0, 2.0]}, limite=100)
+    assert rotulos == ['Jan', 'Fev'] and series == {'carteira': [1.0, 2.0]}
@@ -0,0 +1,227 @@
+import random
+import re
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.corporate_action import BONIFICACAO, DESDOBRAMENTO, GRUPAMENTO, CorporateAction
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.position import Position, PositionHistory
+from app.models.transaction import Transaction
+from app.services.adjustments import AdjustmentFactors
+from app.services.aggregation import AggregationService
+from app.services.corporate_actions import CorporateActionService
+from app.services.portfolio import CalculationService
+from app.services.positions import PositionStateService
+from app.services.store import TransactionStore
+from app.services.taxes import ACAO, TaxService, TaxState
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+def comprar(session, ticker, dia, quantidade, preco, tipo='C', carteira=CARTEIRA_PADRAO):
+    PositionStateService.record_transaction(session, Transaction(
+        portfolio_id=carteira, ticker=ticker, data=dia, quantidade=quantidade, preco=preco, tipo=tipo,
+    ))
+
+def estado(session, carteira=CARTEIRA_PADRAO):
+    return {
+        p.ticker: (p.quantidade, round(p.total_investido, 6))
+        for p in session.exec(select(Position).where(Position.portfolio_id == carteira)).all()
+    }
+
+def historico(session, ticker=None):
+    consulta = select(PositionHistory).order_by(PositionHistory.portfolio_id, PositionHistory.ticker, PositionHistory.data)
+    if ticker is not None:
+        consulta = consulta.where(PositionHistory.ticker == ticker)
+    return [
+        (h.portfolio_id, h.ticker, h.data, round(h.quantidade, 6), round(h.preco_medio, 6), round(h.total_investido, 6))
+        for h in session.exec(consulta).all()
+    ]
+
+def test_fatores_acumulados_respeitam_a_data_ex():
+    fatores = AdjustmentFactors([
+        ('PETR4', date(2024, 3, 1), 2.0),
+        ('PETR4', date(2024, 6, 1), 1.1),
+        ('VALE3', date(2024, 1, 1), 0.1),
+    ])
+    assert fatores.factor('PETR4', date(2024, 2, 28)) == pytest.approx(2.2)
+    assert fatores.factor('PETR4', date(2024, 3, 1)) == pytest.approx(1.1)  # No "ex" já está na nova base
+    assert fatores.factor('PETR4', date(2024, 6, 1)) == 1.0
+    assert fatores.factor('ITSA4', date(2000, 1, 1)) == 1.0
+
+    rng = np.random.default_rng(3)
+    tickers = rng.choice(['PETR4', 'VALE3', 'ITSA4'], 1_000)
+    datas = np.datetime64('2023-10-01') + rng.integers(0, 365, 1_000).astype('timedelta64[D]')
+    vetorizado = fatores.factors(tickers, datas)
+    assert vetorizado == pytest.approx([fatores.factor(t, d.astype(date)) for t, d in zip(tickers, datas)])
+
+def test_desdobramento_novo_so_muda_a_base(session):
+    comprar(session, 'PETR4', date(2024, 1, 10), 100, 30.0)
+    comprar(session, 'VALE3', date(2024, 1, 12), 50, 60.0)
+    session.commit()
+    vale_antes = historico(session, 'VALE3')
+
+    afetadas = CorporateActionService.register(
+        session, CorporateAction(ticker='petr4', data=date(2024, 2, 1), tipo=DESDOBRAMENTO, fator=2.0)
+    )
+    session.commit()
+
+    assert afetadas == [CARTEIRA_PADRAO]
+    posicao = session.get(Position, (CARTEIRA_PADRAO, 'PETR4'))
+    assert (posicao.quantidade, posicao.preco_medio, posicao.total_investido) == (200, 15.0, 3000.0)
+    assert historico(session, 'PETR4')[0][3:] == (200, 15.0, 3000.0)
+    assert historico(session, 'VALE3') == vale_antes  # Só o ticker do evento é tocado
+
+    # Venda na nova base zera a posição
+    comprar(session, 'PETR4', date(2024, 3, 1), 200, 20.0, tipo='V')
+    session.commit()
+    assert session.get(Position, (CARTEIRA_PADRAO, 'PETR4')).quantidade == 0
+
+@pytest.mark.parametrize('seed', range(3))
+def test_evento_retroativo_igual_ao_recalculo_completo(session, seed):
+    rng = random.Random(seed)
+    inicio = date(2022, 1, 1)
+    for carteira in (1, 2):
+        for _ in range(60):
+            comprar(
+                session, rng.choice(['PETR4', 'VALE3', 'MXRF11']), inicio + timedelta(days=rng.randint(0, 700)),
+                rng.randint(1, 50) * 10, round(rng.uniform(5, 50), 2),
+                tipo='C' if rng.random() < 0.7 else 'V', carteira=carteira,
+            )
+    session.commit()
+
+    # Eventos no meio do histórico, registrados depois das negociações
+    for acao in (
+        CorporateAction(ticker='PETR4', data=inicio + timedelta(days=200), tipo=DESDOBRAMENTO, fator=3.0),
+        CorporateAction(ticker='VALE3', data=inicio + timedelta(days=400), tipo=GRUPAMENTO, fator=0.5),
+        CorporateAction(ticker='PETR4', data=inicio + timedelta(days=500), tipo=BONIFICACAO, fator=1.1),
+    ):
+        CorporateActionService.register(session, acao)
+        session.commit()
+
+    incremental = ({c: estado(session, c) for c in (1, 2)}, historico(session))
+    PositionStateService.rebuild(session)
+    session.commit()
+    assert ({c: estado(session, c) for c in (1, 2)}, historico(session)) == incremental
+
+    # Todos os caminhos de leitura chegam às mesmas posições ajustadas
+    for carteira in (1, 2):
+        esperado = sorted(PositionStateService.current_positions(session, carteira), key=lambda p: p.ticker)
+        caminhos = [
+            AggregationService.calculate_positions_sql(session, carteira),
+            AggregationService.calculate_positions_streaming(session, portfolio_id=carteira),
+            CalculationService.calculate_positions_columnar(AggregationService.transactions_frame(session, portfolio_id=carteira)),
+            TransactionStore.from_session(session, portfolio_id=carteira).positions(),
+        ]
+        for obtido in caminhos:
+            obtido = sorted(obtido, key=lambda p: p.ticker)
+            assert [(p.ticker, p.quantidade) for p in obtido] == [(p.ticker, p.quantidade) for p in esperado]
+            for o, e in zip(obtido, esperado):
+                assert o.total_investido == pytest.approx(e.total_investido)
+                assert o.preco_medio == pytest.approx(e.preco_medio)
+
+def test_bonificacao_arredonda_na_posicao(session):
+    comprar(session, 'ITSA4', date(2024, 1, 2), 15, 10.0)
+    comprar(session, 'ITSA4', date(2024, 1, 3), 15, 10.0)
+    session.commit()
+    CorporateActionService.register(
+        session, CorporateAction(ticker='ITSA4', data=date(2024, 2, 1), tipo=BONIFICACAO, fator=1.1)
+    )
+    session.commit()
+
+    # 30 × 1.1 = 33 (e não 2 × floor(16.5)); o custo total não muda
+    [posicao] = PositionStateService.current_positions(session)
+    assert (posicao.quantidade, posicao.total_investido) == (33, 300.0)
+    assert posicao.preco_medio == pytest.approx(300 / 33)
+
+def test_evento_invalido(session):
+    with pytest.raises(ValueError):
+        CorporateActionService.register(session, CorporateAction(ticker='X', data=date(2024, 1, 1), tipo=GRUPAMENTO, fator=2.0))
+    with pytest.raises(ValueError):
+        CorporateActionService.register(session, CorporateAction(ticker='X', data=date(2024, 1, 1), tipo='Z', fator=2.0))
+
+def test_apuracao_continua_depois_de_um_desdobramento(session):
+    comprar(session, 'PETR4', date(2024, 1, 10), 100, 30.0)
+    session.commit()
+    estado_ir = TaxState()
+    assert list(TaxService.monthly_report_from_db(session, estado_ir, ate=date(2024, 2, 1), classes={'PETR4': ACAO})) == []
+
+    CorporateActionService.register(
+        session, CorporateAction(ticker='PETR4', data=date(2024, 2, 5), tipo=DESDOBRAMENTO, fator=2.0)
+    )
+    comprar(session, 'PETR4', date(2024, 3, 1), 200, 20.0, tipo='V')
+    session.commit()
+
+    [marco] = TaxService.monthly_report_from_db(session, estado_ir, ate=date(2024, 4, 1), classes={'PETR4': ACAO})
+    # Custo de 15 por ação na nova base: ganho de 200 × (20 - 15)
+    assert (marco.vendas, marco.ganho_liquido) == (4000.0, 1000.0)
+
+    # Do zero dá o mesmo resultado
+    [do_zero] = TaxService.monthly_report_from_db(session, TaxState(), ate=date(2024, 4, 1), classes={'PETR4': ACAO})
+    assert do_zero.ganho_liquido == marco.ganho_liquido
+
+def test_cache_de_fatores_segue_o_commit(session):
+    assert not AdjustmentFactors.load(session)
+    session.add(CorporateAction(ticker='PETR4', data=date(2024, 1, 1), tipo=DESDOBRAMENTO, fator=2.0))
+    session.flush()
+    # Evento ainda sem commit: a sessão que o gravou já o enxerga
+    assert 'PETR4' in AdjustmentFactors.load(session)
+    session.commit()
+    fatores = AdjustmentFactors.load(session)
+    assert 'PETR4' in fatores and AdjustmentFactors.load(session) is fatores
+
+def test_cache_de_fatores_ve_evento_de_outro_processo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'eventos.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert not AdjustmentFactors.load(session)
+
+    # Como o corporate_action.py: o commit não passa por este processo
+    script = (
+        "import sys\n"
+        "from datetime import date\n"
+        "from sqlmodel import Session, create_engine\n"
+        "import app.db.session\n"
+        "from app.models.corporate_action import CorporateAction\n"
+        "with Session(create_engine(sys.argv[1])) as session:\n"
+        "    session.add(CorporateAction(ticker='PETR4', data=date(2024, 1, 1), tipo='D', fator=2.0))\n"
+        "    session.commit()\n"
+    )
+    subprocess.run([sys.executable, '-c', script, str(engine.url)], check=True, cwd=Path(__file__).parent)
+
+    with Session(engine) as session:
+        assert 'PETR4' in AdjustmentFactors.load(session)
+    engine.dispose()
+
+def _round_sem_numeric(statement) -> list:
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    # O Postgres não tem round(double precision, integer)
+    return [trecho for trecho in re.findall(r'round\(\s*\S+', sql) if 'CAST' not in trecho]
+
+def test_arredondamentos_compilam_no_postgres(session):
+    assert _round_sem_numeric(AggregationService.positions_query()) == []
+
+    comprar(session, 'PETR4', date(2024, 1, 10), 100, 30.0)
+    comprar(session, 'PETR4', date(2024, 3, 1), 10, 30.0)
+    session.commit()
+    executados = []
+    event.listen(session, 'do_orm_execute', lambda estado: executados.append(estado.statement))
+    CorporateActionService.register(
+        session, CorporateAction(ticker='PETR4', data=date(2024, 2, 1), tipo=BONIFICACAO, fator=1.1)
+    )
+    atualizacoes = [s for s in executados if getattr(s, 'is_update', False)]
+    assert len(atualizacoes) >= 2
+    assert all(_round_sem_numeric(s) == [] for s in atualizacoes)
+    assert session.get(Position, (CARTEIRA_PADRAO, 'PETR4')).quantidade == pytest.approx(120.0)
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models.transaction import Transaction
+from app.services import dashboard
+from app.services.dashboard import DashboardService
+from app.services.positions import PositionStateService
+from app.services.quotes import QuoteCache, StaticQuoteProvider
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    """Dashboard apontado para um banco e um cache de cotações só do teste."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'dash.db'}")
+    SQLModel.metadata.create_all(engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dash.db'}")
+    provider = StaticQuoteProvider({'PETR4': 30.0})
+    cache = QuoteCache(provider, ttl=0)
+
+    monkeypatch.setattr(dashboard, 'async_session_factory', async_sessionmaker(
+        async_engine, class_=AsyncSession, expire_on_commit=False,
+    ))
+    monkeypatch.setattr(dashboard, 'engine', engine)
+    monkeypatch.setattr(dashboard, 'get_quote_cache', lambda: cache)
+    monkeypatch.setattr(settings, 'QUOTES_TTL_SECONDS', 0.0)
+    for atributo in ('_cache', '_lock', '_precos'):
+        monkeypatch.setattr(DashboardService, atributo, None)
+
+    construcoes = []
+    original = DashboardService.build_view_model
+
+    async def contar(versao):
+        construcoes.append(versao)
+        return await original(versao)
+
+    monkeypatch.setattr(DashboardService, 'build_view_model', contar)
+    yield engine, provider, construcoes
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+
+def comprar(engine, ticker, dia, quantidade, preco):
+    with Session(engine) as session:
+        PositionStateService.record_transaction(session, Transaction(
+            ticker=ticker, data=dia, quantidade=quantidade, preco=preco, tipo='C',
+        ))
+        session.commit()
+
+def test_cotacao_expirada_so_reavalia_as_posicoes(ambiente):
+    engine, provider, construcoes = ambiente
+    comprar(engine, 'PETR4', date(2024, 1, 2), 10, 20.0)
+
+    async def cenario():
+        primeiro = await DashboardService.get_view_model()
+        provider.prices['PETR4'] = 35.0
+        segundo = await DashboardService.get_view_model()
+        return primeiro, segundo
+
+    primeiro, segundo = asyncio.run(cenario())
+    assert len(construcoes) == 1
+    assert segundo is not primeiro and segundo.historico is primeiro.historico
+    assert segundo.posicoes[0].preco_atual == 35.0 and segundo.saldo_atual == 350.0
+    # Quem ainda renderiza o view model anterior não vê as posições mudarem
+    assert primeiro.posicoes[0].preco_atual == 30.0 and primeiro.saldo_atual == 300.0
+
+    comprar(engine, 'VALE3', date(2024, 1, 3), 5, 60.0)
+    terceiro = asyncio.run(DashboardService.get_view_model())
+    assert len(construcoes) == 2
+    assert {p.ticker for p in terceiro.posicoes} == {'PETR4', 'VALE3'}
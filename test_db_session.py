@@ -0,0 +1,44 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.db.session import ASYNC_DRIVERS, SYNC_DRIVERS, _engine_options, _with_driver
+
+def test_troca_de_driver_preserva_o_restante_da_url():
+    url = 'postgresql://user:senha@db:5432/invest?sslmode=require'
+    # asyncpg não aceita `sslmode`: vira `ssl`, com o mesmo modo
+    assert _with_driver(url, ASYNC_DRIVERS).render_as_string(hide_password=False) == \
+        'postgresql+asyncpg://user:senha@db:5432/invest?ssl=require'
+    assert _with_driver('postgresql+asyncpg://u@db/x?ssl=require', SYNC_DRIVERS).query == {'sslmode': 'require'}
+    assert _with_driver('postgresql://u@db/x', ASYNC_DRIVERS).query == {}
+    assert _with_driver('postgresql+asyncpg://u@db/invest', SYNC_DRIVERS).drivername == 'postgresql+psycopg2'
+    assert _with_driver('sqlite:////tmp/x.db', ASYNC_DRIVERS).render_as_string() == 'sqlite+aiosqlite:////tmp/x.db'
+    assert _with_driver('sqlite+aiosqlite:////tmp/x.db', SYNC_DRIVERS).drivername == 'sqlite'
+    # Backend desconhecido mantém o driver informado
+    assert _with_driver('mysql+pymysql://u@db/x', ASYNC_DRIVERS).drivername == 'mysql+pymysql'
+
+def test_opcoes_de_pool_so_fora_do_sqlite(monkeypatch):
+    monkeypatch.setattr(settings, 'DB_POOL_SIZE', 7)
+    monkeypatch.setattr(settings, 'DB_STATEMENT_CACHE_SIZE', 123)
+
+    sqlite = _engine_options(_with_driver('sqlite://', SYNC_DRIVERS))
+    assert sqlite['query_cache_size'] == 123
+    assert 'pool_size' not in sqlite and 'max_overflow' not in sqlite
+
+    postgres = _engine_options(_with_driver('postgresql://u@db/x', ASYNC_DRIVERS))
+    assert postgres['pool_size'] == 7 and postgres['query_cache_size'] == 123
+    assert {'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping'} <= set(postgres)
+
+def test_engine_assincrono_do_sqlite(tmp_path):
+    url = _with_driver(f'sqlite:///{tmp_path / "x.db"}', ASYNC_DRIVERS)
+    engine = create_async_engine(url, **_engine_options(url))
+
+    async def consultar():
+        async with engine.connect() as conexao:
+            valor = (await conexao.execute(text('select 1'))).scalar()
+        await engine.dispose()
+        return valor
+
+    assert asyncio.run(consultar()) == 1
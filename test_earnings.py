@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models.earnings import Earnings
+from app.schemas.portfolio import PositionSummary
+from app.services.earnings import EarningsService
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+PROVENTOS = [
+    ('PETR4', date(2023, 11, 20), 100.0, 'DIV'),
+    ('PETR4', date(2024, 3, 10), 50.0, 'JCP'),
+    ('PETR4', date(2024, 3, 25), 70.0, 'DIV'),
+    ('MXRF11', date(2024, 3, 15), 10.0, 'DIV'),
+    ('MXRF11', date(2024, 9, 15), 12.0, 'DIV'),
+]
+
+def test_agregados_incrementais_iguais_ao_rebuild(session):
+    for ticker, dia, valor, tipo in PROVENTOS:
+        EarningsService.record_earning(session, Earnings(ticker=ticker, data=dia, valor_total=valor, tipo=tipo))
+    session.commit()
+    incremental = EarningsService.income_by_month(session)
+
+    EarningsService.rebuild_monthly(session)
+    session.commit()
+
+    assert EarningsService.income_by_month(session) == incremental
+    assert incremental[1] == {'mes': date(2024, 3, 1), 'DIV': 80.0, 'JCP': 50.0, 'total': 130.0}
+
+def test_janelas_e_yield_12_meses(session):
+    for ticker, dia, valor, tipo in PROVENTOS:
+        EarningsService.record_earning(session, Earnings(ticker=ticker, data=dia, valor_total=valor, tipo=tipo))
+    session.commit()
+
+    assert EarningsService.income_by_ticker(session, date(2024, 1, 1), date(2024, 6, 30)) == {'PETR4': 120.0, 'MXRF11': 10.0}
+    assert EarningsService.split_by_type(session, date(2024, 1, 1)) == {'DIV': 92.0, 'JCP': 50.0}
+
+    posicoes = [
+        PositionSummary(ticker='PETR4', quantidade=100, preco_medio=20.0, total_investido=2000.0),
+        PositionSummary(ticker='MXRF11', quantidade=100, preco_medio=10.0, total_investido=1000.0),
+    ]
+    total, por_ticker = EarningsService.trailing_yield_on_cost(session, posicoes, date(2024, 10, 31))
+    assert por_ticker == {'PETR4': pytest.approx(11.0), 'MXRF11': pytest.approx(2.2)}
+    assert total == pytest.approx(242 / 3000 * 100)
+
+    # Um mês depois, o provento de novembro/2023 sai da janela
+    total, por_ticker = EarningsService.trailing_yield_on_cost(session, posicoes, date(2024, 11, 1))
+    assert por_ticker['PETR4'] == pytest.approx(6.0)
@@ -0,0 +1,84 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.transaction import Transaction
+from app.services.adjustments import AdjustmentFactors
+from app.services.history import HistoryService
+from app.services.portfolio import CalculationService
+
+def test_valor_diario_igual_ao_recalculo_por_data():
+    rng = random.Random(7)
+    tickers = ['PETR4', 'VALE3', 'WEGE3']
+    datas = pd.bdate_range('2023-01-02', '2023-06-30')
+    precos = pd.DataFrame(
+        np.random.default_rng(7).uniform(10, 50, (len(datas), len(tickers))),
+        index=datas, columns=tickers,
+    )
+
+    transacoes = [
+        Transaction(
+            ticker=rng.choice(tickers),
+            data=date(2023, 1, 1) + timedelta(days=rng.randint(0, 180)),
+            quantidade=rng.randint(1, 200),
+            preco=1.0,
+            tipo='C' if rng.random() < 0.7 else 'V',
+        )
+        for _ in range(150)
+    ]
+    serie = HistoryService.portfolio_value(CalculationService.transactions_to_frame(transacoes), precos)
+
+    for dia in datas[::10]:
+        posicoes = CalculationService.calculate_positions([t for t in transacoes if t.data <= dia.date()])
+        esperado = sum(p.quantidade * precos.at[dia, p.ticker] for p in posicoes)
+        assert serie[dia] == pytest.approx(esperado)
+
+def test_venda_a_descoberto_e_compra_no_mesmo_dia():
+    dia = date(2023, 1, 2)
+    transacoes = [
+        Transaction(ticker='PETR4', data=dia, quantidade=100, preco=1.0, tipo='C'),
+        Transaction(ticker='PETR4', data=dia + timedelta(days=1), quantidade=300, preco=1.0, tipo='V'),
+        Transaction(ticker='PETR4', data=dia + timedelta(days=1), quantidade=50, preco=1.0, tipo='C'),
+    ]
+    datas = pd.date_range(dia, periods=3)
+    quantidades = HistoryService.holdings_matrix(
+        CalculationService.transactions_to_frame(transacoes), datas, pd.Index(['PETR4'])
+    )
+    # A venda zera a posição antes da compra do mesmo dia (somar o dia daria 0)
+    [posicao] = CalculationService.calculate_positions(transacoes)
+    assert quantidades[:, 0].tolist() == [100, 50, 50] and posicao.quantidade == 50
+
+def test_transacoes_depois_do_ultimo_preco():
+    precos = pd.DataFrame({'PETR4': [10.0, 11.0]}, index=pd.to_datetime(['2023-01-02', '2023-01-03']))
+    transacoes = [
+        Transaction(ticker='PETR4', data=date(2023, 1, 2), quantidade=10, preco=10.0, tipo='C'),
+        Transaction(ticker='PETR4', data=date(2023, 1, 9), quantidade=5, preco=12.0, tipo='C'),
+    ]
+    frame = CalculationService.transactions_to_frame(transacoes)
+
+    with pytest.raises(ValueError):
+        HistoryService.holdings_matrix(frame, precos.index, precos.columns)
+
+    # A série vai até a última negociação, com o último preço conhecido
+    serie = HistoryService.portfolio_value(frame, precos)
+    assert serie.index[-1] == pd.Timestamp('2023-01-09')
+    assert serie.iloc[-1] == 15 * 11.0
+
+def test_desdobramento_nao_derruba_o_valor(tmp_path):
+    # Fechamentos brutos: 30 antes do desdobramento 2:1 e 15 a partir da data ex
+    ex = date(2024, 3, 1)
+    arquivo = tmp_path / 'precos.csv'
+    arquivo.write_text('data,ticker,preco\n2024-02-28,PETR4,30\n2024-02-29,PETR4,30\n2024-03-01,PETR4,15\n2024-03-04,PETR4,15\n')
+    fatores = AdjustmentFactors([('PETR4', ex, 2.0)])
+
+    precos = HistoryService.load_price_history(str(arquivo), fatores)
+    assert precos['PETR4'].tolist() == [15.0, 15.0, 15.0, 15.0]
+
+    transacoes = [Transaction(ticker='PETR4', data=date(2024, 2, 28), quantidade=100, preco=30.0, tipo='C')]
+    frame = fatores.adjust_frame(CalculationService.transactions_to_frame(transacoes))
+    assert HistoryService.portfolio_value(frame, precos).tolist() == [3000.0] * 4
+    # Sem fatores o arquivo continua bruto
+    assert HistoryService.load_price_history(str(arquivo))['PETR4'].tolist() == [30.0, 30.0, 15.0, 15.0]
@@ -0,0 +1,81 @@
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.services.importer import ImportService
+
+CSV = """Data do Negócio,Tipo de Movimentação,Código de Negociação,Quantidade,Preço
+02/01/2024,Compra,PETR4,100,"R$ 1.234,50"
+2024-01-03,C,vale3 ,50,60.5
+2024-01-03,C,VALE3,50,60.5
+2024-01-04,X,VALE3,50,60.5
+2024-01-05,V,VALE3,abc,60.5
+2024-01-06,V,VALE3,20,70
+"""
+
+def test_importacao_valida_e_recalcula_posicoes(tmp_path):
+    arquivo = tmp_path / 'negociacoes.csv'
+    arquivo.write_text(CSV, encoding='utf-8')
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    SQLModel.metadata.create_all(engine)
+
+    relatorios = list(ImportService.import_file(engine, arquivo, 'transacoes', chunk_size=2))
+    assert [r.lidas for r in relatorios] == [2, 2, 2]
+    assert sum(r.validas for r in relatorios) == 4
+    # Duas execuções idênticas (VALE3 no dia 3) são negócios distintos: entram as duas
+    assert sum(r.inseridas for r in relatorios) == 4
+
+    # Reimportar o mesmo arquivo não duplica nada
+    assert sum(r.inseridas for r in ImportService.import_file(engine, arquivo, 'transacoes')) == 0
+
+    with Session(engine) as session:
+        assert len(session.exec(select(Transaction)).all()) == 4
+        assert session.get(Position, (CARTEIRA_PADRAO, 'PETR4')).preco_medio == 1234.5
+        assert session.get(Position, (CARTEIRA_PADRAO, 'VALE3')).quantidade == 80
+
+def test_reimportacao_com_mais_linhas_so_traz_as_novas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    SQLModel.metadata.create_all(engine)
+    linha = "2024-01-03,C,VALE3,50,60.5\n"
+    arquivo = tmp_path / 'negociacoes.csv'
+
+    arquivo.write_text("data,tipo,ticker,quantidade,preco\n" + linha * 2, encoding='utf-8')
+    assert sum(r.inseridas for r in ImportService.import_file(engine, arquivo, 'transacoes', chunk_size=1)) == 2
+
+    # Extrato atualizado com uma terceira execução igual: só ela é nova
+    arquivo.write_text("data,tipo,ticker,quantidade,preco\n" + linha * 3, encoding='utf-8')
+    assert sum(r.inseridas for r in ImportService.import_file(engine, arquivo, 'transacoes')) == 1
+
+def test_chave_pelo_numero_do_negocio(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    SQLModel.metadata.create_all(engine)
+    arquivo = tmp_path / 'negociacoes.csv'
+    arquivo.write_text(
+        "Número do Negócio,data,tipo,ticker,quantidade,preco\n"
+        "9001,2024-01-03,C,VALE3,50,60.5\n"
+        "9002,2024-01-03,C,VALE3,50,60.5\n"
+        "9001,2024-01-03,C,VALE3,50,60.5\n",
+        encoding='utf-8',
+    )
+    assert sum(r.inseridas for r in ImportService.import_file(engine, arquivo, 'transacoes')) == 2
+    assert sum(r.inseridas for r in ImportService.import_file(engine, arquivo, 'transacoes')) == 0
+    with Session(engine) as session:
+        chaves = sorted(t.chave_importacao for t in session.exec(select(Transaction)).all())
+    assert chaves == ['id:9001', 'id:9002']
+
+def test_numero_do_negocio_repetido_com_linha_corrigida(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    SQLModel.metadata.create_all(engine)
+    arquivo = tmp_path / 'negociacoes.csv'
+    arquivo.write_text(
+        "Número do Negócio,data,tipo,ticker,quantidade,preco\n"
+        "9001,2024-01-03,C,VALE3,50,60.5\n"
+        "9002,2024-01-03,C,VALE3,10,61\n"
+        "9001,2024-01-03,C,VALE3,55,60.5\n",  # Mesmo negócio, quantidade corrigida: não viola a chave única
+        encoding='utf-8',
+    )
+    assert sum(r.inseridas for r in ImportService.import_file(engine, arquivo, 'transacoes')) == 2
+    with Session(engine) as session:
+        linhas = {t.chave_importacao: t.quantidade for t in session.exec(select(Transaction)).all()}
+    assert linhas == {'id:9001': 50, 'id:9002': 10}
@@ -0,0 +1,47 @@
+import threading
+
+from app.core.metrics import Counter, Histogram, MetricsRegistry
+
+def test_histograma_acumula_baldes_no_formato_prometheus():
+    registro = MetricsRegistry()
+    h = registro.histogram('teste_seconds', 'Teste.', buckets=(0.01, 0.1))
+    for valor in (0.005, 0.05, 0.05, 3.0):
+        h.observe(valor, caminho='x')
+
+    texto = registro.render()
+    assert 'teste_seconds_bucket{caminho="x",le="0.01"} 1' in texto
+    assert 'teste_seconds_bucket{caminho="x",le="0.1"} 3' in texto
+    assert 'teste_seconds_bucket{caminho="x",le="+Inf"} 4' in texto
+    assert 'teste_seconds_count{caminho="x"} 4' in texto
+
+def test_registro_reaproveita_metrica_pelo_nome():
+    registro = MetricsRegistry()
+    assert registro.counter('chamadas_total', 'a') is registro.counter('chamadas_total', 'b')
+    assert isinstance(registro.histogram('h', 'h'), Histogram)
+
+def test_renderizar_enquanto_outras_threads_observam():
+    histograma = Histogram('t_segundos', 'teste', buckets=(0.1, 1.0))
+    contador = Counter('t_total', 'teste')
+    parar = threading.Event()
+
+    def observar(n):
+        i = 0
+        while not parar.is_set():
+            # Labels novos a cada volta: o dicionário cresce durante a renderização
+            histograma.observe(0.5, op=f'{n}-{i % 500}')
+            contador.inc(op=f'{n}-{i % 500}')
+            i += 1
+
+    threads = [threading.Thread(target=observar, args=(n,)) for n in range(2)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(20):
+            linhas = list(histograma.render()) + list(contador.render())
+            infinito = [int(l.rsplit(' ', 1)[1]) for l in linhas if 'le="+Inf"' in l]
+            totais = [int(l.rsplit(' ', 1)[1]) for l in linhas if l.startswith('t_segundos_count')]
+            assert infinito == totais  # Nenhuma série lida pela metade
+    finally:
+        parar.set()
+        for t in threads:
+            t.join()
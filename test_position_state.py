@@ -0,0 +1,64 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.transaction import Transaction
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.position import Position, PositionHistory
+from app.services.portfolio import CalculationService
+from app.services.positions import PositionStateService
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+def comparar(session):
+    esperado = CalculationService.calculate_positions(
+        session.exec(select(Transaction).order_by(Transaction.id)).all()
+    )
+    obtido = PositionStateService.current_positions(session)
+    esperado = sorted(esperado, key=lambda p: p.ticker)
+
+    assert [p.ticker for p in obtido] == [p.ticker for p in esperado]
+    for o, e in zip(obtido, esperado):
+        assert o.quantidade == e.quantidade
+        assert o.total_investido == pytest.approx(e.total_investido)
+        assert o.preco_medio == pytest.approx(e.preco_medio)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_insercoes_incrementais_e_retroativas(session, seed):
+    rng = random.Random(seed)
+    inicio = date(2020, 1, 1)
+
+    for _ in range(120):
+        PositionStateService.record_transaction(session, Transaction(
+            ticker=rng.choice(['PETR4', 'VALE3', 'MXRF11']),
+            data=inicio + timedelta(days=rng.randint(0, 400)),
+            quantidade=rng.randint(1, 300),
+            preco=round(rng.uniform(5, 80), 2),
+            tipo=rng.choice(['C', 'C', 'V']),
+        ))
+        session.commit()
+
+    comparar(session)
+
+    PositionStateService.rebuild(session)
+    session.commit()
+    comparar(session)
+
+def test_insercao_no_fim_nao_refaz_historico(session):
+    PositionStateService.record_transaction(session, Transaction(
+        ticker='PETR4', data=date(2024, 1, 1), quantidade=100, preco=10.0, tipo='C'))
+    PositionStateService.record_transaction(session, Transaction(
+        ticker='PETR4', data=date(2024, 2, 1), quantidade=100, preco=20.0, tipo='C'))
+    session.commit()
+
+    posicao = session.get(Position, (CARTEIRA_PADRAO, 'PETR4'))
+    assert posicao.quantidade == 200
+    assert posicao.preco_medio == pytest.approx(15.0)
+    assert len(session.exec(select(PositionHistory)).all()) == 2
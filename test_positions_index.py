@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from app.schemas.portfolio import PositionSummary
+from app.services.history import HistoryService
+from app.services.positions_index import PositionsIndex
+from app.ui.components import sparkline
+from app.ui.components.sparkline import ALTURA, LARGURA, cached_sparkline_path, sparkline_path
+
+def _posicoes(n: int):
+    rng = np.random.default_rng(7)
+    return [
+        PositionSummary(
+            ticker=f'T{i:04d}{"11" if i % 3 == 0 else "3"}', quantidade=int(q), preco_medio=10.0,
+            total_investido=float(q) * 10, preco_atual=1.0, valor_total_atual=float(v), rentabilidade_pct=float(r),
+        )
+        for i, (q, v, r) in enumerate(zip(rng.integers(1, 1000, n), rng.uniform(0, 1e5, n), rng.normal(0, 20, n)))
+    ]
+
+def test_ordenacao_e_paginacao_iguais_ao_sorted():
+    posicoes = _posicoes(500)
+    indice = PositionsIndex(posicoes)
+
+    esperado = sorted(posicoes, key=lambda p: p.valor_total_atual, reverse=True)
+    total, pagina = indice.query('valor_total_atual', decrescente=True, offset=20, limite=10)
+    assert total == 500
+    assert [p.ticker for p in pagina] == [p.ticker for p in esperado[20:30]]
+
+    total, pagina = indice.query('ticker', decrescente=False, offset=0, limite=5)
+    assert [p.ticker for p in pagina] == sorted(p.ticker for p in posicoes)[:5]
+
+    # Última página parcial e offset além do fim
+    assert len(indice.query(offset=495, limite=10)[1]) == 5
+    assert indice.query(offset=600, limite=10) == (500, [])
+
+def test_filtro_por_ticker_preserva_ordem():
+    posicoes = _posicoes(300)
+    indice = PositionsIndex(posicoes)
+
+    total, pagina = indice.query('rentabilidade_pct', decrescente=False, filtro=' 11 ', limite=1000)
+    esperado = sorted((p for p in posicoes if '11' in p.ticker), key=lambda p: p.rentabilidade_pct)
+    assert total == len(esperado)
+    assert [p.ticker for p in pagina] == [p.ticker for p in esperado]
+
+    # Sem cotação, a posição é ordenada pelo custo, como é exibida
+    sem_cotacao = PositionSummary(ticker='ZZZZ3', quantidade=1, preco_medio=1e9, total_investido=1e9)
+    assert PositionsIndex([*posicoes, sem_cotacao]).query(limite=1)[1] == [sem_cotacao]
+
+    # Coluna desconhecida cai na ordem padrão; índice vazio não quebra
+    assert indice.query('nao_existe', limite=3)[1] == indice.query(limite=3)[1]
+    assert PositionsIndex([]).query(filtro='x') == (0, [])
+
+def test_sparkline_path_normalizado_e_em_cache():
+    path = sparkline_path(np.arange(1000, dtype=float))
+    numeros = np.array(path.replace('M', '').replace('L', '').split(), dtype=float)
+    x, y = numeros[0::2], numeros[1::2]
+    assert len(x) <= 40 + 2
+    assert x[0] == 0 and x[-1] == LARGURA
+    assert y.max() == ALTURA and y.min() == 0  # Série crescente: começa embaixo, termina em cima
+    assert sparkline_path([5.0]) == ''
+    assert set(np.array(sparkline_path([3.0, 3.0, 3.0]).replace('M', '').replace('L', '').split(), dtype=float)[1::2]) == {ALTURA / 2}
+
+    sparkline._paths.clear()
+    primeiro = cached_sparkline_path('PETR4', 1, [1.0, 2.0, 3.0])
+    # Mesma versão: reaproveita o path mesmo com outros valores
+    assert cached_sparkline_path('PETR4', 1, [3.0, 2.0, 1.0]) is primeiro
+    assert cached_sparkline_path('PETR4', 2, [3.0, 2.0, 1.0]) != primeiro
+
+def test_precos_recentes_por_ticker():
+    datas = pd.date_range('2024-01-01', periods=200, freq='D')
+    precos = pd.DataFrame({'PETR4': np.arange(200.0), 'VALE3': np.nan}, index=datas)
+    precos.loc[datas[150], 'VALE3'] = 60.0
+
+    recentes = HistoryService.recent_prices(precos, dias=30)
+    assert recentes['PETR4'].tolist() == list(np.arange(169.0, 200.0))
+    assert recentes['VALE3'].tolist() == [60.0] * 31  # Último preço conhecido antes da janela
+    assert HistoryService.recent_prices(pd.DataFrame()) == {}
@@ -0,0 +1,136 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.schemas.portfolio import PositionSummary
+from app.services.projection import (
+    ESTRATEGIAS, PERCENTIS, ProjectionParams, ProjectionService, ReturnStats,
+)
+
+def posicao(ticker, valor):
+    return PositionSummary(
+        ticker=ticker, quantidade=100, preco_medio=valor / 100, total_investido=valor,
+        preco_atual=valor / 100, valor_total_atual=valor,
+    )
+
+@pytest.fixture
+def precos():
+    rng = np.random.default_rng(0)
+    datas = pd.bdate_range('2019-01-01', '2024-12-31')
+    retornos = rng.normal([0.0004, 0.0002, 0.0], [0.02, 0.01, 0.0], (len(datas), 3))
+    return pd.DataFrame(20 * np.exp(retornos.cumsum(axis=0)), index=datas, columns=['PETR4', 'ITSA4', 'FIXO11'])
+
+@pytest.fixture
+def stats():
+    return ReturnStats(['A', 'B'], np.array([0.008, 0.004]), np.array([[0.06, 0.0], [0.01, 0.03]]))
+
+def test_estatisticas_mensais(precos):
+    stats = ProjectionService.return_stats(precos, ['PETR4', 'ITSA4', 'FIXO11', 'SEMPRECO'])
+    assert stats.media.shape == (4,) and stats.fator.shape == (4, 4)
+    assert stats.meses == 60  # Janela de 5 anos: dez/2019 a dez/2024
+
+    covariancia = stats.fator @ stats.fator.T
+    assert covariancia[0, 0] > covariancia[1, 1] > 0
+    # Ativo sem variação e ativo sem histórico não têm risco
+    assert covariancia[2:, :] == pytest.approx(0, abs=1e-12)
+    assert stats.media[2:] == pytest.approx(0, abs=1e-12)
+
+def test_curva_do_cdi():
+    curva = ProjectionService.cdi_curve(1000.0, 12, 0.01, 100.0)
+    assert curva[0] == 1000.0
+    # Laço explícito: rende o mês e recebe o aporte no fim
+    esperado = 1000.0
+    for _ in range(12):
+        esperado = esperado * 1.01 + 100.0
+    assert curva[-1] == pytest.approx(esperado)
+    assert ProjectionService.cdi_curve(1000.0, 3, 0.0, 50.0).tolist() == [1000.0, 1050.0, 1100.0, 1150.0]
+
+def test_resultado_nao_depende_do_numero_de_blocos_em_paralelo(stats):
+    pesos = np.array([0.6, 0.4])
+    params = ProjectionParams(anos=2, caminhos=12_000, estrategia='Trimestral')
+    finais, bandas = ProjectionService.simulate(stats, pesos, 1000.0, params, bandas=True)
+    assert finais.shape == (12_000,) and all(bandas[p].shape == (25,) for p in PERCENTIS)
+    assert np.array_equal(finais, ProjectionService.simulate(stats, pesos, 1000.0, params)[0])
+    # Cada bloco só depende da própria semente filha
+    primeiro, _ = ProjectionService.simulate_block(
+        np.random.SeedSequence(params.semente).spawn(3)[0], 5_000, stats, pesos, 1000.0, params
+    )
+    assert np.array_equal(finais[:5_000], primeiro)
+
+    with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context('spawn')) as pool:
+        em_paralelo, bandas_paralelo = ProjectionService.simulate(stats, pesos, 1000.0, params, bandas=True, pool=pool)
+    assert np.array_equal(finais, em_paralelo)
+    assert all(np.array_equal(bandas[p], bandas_paralelo[p]) for p in PERCENTIS)
+
+def test_bandas_reduzidas_por_bloco_acompanham_as_exatas(stats):
+    pesos = np.array([0.5, 0.5])
+    params = ProjectionParams(anos=1, caminhos=12_000, estrategia='Sem rebalanceamento', custo_transacao=0.0)
+    _, bandas = ProjectionService.simulate(stats, pesos, 1000.0, params, bandas=True)
+
+    # Sem rebalanceamento cada ativo segue o próprio caminho: refaz a matriz completa mês a mês
+    totais = []
+    for semente, n in zip(np.random.SeedSequence(params.semente).spawn(3), (5_000, 5_000, 2_000)):
+        rng = np.random.default_rng(semente)
+        valores = np.tile(1000.0 * pesos, (n, 1))
+        meses = [valores.sum(axis=1)]
+        for _ in range(params.meses):
+            valores = valores * np.exp(stats.media + rng.standard_normal((n, 2)) @ stats.fator.T)
+            meses.append(valores.sum(axis=1))
+        totais.append(np.array(meses).T)
+    exatas = np.percentile(np.concatenate(totais), PERCENTIS, axis=0)
+
+    for p, exata in zip(PERCENTIS, exatas):
+        assert bandas[p][-1] == pytest.approx(exata[-1])
+        assert bandas[p] == pytest.approx(exata, rel=5e-3)
+
+def test_rebalanceamento_mantem_os_pesos(stats):
+    pesos = np.array([0.5, 0.5])
+    params = ProjectionParams(anos=1, caminhos=200, estrategia='Mensal', custo_transacao=0.0)
+    finais, _ = ProjectionService.simulate(stats, pesos, 1000.0, params)
+
+    # Sem custo e rebalanceando todo mês, o patrimônio é o produto dos retornos da carteira-alvo
+    rng = np.random.default_rng(np.random.SeedSequence(params.semente).spawn(1)[0])
+    valor = np.full(200, 1000.0)
+    for _ in range(params.meses):
+        retornos = np.exp(stats.media + rng.standard_normal((200, 2)) @ stats.fator.T)
+        valor = valor * (retornos @ pesos)
+    assert finais == pytest.approx(valor)
+
+def test_custo_do_rebalanceamento(stats):
+    pesos = np.array([0.5, 0.5])
+    sem_custo, _ = ProjectionService.simulate(
+        stats, pesos, 1000.0, ProjectionParams(anos=3, caminhos=500, estrategia='Mensal', custo_transacao=0.0)
+    )
+    com_custo, _ = ProjectionService.simulate(
+        stats, pesos, 1000.0, ProjectionParams(anos=3, caminhos=500, estrategia='Mensal', custo_transacao=0.01)
+    )
+    assert (com_custo < sem_custo).all()
+
+def test_projecao_compara_todas_as_estrategias(precos):
+    posicoes = [posicao('PETR4', 6000.0), posicao('ITSA4', 3000.0), posicao('FIXO11', 1000.0)]
+    params = ProjectionParams(anos=2, caminhos=2_000, aporte_mensal=100.0)
+    resultado = ProjectionService.project(posicoes, precos, params, inicio=date(2025, 1, 1), workers=1)
+
+    assert resultado.valor_inicial == 10_000.0
+    assert len(resultado.datas) == 25 and resultado.datas[0] == pd.Timestamp('2025-01-01')
+    bandas = np.array([resultado.bandas[p] for p in PERCENTIS])
+    assert (np.diff(bandas, axis=0) >= 0).all()
+    assert (bandas[:, 0] == 10_000.0).all()
+
+    assert [c['estrategia'] for c in resultado.comparacao] == list(ESTRATEGIAS)
+    [escolhida] = [c for c in resultado.comparacao if c['estrategia'] == params.estrategia]
+    assert escolhida['mediana'] == pytest.approx(resultado.bandas[50][-1])
+    assert resultado.prob_supera_cdi == escolhida['prob_supera_cdi']
+    for linha in resultado.comparacao:
+        assert linha['p5'] <= linha['mediana'] <= linha['p95']
+        assert 0.0 <= linha['prob_supera_cdi'] <= 1.0
+
+def test_carteira_vazia(precos):
+    resultado = ProjectionService.project([], precos, ProjectionParams(anos=1), workers=1)
+    assert resultado.valor_inicial == 0.0
+    assert all((resultado.bandas[p] == 0).all() for p in PERCENTIS)
+    assert resultado.comparacao == []
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.schemas.portfolio import PositionSummary
+from app.services.portfolio import CalculationService
+from app.services.quotes import QuoteCache, QuoteProvider, StaticQuoteProvider
+
+class SlowProvider(QuoteProvider):
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    async def fetch(self, tickers):
+        self.calls.append(list(tickers))
+        await asyncio.sleep(0.01)
+        return {t: self.prices[t] for t in tickers if t in self.prices}
+
+def test_pedidos_simultaneos_geram_uma_busca():
+    provider = SlowProvider({'PETR4': 38.5})
+    cache = QuoteCache(provider, ttl=60)
+
+    async def cenario():
+        return await asyncio.gather(*(cache.get('PETR4') for _ in range(50)))
+
+    assert asyncio.run(cenario()) == [38.5] * 50
+    assert provider.calls == [['PETR4']]
+
+def test_cancelar_a_busca_nao_trava_quem_aguarda():
+    provider = SlowProvider({'PETR4': 38.5})
+    cache = QuoteCache(provider, ttl=60)
+
+    async def cenario():
+        lider = asyncio.create_task(cache.get('PETR4'))
+        await asyncio.sleep(0)  # Líder dentro do provider.fetch
+        seguidor = asyncio.create_task(cache.get('PETR4'))
+        await asyncio.sleep(0)  # Seguidor aguardando o futuro do líder
+        lider.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lider
+        return await asyncio.wait_for(seguidor, timeout=1)
+
+    assert asyncio.run(cenario()) == 38.5
+    assert provider.calls == [['PETR4'], ['PETR4']]
+    assert not cache._inflight
+
+def test_cancelar_quem_aguarda_nao_afeta_a_busca():
+    provider = SlowProvider({'PETR4': 38.5})
+    cache = QuoteCache(provider, ttl=60)
+
+    async def cenario():
+        lider = asyncio.create_task(cache.get('PETR4'))
+        await asyncio.sleep(0)
+        seguidor = asyncio.create_task(cache.get('PETR4'))
+        await asyncio.sleep(0)
+        seguidor.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await seguidor
+        return await lider
+
+    assert asyncio.run(cenario()) == 38.5
+    assert provider.calls == [['PETR4']]
+
+def test_ttl_e_lru():
+    provider = StaticQuoteProvider({'PETR4': 1.0, 'VALE3': 2.0, 'WEGE3': 3.0})
+    cache = QuoteCache(provider, ttl=0, maxsize=2)
+
+    async def cenario():
+        await cache.get_many(['PETR4', 'VALE3', 'WEGE3'])
+        assert list(cache._entries) == ['VALE3', 'WEGE3']
+        await cache.get('WEGE3')  # TTL zero: sempre busca de novo
+
+    asyncio.run(cenario())
+    assert provider.calls == 2
+
+def test_enriquecimento_em_lote():
+    provider = SlowProvider({'PETR4': 30.0, 'VALE3': 60.0})
+    cache = QuoteCache(provider)
+    posicoes = [
+        PositionSummary(ticker='PETR4', quantidade=100, preco_medio=20.0, total_investido=2000.0),
+        PositionSummary(ticker='VALE3', quantidade=50, preco_medio=80.0, total_investido=4000.0),
+    ]
+
+    asyncio.run(CalculationService.enrich_positions_async(posicoes, cache))
+
+    assert len(provider.calls) == 1
+    assert posicoes[0].valor_total_atual == 3000.0
+    assert posicoes[0].rentabilidade_pct == pytest.approx(50.0)
+    assert posicoes[1].lucro_prejuizo == pytest.approx(-1000.0)
+    assert posicoes[0].percentual_carteira == pytest.approx(50.0)
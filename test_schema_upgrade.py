@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import app.db.init_db  # noqa: F401  (registra todos os modelos)
+from app.models.portfolio import CARTEIRA_PADRAO
+from app.models.position import Position
+from app.models.transaction import Transaction
+from app.services.batch import BatchRecomputeService
+from app.services.schema_upgrade import SchemaUpgradeService
+
+# Esquema anterior às carteiras: sem portfolio_id e com chaves só por ticker
+ESQUEMA_ANTIGO = [
+    "CREATE TABLE transacoes (id INTEGER PRIMARY KEY, ticker VARCHAR NOT NULL, data DATE NOT NULL, "
+    "quantidade INTEGER NOT NULL, preco FLOAT NOT NULL, tipo VARCHAR NOT NULL)",
+    "CREATE TABLE proventos (id INTEGER PRIMARY KEY, ticker VARCHAR NOT NULL, data DATE NOT NULL, "
+    "valor_total FLOAT NOT NULL, tipo VARCHAR NOT NULL)",
+    "CREATE TABLE posicoes (ticker VARCHAR PRIMARY KEY, quantidade INTEGER NOT NULL, preco_medio FLOAT NOT NULL, "
+    "total_investido FLOAT NOT NULL, ultima_transacao_id INTEGER, ultima_data DATE)",
+    "CREATE TABLE posicoes_historico (ticker VARCHAR NOT NULL, data DATE NOT NULL, quantidade INTEGER NOT NULL, "
+    "preco_medio FLOAT NOT NULL, total_investido FLOAT NOT NULL, PRIMARY KEY (ticker, data))",
+    "INSERT INTO transacoes (ticker, data, quantidade, preco, tipo) VALUES "
+    "('PETR4', '2024-01-02', 100, 30.0, 'C'), ('PETR4', '2024-02-01', 40, 35.0, 'V'), ('VALE3', '2024-01-05', 10, 60.0, 'C')",
+    "INSERT INTO posicoes VALUES ('PETR4', 60, 30.0, 1800.0, 2, '2024-02-01')",
+]
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    with engine.begin() as conn:
+        for comando in ESQUEMA_ANTIGO:
+            conn.execute(text(comando))
+    yield engine
+    engine.dispose()
+
+def test_banco_antigo_e_atualizado_e_recalculado(engine):
+    plano = SchemaUpgradeService.plan(engine)
+    assert set(plano.recriar) == {'posicoes', 'posicoes_historico'}
+    assert ('transacoes', 'portfolio_id') in plano.colunas and ('proventos', 'portfolio_id') in plano.colunas
+    assert ('transacoes', 'ix_transacoes_carteira_ticker_data') in plano.indices
+
+    SchemaUpgradeService.apply(engine, plano)
+    list(BatchRecomputeService.recompute_all(engine, job='atualizacao', workers=1, restart=True))
+    assert not SchemaUpgradeService.plan(engine)
+
+    with Session(engine) as session:
+        # Linhas antigas ficam na carteira padrão
+        assert {t.portfolio_id for t in session.exec(select(Transaction)).all()} == {CARTEIRA_PADRAO}
+        posicoes = {p.ticker: p.quantidade for p in session.exec(select(Position)).all()}
+    assert posicoes == {'PETR4': 60, 'VALE3': 10}
+
+def test_banco_novo_nao_tem_o_que_atualizar(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'novo.db'}")
+    SQLModel.metadata.create_all(engine)
+    assert not SchemaUpgradeService.plan(engine)
+
+def test_tabelas_ausentes_sao_criadas(engine):
+    SchemaUpgradeService.apply(engine, SchemaUpgradeService.plan(engine))
+    with Session(engine) as session:
+        session.add(Transaction(ticker='ITSA4', data=date(2024, 3, 1), quantidade=1, preco=10.0, tipo='C'))
+        session.commit()
+        assert session.execute(text("SELECT count(*) FROM snapshots_carteira")).scalar() == 0
+
+def test_quantidade_inteira_nas_tabelas_derivadas(tmp_path):
+    # Banco já com carteiras, mas de antes das quantidades fracionárias
+    engine = create_engine(f"sqlite:///{tmp_path / 'inteiro.db'}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE posicoes"))
+        conn.execute(text(
+            "CREATE TABLE posicoes (portfolio_id INTEGER NOT NULL, ticker VARCHAR NOT NULL, quantidade INTEGER NOT NULL, "
+            "preco_medio FLOAT NOT NULL, total_investido FLOAT NOT NULL, ultima_transacao_id INTEGER, "
+            "ultima_data DATE, PRIMARY KEY (portfolio_id, ticker))"
+        ))
+
+    plano = SchemaUpgradeService.plan(engine)
+    assert plano.recriar == ['posicoes'] and not plano.colunas
+    SchemaUpgradeService.apply(engine, plano)
+    assert not SchemaUpgradeService.plan(engine)
+    engine.dispose()
@@ -0,0 +1,62 @@
+import time
+from datetime import date
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.db.versioning import data_version
+from app.models.transaction import Transaction
+from app.services.search import TABELAS_BUSCA, TickerIndex, TickerSearchService, normalize
+
+NOMES = {
+    'BBAS3': 'Banco do Brasil ON',
+    'BBDC4': 'Bradesco PN',
+    'ITSA4': 'Itaúsa PN',
+    'PETR4': 'Petrobras PN',
+    'PETR3': 'Petrobras ON',
+    'PRIO3': 'PetroRio ON',
+}
+
+def test_prefixo_por_ticker_antes_do_nome():
+    indice = TickerIndex(NOMES)
+    assert [m.ticker for m in indice.search('petr')] == ['PETR3', 'PETR4', 'PRIO3']
+    assert [m.ticker for m in indice.search('bra')] == ['BBDC4', 'BBAS3']  # Bradesco < Brasil
+    assert [m.ticker for m in indice.search('do br')] == ['BBAS3']
+    assert [m.ticker for m in indice.search('itaus')] == ['ITSA4']  # sem acento
+    assert indice.search('  ') == [] and indice.search('xyz') == []
+
+def test_resultados_limitados_e_consulta_rapida():
+    indice = TickerIndex({f'T{i:05d}': f'Empresa {i}' for i in range(50_000)})
+    assert len(indice.search('T0', limite=8)) == 8
+
+    inicio = time.perf_counter()
+    for _ in range(10_000):
+        indice.search('T012')
+    # Busca binária: microssegundos por consulta mesmo com 50 mil ativos
+    assert (time.perf_counter() - inicio) / 10_000 < 1e-3
+
+@pytest.fixture
+def indice_isolado(monkeypatch):
+    # O índice é estado de classe: restaura o do processo ao fim do teste
+    monkeypatch.setattr(TickerSearchService, '_indice', TickerSearchService._indice)
+    monkeypatch.setattr(TickerSearchService, '_versao', TickerSearchService._versao)
+
+def test_indice_atualizado_quando_surgem_tickers(indice_isolado):
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Transaction(ticker='WEGE3', data=date(2024, 1, 2), quantidade=1, preco=1.0, tipo='C'))
+        session.commit()
+        TickerSearchService.refresh(session)
+        assert TickerSearchService._versao == data_version.key(session, TABELAS_BUSCA)
+        assert [m.ticker for m in TickerSearchService._indice.search('we')] == ['WEGE3']
+
+        session.add(Transaction(ticker='WEST3', data=date(2024, 1, 3), quantidade=1, preco=1.0, tipo='C'))
+        session.commit()
+        # O commit muda a versão: a próxima busca reconstrói o índice
+        assert TickerSearchService._versao != data_version.key(session, TABELAS_BUSCA)
+        TickerSearchService.refresh(session)
+        assert [m.ticker for m in TickerSearchService._indice.search('we')] == ['WEGE3', 'WEST3']
+
+def test_normalizacao():
+    assert normalize('  Itaúsa   pn ') == 'ITAUSA PN'
@@ -0,0 +1,169 @@
+import asyncio
+import random
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from app.core.config import settings
+from app.models.earnings import Earnings
+from app.models.snapshot import PortfolioSnapshot, SnapshotPending
+from app.models.transaction import Transaction
+from app.services.earnings import EarningsService
+from app.services.positions import PositionStateService
+from app.services.snapshots import LIMITE_PONTOS, SnapshotService
+
+HOJE = date(2024, 6, 30)
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(3)
+    with Session(engine) as session:
+        inicio = date(2012, 3, 14)
+        for i in range(600):
+            dia = inicio + timedelta(days=rng.randint(0, (HOJE - inicio).days))
+            session.add(Transaction(ticker=rng.choice(['PETR4', 'VALE3']), data=dia,
+                                    quantidade=rng.randint(1, 20), preco=rng.uniform(10, 60), tipo=rng.choice('CCV')))
+        for i in range(150):
+            dia = inicio + timedelta(days=rng.randint(0, (HOJE - inicio).days))
+            session.add(Earnings(ticker='PETR4', data=dia, valor_total=round(rng.uniform(1, 100), 2), tipo='DIV'))
+        session.flush()
+        PositionStateService.rebuild(session)
+        yield session
+
+def _contagens(session):
+    s = PortfolioSnapshot
+    return dict(session.exec(select(s.granularidade, func.count()).group_by(s.granularidade)).all())
+
+def _linhas(session):
+    return session.exec(select(PortfolioSnapshot).order_by(
+        PortfolioSnapshot.granularidade, PortfolioSnapshot.data)).all()
+
+def test_niveis_limitam_linhas_por_periodo(session):
+    SnapshotService.refresh(session, hoje=HOJE)
+    contagens = _contagens(session)
+    assert contagens['D'] <= 401 and contagens['S'] <= 267
+    assert contagens['M'] == 148  # mar/2012 a jun/2024: mensais nunca expiram
+
+    series = SnapshotService.load_periods(session)
+    assert all(len(serie) <= LIMITE_PONTOS for serie in series.values())
+    assert len(series['1 mês']) == 32 and len(series['Tempo máximo']) == 148
+
+    # Todos os níveis terminam no mesmo valor do último dia
+    diario = SnapshotService.daily_frame(session, fim=HOJE)
+    assert {round(serie.iloc[-1], 6) for serie in series.values()} == {round(diario['valor'].iloc[-1], 6)}
+
+    # Proventos preservados no rollup mensal
+    mensal = sum(l.proventos for l in _linhas(session) if l.granularidade == 'M')
+    total = session.exec(select(func.sum(Earnings.valor_total))).one()
+    assert mensal == pytest.approx(total)
+
+def test_compactacao_ao_longo_do_tempo_preserva_rollups(session):
+    # Rodando todo dia, com a retenção cortando meses já consolidados
+    SnapshotService.refresh(session, hoje=HOJE - timedelta(days=120))
+    for dias in range(119, -1, -7):
+        SnapshotService.refresh(session, desde=HOJE - timedelta(days=dias + 7), hoje=HOJE - timedelta(days=dias))
+    incremental = [(l.granularidade, l.data, round(l.valor, 6), round(l.proventos, 6)) for l in _linhas(session)]
+
+    SnapshotService.refresh(session, hoje=HOJE)
+    completo = [(l.granularidade, l.data, round(l.valor, 6), round(l.proventos, 6)) for l in _linhas(session)]
+    assert incremental == completo
+
+def test_sem_transacoes_nao_gera_snapshots():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        SnapshotService.refresh(session, hoje=HOJE)
+        assert SnapshotService.load_periods(session) == {}
+
+def test_transacao_incremental_marca_e_refaz_snapshots(session):
+    SnapshotService.refresh(session, hoje=HOJE)
+    antes = SnapshotService.daily_frame(session, fim=HOJE)
+
+    # Compra retroativa pelo caminho incremental: só marca a carteira
+    PositionStateService.record_transaction(
+        session, Transaction(ticker='PETR4', data=HOJE - timedelta(days=10), quantidade=500, preco=40.0, tipo='C')
+    )
+    assert session.get(SnapshotPending, 1).desde == HOJE - timedelta(days=10)
+    assert SnapshotService.apply_pending(session, hoje=HOJE) == [1]
+    assert session.exec(select(SnapshotPending)).all() == []
+
+    incremental = [(l.granularidade, l.data, round(l.valor, 6), round(l.custo, 6)) for l in _linhas(session)]
+    SnapshotService.refresh(session, hoje=HOJE)
+    completo = [(l.granularidade, l.data, round(l.valor, 6), round(l.custo, 6)) for l in _linhas(session)]
+    assert incremental == completo
+    assert SnapshotService.load_periods(session)['1 mês'].iloc[-1] > antes['valor'].iloc[-1]
+
+def test_provento_incremental_marca_a_carteira(session):
+    SnapshotService.refresh(session, hoje=HOJE)
+    EarningsService.record_earning(session, Earnings(ticker='PETR4', data=HOJE, valor_total=123.0, tipo='DIV'))
+    SnapshotService.apply_pending(session, hoje=HOJE)
+    [ultima] = session.exec(select(PortfolioSnapshot).where(
+        PortfolioSnapshot.granularidade == 'D', PortfolioSnapshot.data == HOJE)).all()
+    assert ultima.proventos >= 123.0
+
+def test_carteira_sem_snapshots_so_perde_a_marca(session):
+    PositionStateService.record_transaction(
+        session, Transaction(ticker='PETR4', data=HOJE, quantidade=1, preco=40.0, tipo='C')
+    )
+    assert SnapshotService.apply_pending(session, hoje=HOJE) == [1]
+    assert _contagens(session) == {}
+
+def test_rotina_diaria_estende_ate_hoje(session):
+    SnapshotService.refresh(session, hoje=HOJE)
+    depois = HOJE + timedelta(days=40)
+    assert SnapshotService.roll_forward(session, hoje=depois) == [1]
+    estendido = [(l.granularidade, l.data, round(l.valor, 6)) for l in _linhas(session)]
+    assert estendido[-1][1] == depois
+
+    SnapshotService.refresh(session, hoje=depois)
+    assert estendido == [(l.granularidade, l.data, round(l.valor, 6)) for l in _linhas(session)]
+
+def test_pendencias_aplicadas_fora_do_event_loop(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'snapshots.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Transaction(ticker='PETR4', data=HOJE, quantidade=1, preco=40.0, tipo='C'))
+        session.flush()
+        SnapshotService.refresh(session, hoje=HOJE)
+        SnapshotService.mark_stale(session, 1, HOJE)
+        session.commit()
+
+    threads = []
+    original = SnapshotService.refresh
+
+    def refresh(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(SnapshotService, 'refresh', refresh)
+    assert asyncio.run(SnapshotService.apply_pending_async(engine)) == [1]
+    assert threads and threading.get_ident() not in threads
+    with Session(engine) as session:
+        assert session.exec(select(SnapshotPending)).all() == []
+    engine.dispose()
+
+@pytest.mark.parametrize('arquivo', [False, True])
+def test_diario_a_partir_do_estado_gravado(session, tmp_path, monkeypatch, arquivo):
+    if arquivo:
+        # Pregões só em dias úteis: proventos de fim de semana caem no dia seguinte
+        rng = np.random.default_rng(5)
+        dias = pd.bdate_range('2012-01-02', HOJE)
+        longo = pd.DataFrame([
+            (dia.date(), ticker, preco)
+            for ticker in ('PETR4', 'VALE3')
+            for dia, preco in zip(dias, 30 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dias)))))
+        ], columns=['data', 'ticker', 'preco'])
+        longo.to_csv(tmp_path / 'precos.csv', index=False)
+        monkeypatch.setattr(settings, 'PRICE_HISTORY_FILE', str(tmp_path / 'precos.csv'))
+
+    completo = SnapshotService.daily_frame(session, fim=HOJE)
+    for desde in (date(2015, 3, 7), date(2020, 1, 1), HOJE - timedelta(days=30)):
+        parcial = SnapshotService.daily_frame(session, fim=HOJE, desde=desde)
+        pd.testing.assert_frame_equal(parcial, completo[completo.index >= pd.Timestamp(desde)],
+                                      check_freq=False, check_index_type=False)
@@ -0,0 +1,139 @@
+import os
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models.transaction import Transaction
+from app.services.taxes import ACAO, FII, TaxService, TaxState, load_asset_classes
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+TRANSACOES = [
+    # Janeiro: venda pequena de ações com lucro -> isenta
+    ('PETR4', date(2024, 1, 5), 1000, 10.0, 'C'),
+    ('PETR4', date(2024, 1, 20), 100, 15.0, 'V'),
+    # Fevereiro: prejuízo em ações e lucro em FII
+    ('VALE3', date(2024, 2, 1), 2000, 50.0, 'C'),
+    ('VALE3', date(2024, 2, 15), 1000, 45.0, 'V'),
+    ('MXRF11', date(2024, 2, 2), 100, 10.0, 'C'),
+    ('MXRF11', date(2024, 2, 20), 100, 12.0, 'V'),
+    # Abril: lucro de 8.000 em ações com vendas > 20k, compensa o prejuízo de fevereiro
+    ('VALE3', date(2024, 4, 10), 1000, 58.0, 'V'),
+    ('PETR4', date(2024, 4, 11), 100, 9.0, 'C'),
+]
+
+CLASSES = {'PETR4': ACAO, 'VALE3': ACAO, 'ITSA4': ACAO, 'MXRF11': FII}
+
+def _transacoes():
+    return [
+        Transaction(id=i, ticker=ticker, data=dia, quantidade=qtde, preco=preco, tipo=tipo)
+        for i, (ticker, dia, qtde, preco, tipo) in enumerate(TRANSACOES, start=1)
+    ]
+
+def test_isencao_fii_e_compensacao_de_prejuizo():
+    meses = {(b.mes, b.classe): b for b in TaxService.monthly_report(_transacoes(), classes=CLASSES)}
+
+    janeiro = meses[(date(2024, 1, 1), ACAO)]
+    assert janeiro.isento and janeiro.ganho_liquido == pytest.approx(500.0) and janeiro.imposto == 0
+
+    fev_acao = meses[(date(2024, 2, 1), ACAO)]
+    assert fev_acao.ganho_liquido == pytest.approx(-5000.0)
+    assert fev_acao.prejuizo_a_compensar == pytest.approx(5000.0)
+
+    # FII não tem isenção e não usa o prejuízo de ações
+    fev_fii = meses[(date(2024, 2, 1), FII)]
+    assert fev_fii.imposto == pytest.approx(40.0)
+    assert fev_fii.prejuizo_compensado == 0
+
+    abril = meses[(date(2024, 4, 1), ACAO)]
+    assert abril.ganho_liquido == pytest.approx(8000.0)
+    assert abril.prejuizo_compensado == pytest.approx(5000.0)
+    assert abril.imposto == pytest.approx(450.0)
+    assert abril.prejuizo_a_compensar == 0
+
+def test_venda_acima_da_posicao_realiza_apenas_o_que_existia():
+    transacoes = [
+        Transaction(id=1, ticker='ITSA4', data=date(2024, 1, 2), quantidade=10, preco=10.0, tipo='C'),
+        Transaction(id=2, ticker='ITSA4', data=date(2024, 1, 3), quantidade=30, preco=12.0, tipo='V'),
+    ]
+    (venda,) = TaxService.realized_gains(transacoes, classes=CLASSES)
+    assert venda.quantidade == 10 and venda.ganho == pytest.approx(20.0)
+
+def test_apuracao_incremental_igual_a_completa(session):
+    session.add_all(_transacoes())
+    session.commit()
+
+    completo = list(TaxService.monthly_report_from_db(session, ate=date(2024, 5, 1), classes=CLASSES))
+
+    estado = TaxState()
+    parcial = list(TaxService.monthly_report_from_db(session, estado, ate=date(2024, 3, 15), classes=CLASSES))
+    assert estado.processado_ate == date(2024, 3, 1)
+    assert estado.prejuizos[ACAO] == pytest.approx(5000.0)
+
+    # Retomando de um estado serializado só os meses novos são lidos
+    retomado = TaxState(**estado.to_dict())
+    parcial += list(TaxService.monthly_report_from_db(session, retomado, ate=date(2024, 5, 1), classes=CLASSES))
+
+    assert parcial == completo
+    assert list(TaxService.monthly_report_from_db(session, retomado, ate=date(2024, 5, 20), classes=CLASSES)) == []
+
+def test_unit_de_acoes_terminada_em_11_tem_isencao(tmp_path):
+    arquivo = tmp_path / 'ativos.csv'
+    arquivo.write_text("ticker,nome,classe\ntaee11,Taesa Unit,acao\nMXRF11,Maxi Renda,FII\nITSA4,Itaúsa,\n", encoding='utf-8')
+    classes = load_asset_classes(str(arquivo))
+    assert classes == {'TAEE11': ACAO, 'MXRF11': FII}
+
+    transacoes = [
+        Transaction(id=1, ticker='TAEE11', data=date(2024, 1, 2), quantidade=100, preco=30.0, tipo='C'),
+        Transaction(id=2, ticker='TAEE11', data=date(2024, 1, 20), quantidade=100, preco=35.0, tipo='V'),
+    ]
+    [janeiro] = TaxService.monthly_report(transacoes, classes=classes)
+    assert (janeiro.classe, janeiro.isento, janeiro.imposto) == (ACAO, True, 0)
+
+def test_venda_de_ativo_sem_classe_falha():
+    transacoes = [
+        Transaction(id=1, ticker='KLBN11', data=date(2024, 1, 2), quantidade=100, preco=20.0, tipo='C'),
+        Transaction(id=2, ticker='KLBN11', data=date(2024, 1, 3), quantidade=100, preco=21.0, tipo='V'),
+    ]
+    with pytest.raises(ValueError, match='KLBN11'):
+        list(TaxService.monthly_report(transacoes, classes=CLASSES))
+
+def test_classe_invalida_no_cadastro(tmp_path):
+    arquivo = tmp_path / 'ativos.csv'
+    arquivo.write_text("ticker,nome,classe\nBOVA11,ETF Ibovespa,ETF\n", encoding='utf-8')
+    with pytest.raises(ValueError, match='ETF'):
+        load_asset_classes(str(arquivo))
+
+def test_cadastro_incompleto_falha_antes_da_apuracao(session):
+    session.add_all(_transacoes())
+    session.commit()
+    estado = TaxState()
+    with pytest.raises(ValueError, match=r"\['MXRF11', 'VALE3'\]"):
+        next(TaxService.monthly_report_from_db(session, estado, ate=date(2024, 5, 1), classes={'PETR4': ACAO}))
+    # Sem ASSETS_FILE: um erro de configuração, não um por venda
+    with pytest.raises(ValueError, match='ASSETS_FILE'):
+        next(TaxService.monthly_report_from_db(session, estado, ate=date(2024, 5, 1), classes={}))
+    assert estado == TaxState()
+
+def test_cadastro_relido_so_quando_o_arquivo_muda(tmp_path, monkeypatch):
+    arquivo = tmp_path / 'ativos.csv'
+    arquivo.write_text("ticker,nome,classe\nPETR4,Petrobras,ACAO\n", encoding='utf-8')
+    assert load_asset_classes(str(arquivo)) == {'PETR4': ACAO}
+
+    leituras = []
+    original = pd.read_csv
+    monkeypatch.setattr(pd, 'read_csv', lambda *a, **k: leituras.append(a) or original(*a, **k))
+    assert load_asset_classes(str(arquivo)) == {'PETR4': ACAO}
+    assert leituras == []
+
+    arquivo.write_text("ticker,nome,classe\nPETR4,Petrobras,ACAO\nMXRF11,Maxi Renda,FII\n", encoding='utf-8')
+    os.utime(arquivo, (arquivo.stat().st_atime, arquivo.stat().st_mtime + 10))
+    assert load_asset_classes(str(arquivo)) == {'PETR4': ACAO, 'MXRF11': FII}
+    assert len(leituras) == 1
@@ -0,0 +1,35 @@
+import argparse
+import time
+from app.db import init_db  # noqa: F401  (registra todos os modelos)
+from app.db.session import engine
+from app.services.batch import BatchRecomputeService
+from app.services.schema_upgrade import SchemaUpgradeService
+
+def atualizar(workers):
+    plano = SchemaUpgradeService.plan(engine)
+    if not plano:
+        print("Esquema já está atualizado.")
+        return
+
+    for tabela in plano.recriar:
+        print(f"Recriando {tabela} (estado derivado, refeito em seguida)")
+    for tabela, coluna in plano.colunas:
+        print(f"Adicionando {tabela}.{coluna}")
+    for tabela, indice in plano.indices:
+        print(f"Criando índice {indice} em {tabela}")
+    SchemaUpgradeService.apply(engine, plano)
+
+    if plano.recriar:
+        print("Recalculando o estado derivado de todas as carteiras...")
+        inicio = time.perf_counter()
+        carteiras = sum(r.carteiras for r in BatchRecomputeService.recompute_all(
+            engine, job='atualizacao', workers=workers, restart=True
+        ))
+        print(f"{carteiras:,} carteiras recalculadas em {time.perf_counter() - inicio:.1f}s.")
+    print("Esquema atualizado.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza um banco criado por uma versão anterior do esquema.")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do recálculo (padrão: número de cores)")
+    args = parser.parse_args()
+    atualizar(args.workers)